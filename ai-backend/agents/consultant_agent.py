@@ -3,6 +3,7 @@
 from typing import Dict, Any, List
 from langchain_groq import ChatGroq
 from workflow.state import ConversationState
+from utils.streaming import generate
 import json
 import re
 
@@ -85,7 +86,7 @@ class ConsultantAgent:
         
         try:
             print(f"DEBUG Consultant: Processing message: '{last_message}'")
-            response = await self.llm.ainvoke(formatted_prompt)
+            response = await generate(self.llm, formatted_prompt, "consultant", json_fields=["response_text"])
             # Clean up content to just get the JSON part
             content = response.content.strip()
             # Safe Fallback Defaults
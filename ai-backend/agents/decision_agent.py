@@ -5,6 +5,9 @@ from langchain_groq import ChatGroq
 from langchain.prompts import ChatPromptTemplate
 from workflow.state import ConversationState
 from utils.groq_prompts import DECISION_EVALUATION_PROMPT
+from utils.context_window import build_window
+from utils.streaming import generate
+from utils.rate_limit import LLMUnavailableError, unavailable_message
 import json
 import re
 
@@ -110,32 +113,13 @@ class DecisionMakingAgent:
         messages = state.get("messages", [])
         last_message = messages[-1]["content"] if messages else ""
         
-        # Simple prompt construction
-        # Simple prompt construction
-        context = f"Retrieved Products: {state.get('retrieved_products', [])}\n"
-        context += f"Conversation Summary: {state.get('conversation_summary', '')}\n"
-        context += f"Frustration Level: {state.get('frustration_level', 'low')}\n"
-        
-        # Inject User Context (Cart, Wishlist)
-        user_id = state.get("user_id")
-        if user_id:
-            from tools.database_tools import get_user_context
-            try:
-                user_context = await get_user_context(user_id)
-                cart_summary = ", ".join([f"{item['quantity']}x {item['name']}" for item in user_context.get('cart', [])]) or "Empty"
-                wishlist_summary = ", ".join([item['name'] for item in user_context.get('wishlist', [])]) or "Empty"
-                
-                context += f"User Cart: {cart_summary}\n"
-                context += f"User Wishlist: {wishlist_summary}\n"
-            except Exception as e:
-                print(f"Error fetching user context: {e}")
-                context += "User Cart: Unknown (Error fetching)\n"
+        context = await self.build_context(state)
         
         prompt = f"{self.system_prompt}\n\nCONTEXT:\n{context}\n\nUSER MESSAGE: {last_message}\n\nDECISION JSON:"
         
         try:
             print(f"DEBUG Decision Agent: Processing message: '{last_message}'")
-            response = await self.llm.ainvoke(prompt)
+            response = await generate(self.llm, prompt, "decision_agent", json_fields=["response"])
             content = response.content.replace('```json', '').replace('```', '').strip()
             
             try:
@@ -177,138 +161,7 @@ class DecisionMakingAgent:
             args = decision.get("arguments", {})
             print(f"DEBUG Decision Agent: Decided action: {action} with args: {args}")
             
-            # Execute Tools (Logic handled here for simplicity in this agent)
-            # Dynamic imports to avoid circular deps if any
-            from tools.database_tools import (
-                search_products, update_address, clear_wishlist, clear_cart, 
-                create_order_from_cart, execute_nlp_action, update_cart_quantity,
-                get_user_context, get_user_orders, wishlist_to_order, wishlist_to_cart
-            )
-            from tools.email_tools import send_escalation_email
-            
-            state["route"] = "ai_response" # Default
-            
-            if action == "search_products":
-                # Products were already retrieved by KnowledgeAgent, just use them
-                products = state.get("retrieved_products", [])
-                print(f"DEBUG Decision Agent: Using {len(products)} products from state")
-                if products:
-                    state["ai_response"] = f"I found {len(products)} timepieces matching your request."
-                else:
-                    # Graceful fallback for no results
-                    state["ai_response"] = (
-                        "I couldn't find any watches matching that exact description efficiently. "
-                        "Could you try broadening your search? For example, try searching for just the brand or a style like 'Sport' or 'Dress'."
-                    )
-                    
-            elif action in ["add_to_cart", "update_cart_quantity", "add_to_wishlist"]:
-                # Use NLP-action endpoint for autonomous execution
-                user_id = state.get("user_id")
-                if user_id:
-                    result = await execute_nlp_action(
-                        user_message=last_message,
-                        user_id=user_id,
-                        conversation_context=messages[-5:],  # Last 5 messages
-                        retrieved_products=state.get("retrieved_products", [])
-                    )
-                    if result.get("success"):
-                        state["ai_response"] = result.get("message", "Done!")
-                    else:
-                        state["ai_response"] = f"I couldn't complete that action: {result.get('error', 'Unknown error')}"
-                else:
-                    state["ai_response"] = "Please login to manage your cart and wishlist."
-
-            elif action == "update_address":
-                user_id = state.get("user_id")
-                if user_id:
-                    success = await update_address(user_id, args.get("new_address", ""))
-                    if success:
-                        state["ai_response"] = f"I've updated your shipping address to: {args.get('new_address')}"
-                    else:
-                        state["ai_response"] = "I encountered an error updating your address."
-                else:
-                    state["ai_response"] = "I need you to be logged in to update your address."
-
-            elif action == "create_order":
-                user_id = state.get("user_id")
-                if user_id:
-                    result = await create_order_from_cart(user_id)
-                    state["ai_response"] = result.get("message", "Order placed successfully.")
-                else:
-                    state["ai_response"] = "Please login to place an order."
-                    
-            elif action == "clear_wishlist":
-                user_id = state.get("user_id")
-                if user_id:
-                    await clear_wishlist(user_id)
-                    state["ai_response"] = "Your wishlist has been cleared."
-                else:
-                    state["ai_response"] = "Please login to manage your wishlist."
-
-            elif action == "clear_cart":
-                user_id = state.get("user_id")
-                if user_id:
-                    success = await clear_cart(user_id)
-                    if success:
-                        state["ai_response"] = "I've emptied your cart."
-                    else:
-                        state["ai_response"] = "I encountered an error clearing your cart."
-                else:
-                    state["ai_response"] = "Please login to manage your cart."
-            
-            elif action == "get_orders":
-                user_id = state.get("user_id")
-                if user_id:
-                    orders = await get_user_orders(user_id)
-                    if orders:
-
-                        try:
-                            order_lines = []
-                            for o in orders[:5]:
-                                date_str = o.get('createdAt', '').split('T')[0]
-                                total = f"${o.get('total', 0):.2f}"
-                                items_desc = ", ".join([f"{i['quantity']}x {i.get('watch', {}).get('name', 'Watch')}" for i in o.get('items', [])])
-                                order_lines.append(f"**Order #{o['id'].split('-')[0]}** ({date_str}) - {total}\n   *Items: {items_desc}*")
-                            
-                            order_summary = "\n\n".join(order_lines)
-                            state["ai_response"] = f"Here are your recent orders:\n\n{order_summary}"
-                        except Exception as e:
-                            print(f"Error formatting orders: {e}")
-                            state["ai_response"] = "Here are your orders (raw data): " + str(orders[:3])
-                    else:
-                        state["ai_response"] = "You don't have any past orders."
-                else:
-                    state["ai_response"] = "Please login to view your orders."
-            
-            elif action == "wishlist_to_order":
-                user_id = state.get("user_id")
-                if user_id:
-                    result = await wishlist_to_order(user_id)
-                    state["ai_response"] = result.get("message", "Processed your wishlist order.")
-                else:
-                    state["ai_response"] = "Please login to place an order."
-            
-            elif action == "wishlist_to_cart":
-                user_id = state.get("user_id")
-                if user_id:
-                    result = await wishlist_to_cart(user_id)
-                    state["ai_response"] = result.get("message", "Moved items to cart.")
-                else:
-                    state["ai_response"] = "Please login to manage your list."
-            
-            elif action == "escalate_to_human":
-                # Explicit handler for escalation action from LLM
-                state["route"] = "escalate"
-                state["ai_response"] = "I understand your frustration. I'm connecting you with a human agent."
-
-            elif action == "request_consultation":
-                state["route"] = "consultation"
-                state["consultation_active"] = True
-                state["ai_response"] = "I see you're looking for something specific. Let me help you find the perfect watch."
-            
-            else:
-                # direct_response
-                state["ai_response"] = args.get("response", "How can I help you regarding our luxury watches?")
+            await self.execute_action(state, action, args)
                 
             state["agent_type"] = "decision_agent"
             state["ai_confidence"] = 1.0
@@ -318,7 +171,9 @@ class DecisionMakingAgent:
             error_msg = str(e)
             print(f"Decision error: {error_msg}")
             
-            if "Rate limit" in error_msg or "429" in error_msg:
+            if isinstance(e, LLMUnavailableError):
+                 state["ai_response"] = unavailable_message(e)
+            elif "Rate limit" in error_msg or "429" in error_msg:
                  state["ai_response"] = "I apologize, but I'm currently at maximum capacity (Rate Limit Reached). Please try again in about 15 minutes."
             else:
                  traceback.print_exc()
@@ -328,6 +183,168 @@ class DecisionMakingAgent:
             
         return state
 
+    async def build_context(self, state: ConversationState) -> str:
+        """Build the context block (products, summary, frustration, cart) for tool decisions"""
+        context = f"Retrieved Products: {state.get('retrieved_products', [])}\n"
+        context += f"Conversation Summary: {state.get('conversation_summary', '')}\n"
+        context += f"Frustration Level: {state.get('frustration_level', 'low')}\n"
+        
+        # Inject User Context (Cart, Wishlist)
+        user_id = state.get("user_id")
+        if user_id:
+            from tools.database_tools import get_user_context
+            try:
+                user_context = await get_user_context(user_id)
+                cart_summary = ", ".join([f"{item['quantity']}x {item['name']}" for item in user_context.get('cart', [])]) or "Empty"
+                wishlist_summary = ", ".join([item['name'] for item in user_context.get('wishlist', [])]) or "Empty"
+                
+                context += f"User Cart: {cart_summary}\n"
+                context += f"User Wishlist: {wishlist_summary}\n"
+            except Exception as e:
+                print(f"Error fetching user context: {e}")
+                context += "User Cart: Unknown (Error fetching)\n"
+        
+        return context
+
+    async def execute_action(self, state: ConversationState, action: str, args: Dict[str, Any]):
+        """Execute a decided tool action and set ai_response/route on the state"""
+        messages = state.get("messages", [])
+        last_message = messages[-1]["content"] if messages else ""
+        
+        # Execute Tools (Logic handled here for simplicity in this agent)
+        # Dynamic imports to avoid circular deps if any
+        from tools.database_tools import (
+            search_products, update_address, clear_wishlist, clear_cart, 
+            create_order_from_cart, execute_nlp_action, update_cart_quantity,
+            get_user_context, get_user_orders, wishlist_to_order, wishlist_to_cart
+        )
+        from tools.email_tools import send_escalation_email
+        
+        state["route"] = "ai_response" # Default
+        
+        if action == "search_products":
+            # Products were already retrieved by KnowledgeAgent, just use them
+            products = state.get("retrieved_products", [])
+            print(f"DEBUG Decision Agent: Using {len(products)} products from state")
+            if products:
+                state["ai_response"] = f"I found {len(products)} timepieces matching your request."
+            else:
+                # Graceful fallback for no results
+                state["ai_response"] = (
+                    "I couldn't find any watches matching that exact description efficiently. "
+                    "Could you try broadening your search? For example, try searching for just the brand or a style like 'Sport' or 'Dress'."
+                )
+                
+        elif action in ["add_to_cart", "update_cart_quantity", "add_to_wishlist"]:
+            # Use NLP-action endpoint for autonomous execution
+            user_id = state.get("user_id")
+            if user_id:
+                result = await execute_nlp_action(
+                    user_message=last_message,
+                    user_id=user_id,
+                    conversation_context=build_window(messages, "actions"),
+                    retrieved_products=state.get("retrieved_products", [])
+                )
+                if result.get("success"):
+                    state["ai_response"] = result.get("message", "Done!")
+                else:
+                    state["ai_response"] = f"I couldn't complete that action: {result.get('error', 'Unknown error')}"
+            else:
+                state["ai_response"] = "Please login to manage your cart and wishlist."
+
+        elif action == "update_address":
+            user_id = state.get("user_id")
+            if user_id:
+                success = await update_address(user_id, args.get("new_address", ""))
+                if success:
+                    state["ai_response"] = f"I've updated your shipping address to: {args.get('new_address')}"
+                else:
+                    state["ai_response"] = "I encountered an error updating your address."
+            else:
+                state["ai_response"] = "I need you to be logged in to update your address."
+
+        elif action == "create_order":
+            user_id = state.get("user_id")
+            if user_id:
+                result = await create_order_from_cart(user_id)
+                state["ai_response"] = result.get("message", "Order placed successfully.")
+            else:
+                state["ai_response"] = "Please login to place an order."
+                
+        elif action == "clear_wishlist":
+            user_id = state.get("user_id")
+            if user_id:
+                await clear_wishlist(user_id)
+                state["ai_response"] = "Your wishlist has been cleared."
+            else:
+                state["ai_response"] = "Please login to manage your wishlist."
+
+        elif action == "clear_cart":
+            user_id = state.get("user_id")
+            if user_id:
+                success = await clear_cart(user_id)
+                if success:
+                    state["ai_response"] = "I've emptied your cart."
+                else:
+                    state["ai_response"] = "I encountered an error clearing your cart."
+            else:
+                state["ai_response"] = "Please login to manage your cart."
+        
+        elif action == "get_orders":
+            user_id = state.get("user_id")
+            if user_id:
+                orders = await get_user_orders(user_id)
+                if orders:
+
+                    try:
+                        order_lines = []
+                        for o in orders[:5]:
+                            date_str = o.get('createdAt', '').split('T')[0]
+                            total = f"${o.get('total', 0):.2f}"
+                            items_desc = ", ".join([f"{i['quantity']}x {i.get('watch', {}).get('name', 'Watch')}" for i in o.get('items', [])])
+                            order_lines.append(f"**Order #{o['id'].split('-')[0]}** ({date_str}) - {total}\n   *Items: {items_desc}*")
+                        
+                        order_summary = "\n\n".join(order_lines)
+                        state["ai_response"] = f"Here are your recent orders:\n\n{order_summary}"
+                    except Exception as e:
+                        print(f"Error formatting orders: {e}")
+                        state["ai_response"] = "Here are your orders (raw data): " + str(orders[:3])
+                else:
+                    state["ai_response"] = "You don't have any past orders."
+            else:
+                state["ai_response"] = "Please login to view your orders."
+        
+        elif action == "wishlist_to_order":
+            user_id = state.get("user_id")
+            if user_id:
+                result = await wishlist_to_order(user_id)
+                state["ai_response"] = result.get("message", "Processed your wishlist order.")
+            else:
+                state["ai_response"] = "Please login to place an order."
+        
+        elif action == "wishlist_to_cart":
+            user_id = state.get("user_id")
+            if user_id:
+                result = await wishlist_to_cart(user_id)
+                state["ai_response"] = result.get("message", "Moved items to cart.")
+            else:
+                state["ai_response"] = "Please login to manage your list."
+        
+        elif action == "escalate_to_human":
+            # Explicit handler for escalation action from LLM
+            state["route"] = "escalate"
+            state["ai_response"] = "I understand your frustration. I'm connecting you with a human agent."
+
+        elif action == "request_consultation":
+            state["route"] = "consultation"
+            state["consultation_active"] = True
+            state["ai_response"] = "I see you're looking for something specific. Let me help you find the perfect watch."
+        
+        else:
+            # direct_response
+            state["ai_response"] = args.get("response", "How can I help you regarding our luxury watches?")
+
+
 def create_decision_agent(llm: ChatGroq, confidence_threshold: float = 0.5) -> DecisionMakingAgent:
     """Factory function to create decision agent"""
     return DecisionMakingAgent(llm, confidence_threshold)
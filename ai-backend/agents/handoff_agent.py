@@ -5,6 +5,7 @@ from langchain_groq import ChatGroq
 from langchain.prompts import ChatPromptTemplate
 from workflow.state import ConversationState
 from utils.groq_prompts import HANDOFF_SUMMARY_PROMPT
+from utils.context_window import build_window, format_history
 import json
 import re
 from datetime import datetime
@@ -108,15 +109,8 @@ class HumanHandoffAgent:
         return state
     
     def _format_chat_history(self, messages: list) -> str:
-        """Format full chat history for handoff"""
-        formatted = []
-        for msg in messages:
-            sender = msg.get("sender", "unknown").upper()
-            content = msg.get("content", "")
-            timestamp = msg.get("timestamp", "")
-            formatted.append(f"[{timestamp}] {sender}: {content}")
-        
-        return "\n".join(formatted)
+        """Format chat history for handoff (newest messages within the token budget)"""
+        return format_history(build_window(messages, "handoff"), timestamps=True)
     
     def _parse_handoff_response(self, response: str) -> Dict[str, Any]:
         """Parse Groq handoff summary response"""
@@ -1,19 +1,27 @@
 """Agent 1: Website Interaction Agent - Entry point and query routing"""
 
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from langchain_groq import ChatGroq
 from langchain.prompts import ChatPromptTemplate
 from workflow.state import ConversationState
 from utils.groq_prompts import INTENT_CLASSIFICATION_PROMPT
+from utils.intent_classifier import LocalIntentClassifier, VALID_INTENTS
+from utils.llm_scheduler import LLMScheduler
+from config import settings
 import json
 
 
 class WebsiteInteractionAgent:
     """Entry point for all user queries - validates and routes to appropriate agents"""
     
-    def __init__(self, llm: ChatGroq):
+    def __init__(self, llm: ChatGroq, scheduler: Optional[LLMScheduler] = None):
         self.llm = llm
+        self.scheduler = scheduler
         self.prompt = ChatPromptTemplate.from_template(INTENT_CLASSIFICATION_PROMPT)
+        self.local_classifier = (
+            LocalIntentClassifier(settings.intent_confidence_threshold)
+            if settings.local_intent_classifier else None
+        )
     
     async def process(self, state: ConversationState) -> Dict[str, Any]:
         """
@@ -32,28 +40,27 @@ class WebsiteInteractionAgent:
         latest_message = state["messages"][-1]
         user_message = latest_message["content"]
         
+        # Try the local fast path first
+        tier = "llm"
+        intent = None
+        if self.local_classifier:
+            intent, confidence, tier = self.local_classifier.classify(user_message)
+        
         # Classify intent using Groq
         try:
-            chain = self.prompt | self.llm
-            response = await chain.ainvoke({"user_message": user_message})
-            intent = response.content.strip().lower()
+            if intent is None:
+                if self.local_classifier:
+                    self.local_classifier.record_llm_fallback()
+                inputs = {"user_message": user_message}
+                if self.scheduler:
+                    content = await self.scheduler.batched(self.llm, "intent", self.prompt, inputs)
+                else:
+                    chain = self.prompt | self.llm
+                    content = (await chain.ainvoke(inputs)).content
+                intent = content.strip().lower()
             
             # Validate intent
-            valid_intents = [
-                "product_inquiry",
-                "order_tracking",
-                "account_support",
-                "pricing",
-                "technical_issue",
-                "general_chat",
-                "purchase",
-                "cart_management",
-                "consultation",
-                "refund_request",
-                "human_handoff"
-            ]
-            
-            if intent not in valid_intents:
+            if intent not in VALID_INTENTS:
                 intent = "general_chat"
             
             # Update state
@@ -86,7 +93,7 @@ class WebsiteInteractionAgent:
             else:
                 state["route"] = "knowledge"
             
-            print(f"✓ Intent classified: {intent}")
+            print(f"✓ Intent classified: {intent} ({tier})")
             
         except Exception as e:
             print(f"✗ Intent classification error: {e}")
@@ -96,6 +103,6 @@ class WebsiteInteractionAgent:
         return state
 
 
-def create_interaction_agent(llm: ChatGroq) -> WebsiteInteractionAgent:
+def create_interaction_agent(llm: ChatGroq, scheduler: Optional[LLMScheduler] = None) -> WebsiteInteractionAgent:
     """Factory function to create interaction agent"""
-    return WebsiteInteractionAgent(llm)
+    return WebsiteInteractionAgent(llm, scheduler)
@@ -5,7 +5,10 @@ from langchain_groq import ChatGroq
 from langchain.prompts import ChatPromptTemplate
 from workflow.state import ConversationState
 from utils.groq_prompts import PRODUCT_EXPERTISE_PROMPT
+from utils.context_window import build_window, format_history
 from utils.vector_store import vector_store
+from utils.streaming import generate
+from utils.speculation import product_speculator
 import json
 
 
@@ -15,6 +18,9 @@ class KnowledgeRetrievalAgent:
     def __init__(self, llm: ChatGroq):
         self.llm = llm
         self.prompt = ChatPromptTemplate.from_template(PRODUCT_EXPERTISE_PROMPT)
+        # The decision agent currently produces the final answer after this
+        # agent, so its generation is not streamed to the user by default
+        self.stream_response = False
     
     async def process(self, state: ConversationState) -> Dict[str, Any]:
         """
@@ -33,12 +39,9 @@ class KnowledgeRetrievalAgent:
         user_query = latest_message["content"]
         
         try:
-            # Get recent conversation context (last 5 messages)
-            recent_messages = state.get("messages", [])[-5:]
-            conversation_context = "\n".join([
-                f"{msg.get('sender', 'unknown').upper()}: {msg.get('content', '')}"
-                for msg in recent_messages[:-1]  # Exclude current message
-            ])
+            # Get recent conversation context within the token budget (excluding current message)
+            recent_messages = build_window(state.get("messages", [])[:-1], "knowledge")
+            conversation_context = format_history(recent_messages)
             
             # Use LLM to extract structured search parameters with conversation context
             extraction_prompt = f"""Analyze this watch search query and extract search parameters as JSON.
@@ -96,38 +99,20 @@ If nothing specific found, return: {{"intent": "general"}}"""
             search_params = json.loads(params_text)
             print(f"DEBUG: Extracted search params: {search_params}")
 
-            # Retrieve relevant products from database
-            from tools.database_tools import search_products_with_params
-            retrieved_docs = await search_products_with_params(search_params, limit=10)
+            # Retrieve relevant products, reusing the speculative lookup when it matches
+            retrieved_docs = await product_speculator.claim(search_params, limit=10)
+            if retrieved_docs is None:
+                from tools.database_tools import search_products_with_params
+                retrieved_docs = await search_products_with_params(search_params, limit=10)
             print(f"DEBUG: Retrieved {len(retrieved_docs)} products")
             
-            # Format product information
-            product_context = self._format_products(retrieved_docs)
-            
-            # Get user order history (placeholder - would query database)
-            order_history = "No previous orders"
-            
             # Generate response using Groq
-            chain = self.prompt | self.llm
-            response = await chain.ainvoke({
-                "retrieved_products": product_context,
-                "user_order_history": order_history,
-                "user_query": user_query,
-                "user_details": state.get("user_profile", "Anonymous User")
-            })
+            state["ai_response"] = await self.answer(state, retrieved_docs, user_query, self.stream_response)
             
             # Update state
-            state["retrieved_products"] = retrieved_docs
-            state["retrieval_score"] = 0.9 if retrieved_docs else 0.0
-            state["ai_response"] = response.content
+            self.apply_retrieval(state, retrieved_docs)
             state["agent_type"] = "knowledge"
             
-            # Extract entities from products
-            if retrieved_docs:
-                top_product = retrieved_docs[0]
-                state["extracted_entities"]["watch_model"] = top_product.get("name")
-                state["extracted_entities"]["brand"] = top_product.get("brand")
-            
             print(f"✓ Retrieved {len(retrieved_docs)} products, score: {state['retrieval_score']:.2f}")
             
         except Exception as e:
@@ -137,6 +122,40 @@ If nothing specific found, return: {{"intent": "general"}}"""
         
         return state
     
+    async def answer(
+        self,
+        state: ConversationState,
+        products: List[Dict[str, Any]],
+        user_query: str,
+        stream: bool = True
+    ) -> str:
+        """Generate a grounded answer about the retrieved products"""
+        # Format product information
+        product_context = self._format_products(products)
+        
+        # Get user order history (placeholder - would query database)
+        order_history = "No previous orders"
+        
+        chain = self.prompt | self.llm
+        response = await generate(chain, {
+            "retrieved_products": product_context,
+            "user_order_history": order_history,
+            "user_query": user_query,
+            "user_details": state.get("user_profile", "Anonymous User")
+        }, "knowledge", stream=stream)
+        return response.content
+    
+    def apply_retrieval(self, state: ConversationState, products: List[Dict[str, Any]]):
+        """Store retrieved products, retrieval score and product entities on the state"""
+        state["retrieved_products"] = products
+        state["retrieval_score"] = 0.9 if products else 0.0
+        
+        # Extract entities from products
+        if products:
+            top_product = products[0]
+            state["extracted_entities"]["watch_model"] = top_product.get("name")
+            state["extracted_entities"]["brand"] = top_product.get("brand")
+    
     def _format_products(self, products: List[Dict[str, Any]]) -> str:
         """Format product data for prompt context"""
         if not products:
@@ -1,18 +1,33 @@
 """Agent 3: Context & Memory Agent - Conversation state and history management"""
 
-from typing import Dict, Any
+from typing import Dict, Any, List
 from langchain_groq import ChatGroq
 from langchain.prompts import ChatPromptTemplate
 from workflow.state import ConversationState
-from utils.groq_prompts import CONVERSATION_SUMMARY_PROMPT
+from config import settings
+from utils.context_window import build_window, format_history, window_tokens
+from utils.groq_prompts import CONVERSATION_SUMMARY_PROMPT, INCREMENTAL_SUMMARY_PROMPT
+
+
+# Stand-ins shown to other agents; never fed back as a summary to extend
+SUMMARY_NOT_STARTED = "Conversation just started."
+SUMMARY_UNAVAILABLE = "Unable to generate summary."
 
 
 class ContextMemoryAgent:
-    """Manages conversation context and generates summaries"""
+    """
+    Maintains a rolling conversation summary. Only the previous summary and
+    the messages after its high-water mark are sent to the model, and only
+    every `refresh_turns` user turns or once those messages exceed
+    `token_budget`, so prompt size stays flat as conversations grow.
+    """
     
-    def __init__(self, llm: ChatGroq):
+    def __init__(self, llm: ChatGroq, refresh_turns: int = 3, token_budget: int = 500):
         self.llm = llm
+        self.refresh_turns = refresh_turns
+        self.token_budget = token_budget
         self.prompt = ChatPromptTemplate.from_template(CONVERSATION_SUMMARY_PROMPT)
+        self.incremental_prompt = ChatPromptTemplate.from_template(INCREMENTAL_SUMMARY_PROMPT)
     
     async def process(self, state: ConversationState) -> Dict[str, Any]:
         """
@@ -20,49 +35,72 @@ class ContextMemoryAgent:
         
         Args:
             state: Current conversation state
-            
+        
         Returns:
-            Updated state with conversation summary
+            Updated state with conversation summary and its high-water mark
         """
         messages = state.get("messages", [])
+        summary = state.get("conversation_summary", "")
+        if summary in (SUMMARY_NOT_STARTED, SUMMARY_UNAVAILABLE):
+            summary = ""
+        offset = state.get("message_offset", 0)
+        watermark = state.get("summary_watermark", 0)
+        state["agent_type"] = "memory"
         
         # Only generate summary if we have enough messages
-        if len(messages) < 3:
-            state["conversation_summary"] = "Conversation just started."
-            state["agent_type"] = "memory"
+        if not summary and len(messages) < 3:
+            state["conversation_summary"] = SUMMARY_NOT_STARTED
+            state["summary_watermark"] = watermark
+            return state
+        
+        # Messages not yet folded into the summary (all of them if the mark fell out of the window)
+        start = max(0, watermark - offset)
+        new_messages = messages[start:]
+        if not self._needs_refresh(summary, new_messages):
+            state["conversation_summary"] = summary
+            state["summary_watermark"] = watermark
             return state
         
         try:
-            # Format chat history
-            chat_history = self._format_chat_history(messages)
+            # Oldest unsummarized messages first; any that do not fit stay
+            # above the mark and are folded in by the next refresh
+            window = build_window(new_messages, "memory", oldest_first=True)
+            chat_history = format_history(window)
             
             # Generate summary using Groq
-            chain = self.prompt | self.llm
-            response = await chain.ainvoke({"chat_history": chat_history})
+            if summary:
+                chain = self.incremental_prompt | self.llm
+                response = await chain.ainvoke({"conversation_summary": summary, "new_messages": chat_history})
+            else:
+                chain = self.prompt | self.llm
+                response = await chain.ainvoke({"chat_history": chat_history})
             
             # Update state
             state["conversation_summary"] = response.content
-            state["agent_type"] = "memory"
-            
-            print(f"✓ Conversation summary updated ({len(messages)} messages)")
+            state["summary_watermark"] = offset + start + len(window)
             
+            print(f"✓ Conversation summary updated (+{len(window)} of {len(new_messages)} messages)")
+        
         except Exception as e:
             print(f"✗ Memory agent error: {e}")
-            state["conversation_summary"] = "Unable to generate summary."
+            # Keep the previous summary; its mark is unchanged so the next refresh catches up
+            state["conversation_summary"] = summary or SUMMARY_UNAVAILABLE
+            state["summary_watermark"] = watermark
         
         return state
     
-    def _format_chat_history(self, messages: list) -> str:
-        """Format messages for summary generation"""
-        formatted = []
-        for msg in messages[-10:]:  # Last 10 messages
-            sender = msg.get("sender", "unknown").upper()
-            content = msg.get("content", "")
-            formatted.append(f"{sender}: {content}")
-        
-        return "\n".join(formatted)
+    def _needs_refresh(self, summary: str, new_messages: List[Dict[str, Any]]) -> bool:
+        """First summary, `refresh_turns` new user turns, or new messages over the token budget (as windowed)"""
+        if not new_messages:
+            return False
+        if not summary:
+            return True
+        user_turns = sum(1 for msg in new_messages if msg.get("sender") == "user")
+        if user_turns >= self.refresh_turns:
+            return True
+        return window_tokens(new_messages) > self.token_budget
 
 
 def create_memory_agent(llm: ChatGroq) -> ContextMemoryAgent:
     """Factory function to create memory agent"""
-    return ContextMemoryAgent(llm)
+    return ContextMemoryAgent(llm, settings.summary_refresh_turns, settings.summary_token_budget)
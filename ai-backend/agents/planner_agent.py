@@ -0,0 +1,132 @@
+"""Agent 9: Planner Agent - Single structured call for product search and tool action"""
+
+from typing import Dict, Any, Optional
+from langchain_groq import ChatGroq
+from workflow.state import ConversationState
+from utils.groq_prompts import RESPONSE_PLAN_PROMPT
+from utils.context_window import build_window, format_history
+from utils.streaming import generate
+from utils.speculation import product_speculator
+from utils.rate_limit import LLMUnavailableError, unavailable_message
+from agents.knowledge_agent import KnowledgeRetrievalAgent
+from agents.decision_agent import DecisionMakingAgent
+import json
+import re
+
+
+class PlannerAgent:
+    """
+    Replaces the knowledge -> decision double generation with one structured
+    call returning search parameters and the tool action together. A second
+    call writes a grounded product answer only when the plan asks for one.
+    """
+
+    def __init__(
+        self,
+        llm: ChatGroq,
+        knowledge_agent: KnowledgeRetrievalAgent,
+        decision_agent: DecisionMakingAgent
+    ):
+        self.llm = llm
+        self.knowledge_agent = knowledge_agent
+        self.decision_agent = decision_agent
+
+    async def process(self, state: ConversationState) -> Dict[str, Any]:
+        """
+        Plan and execute the response for a standard turn
+
+        Args:
+            state: Current conversation state
+
+        Returns:
+            Updated state with retrieved products, AI response and route
+        """
+        messages = state.get("messages", [])
+        if not messages:
+            return state
+
+        last_message = messages[-1]["content"]
+        conversation_context = format_history(build_window(messages[:-1], "planner"))
+        context = await self.decision_agent.build_context(state)
+
+        prompt = RESPONSE_PLAN_PROMPT.format(
+            conversation_context=conversation_context or "No previous conversation",
+            context=context,
+            user_message=last_message
+        )
+
+        try:
+            print(f"DEBUG Planner: Processing message: '{last_message}'")
+            response = await generate(self.llm, prompt, "planner", json_fields=["response"])
+            plan = self._parse_plan(response.content)
+            if plan is None:
+                raise ValueError("Could not parse JSON from response")
+
+            search_params = plan.get("search")
+            action = plan.get("action") or "direct_response"
+            args = plan.get("arguments") or {}
+            print(f"DEBUG Planner: search={search_params} action={action} answer={plan.get('answer_needed')}")
+
+            if state.get("metadata") is None:
+                state["metadata"] = {}
+            state["metadata"]["plan"] = {
+                "search": search_params,
+                "action": action,
+                "answer_needed": bool(plan.get("answer_needed"))
+            }
+
+            if isinstance(search_params, dict) and search_params:
+                products = await product_speculator.claim(search_params, limit=10)
+                if products is None:
+                    from tools.database_tools import search_products_with_params
+                    products = await search_products_with_params(search_params, limit=10)
+                self.knowledge_agent.apply_retrieval(state, products)
+                print(f"✓ Retrieved {len(products)} products")
+
+            await self.decision_agent.execute_action(state, action, args)
+
+            # Grounded answer only when the plan needs one and there is something to ground it in
+            products = state.get("retrieved_products", [])
+            if action == "search_products" and plan.get("answer_needed") and products:
+                state["ai_response"] = await self.knowledge_agent.answer(state, products, last_message)
+
+            state["agent_type"] = "planner"
+            state["ai_confidence"] = 1.0
+
+        except Exception as e:
+            error_msg = str(e)
+            print(f"✗ Planner error: {error_msg}")
+
+            if isinstance(e, LLMUnavailableError):
+                state["ai_response"] = unavailable_message(e)
+            elif "Rate limit" in error_msg or "429" in error_msg:
+                state["ai_response"] = "I apologize, but I'm currently at maximum capacity (Rate Limit Reached). Please try again in about 15 minutes."
+            else:
+                state["ai_response"] = "I apologize, I'm having temporary trouble processing your request."
+            state["route"] = "ai_response"
+
+        return state
+
+    def _parse_plan(self, content: str) -> Optional[Dict[str, Any]]:
+        """Parse the plan JSON, tolerating code fences and surrounding text"""
+        content = content.replace("```json", "").replace("```", "").strip()
+        try:
+            plan = json.loads(content)
+        except json.JSONDecodeError:
+            json_match = re.search(r'\{.*\}', content, re.DOTALL)
+            if not json_match:
+                return None
+            try:
+                plan = json.loads(json_match.group())
+            except json.JSONDecodeError:
+                return None
+        return plan if isinstance(plan, dict) else None
+
+
+def create_planner_agent(
+    llm: ChatGroq,
+    knowledge_agent: KnowledgeRetrievalAgent,
+    decision_agent: DecisionMakingAgent
+) -> PlannerAgent:
+    """Factory function to create planner agent"""
+    return PlannerAgent(llm, knowledge_agent, decision_agent)
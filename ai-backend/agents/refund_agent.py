@@ -3,6 +3,8 @@
 from typing import Dict, Any
 from langchain_groq import ChatGroq
 from workflow.state import ConversationState
+from utils.streaming import generate
+from utils.phrase_matcher import phrase_matcher
 import json
 import re
 from datetime import datetime, timedelta
@@ -129,7 +131,7 @@ class RefundAgent:
         
         try:
             print(f"DEBUG Refund Agent: Processing message: '{last_message}'")
-            response = await self.llm.ainvoke(formatted_prompt)
+            response = await generate(self.llm, formatted_prompt, "refund_agent", json_fields=["response_text"])
             content = response.content.strip()
             
             # Safe Fallback Defaults
@@ -184,7 +186,7 @@ class RefundAgent:
                         state["refund_active"] = False
                         
                         # Optionally offer escalation
-                        if "defective" in last_message.lower() or "damaged" in last_message.lower():
+                        if "product_defect" in phrase_matcher.categories(last_message):
                             response_text += "\n\nWould you like me to connect you with our warranty team?"
                         
                         if state.get("metadata") is None:
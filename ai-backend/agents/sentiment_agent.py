@@ -1,24 +1,59 @@
 """Agent 4: Sentiment & Friction Detection Agent - User satisfaction monitoring"""
 
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from langchain_groq import ChatGroq
 from langchain.prompts import ChatPromptTemplate
 from workflow.state import ConversationState
 from utils.groq_prompts import SENTIMENT_ANALYSIS_PROMPT
+from utils.context_window import truncate_text
+from utils.llm_scheduler import LLMScheduler
+from utils.sentiment_lexicon import LexiconSentimentScorer
+from utils.phrase_matcher import phrase_matcher
+from config import settings
 import json
 import re
 
 
+# Intents kept in the running state for the repeated-question check
+INTENT_HISTORY_SIZE = 5
+# Intents that naturally repeat across turns (multi-turn flows, small talk)
+REPEATABLE_INTENTS = {"", "general_chat", "consultation", "refund_request", "human_handoff"}
+
+
+def initial_sentiment_state(score: float = 0.0) -> Dict[str, Any]:
+    """Running per-session sentiment state, persisted between turns"""
+    return {"score": score, "turns": 0, "negative_turns": 0, "intents": []}
+
+
+def record_intent(sentiment_state: Dict[str, Any], intent: str) -> Dict[str, Any]:
+    """Append the turn's classified intent to the running state"""
+    if not intent:
+        return sentiment_state
+    intents = (sentiment_state.get("intents") or []) + [intent]
+    return {**sentiment_state, "intents": intents[-INTENT_HISTORY_SIZE:]}
+
+
 class SentimentDetectionAgent:
-    """Monitors user sentiment and detects friction signals"""
+    """
+    Monitors user sentiment and detects friction signals. Only the newest
+    message is scored; cumulative frustration comes from the running
+    state (an exponentially weighted score and negative-turn count).
+    """
     
-    def __init__(self, llm: ChatGroq):
+    def __init__(self, llm: ChatGroq, scheduler: Optional[LLMScheduler] = None, ewma_alpha: float = 0.5):
         self.llm = llm
+        self.ewma_alpha = ewma_alpha
+        self.scheduler = scheduler
         self.prompt = ChatPromptTemplate.from_template(SENTIMENT_ANALYSIS_PROMPT)
-        self.frustration_keywords = [
-            "frustrated", "angry", "terrible", "awful", "useless",
-            "worst", "horrible", "disappointed", "annoyed", "upset"
-        ]
+        self.frustration_keywords = phrase_matcher.phrases("frustration")
+        self.local_scorer = (
+            LexiconSentimentScorer(
+                self.frustration_keywords,
+                settings.escalation_sentiment_threshold,
+                settings.sentiment_ambiguity_margin
+            )
+            if settings.local_sentiment_scorer else None
+        )
     
     async def process(self, state: ConversationState) -> Dict[str, Any]:
         """
@@ -35,34 +70,47 @@ class SentimentDetectionAgent:
         
         latest_message = state["messages"][-1]
         user_message = latest_message["content"]
-        previous_sentiment = state.get("sentiment_score", 0.0)
-        conversation_summary = state.get("conversation_summary", "")
+        running = state.get("sentiment_state") or initial_sentiment_state(state.get("sentiment_score", 0.0))
         
         try:
-            # Format recent history (last 10 messages)
-            recent_msgs = state["messages"][-10:]
-            history_text = "\n".join([f"{m['sender']}: {m['content']}" for m in recent_msgs])
+            # Try the local scorer first; the LLM only judges ambiguous messages
+            sentiment_data = None
+            if self.local_scorer:
+                sentiment_data = self.local_scorer.score(user_message)
+                if sentiment_data["ambiguous"]:
+                    self.local_scorer.record_llm_escalation()
+                    sentiment_data = None
             
-            # Analyze sentiment using Groq
-            chain = self.prompt | self.llm
-            response = await chain.ainvoke({
-                "user_message": user_message,
-                "chat_history": history_text
-            })
+            if sentiment_data is None:
+                # Analyze sentiment using Groq (current message plus running state)
+                inputs = {
+                    "user_message": user_message,
+                    "conversation_state": self._format_running_state(state, running)
+                }
+                if self.scheduler:
+                    content = await self.scheduler.batched(self.llm, "sentiment", self.prompt, inputs)
+                else:
+                    chain = self.prompt | self.llm
+                    content = (await chain.ainvoke(inputs)).content
+                
+                # Parse JSON response
+                sentiment_data = self._parse_sentiment_response(content)
             
-            # Parse JSON response
-            sentiment_data = self._parse_sentiment_response(response.content)
+            # Fold this message into the running state
+            message_score = float(sentiment_data.get("sentiment_score", 0.0))
+            running = self._update_running_state(running, message_score)
             
             # Update state
-            state["sentiment_score"] = sentiment_data.get("sentiment_score", 0.0)
-            state["frustration_level"] = sentiment_data.get("frustration_level", "low")
+            state["sentiment_state"] = running
+            state["sentiment_score"] = running["score"]
+            state["frustration_level"] = self._frustration_level(sentiment_data.get("frustration_level", "low"), running)
             state["agent_type"] = "sentiment"
             
             # Detect friction signals
             friction_signals = self._detect_friction(state, sentiment_data)
             state["escalation_signals"] = friction_signals
             
-            print(f"✓ Sentiment: {state['sentiment_score']:.2f}, Signals: {len(friction_signals)}")
+            print(f"✓ Sentiment: {state['sentiment_score']:.2f} (message {message_score:.2f}), Signals: {len(friction_signals)}")
             
         except Exception as e:
             print(f"✗ Sentiment analysis error: {e}")
@@ -71,6 +119,48 @@ class SentimentDetectionAgent:
         
         return state
     
+    def _update_running_state(self, running: Dict[str, Any], message_score: float) -> Dict[str, Any]:
+        """Exponentially weighted score; the first turn takes the message score as is"""
+        turns = running.get("turns", 0)
+        score = message_score if turns == 0 else (
+            self.ewma_alpha * message_score + (1 - self.ewma_alpha) * running.get("score", 0.0)
+        )
+        negative = message_score < settings.escalation_sentiment_threshold
+        return {
+            **running,
+            "score": round(score, 3),
+            "turns": turns + 1,
+            "negative_turns": running.get("negative_turns", 0) + (1 if negative else 0)
+        }
+    
+    def _frustration_level(self, message_level: str, running: Dict[str, Any]) -> str:
+        """The message's level, raised by repeated negative turns"""
+        levels = ["low", "medium", "high"]
+        level = levels.index(message_level) if message_level in levels else 0
+        negative_turns = running.get("negative_turns", 0)
+        if negative_turns >= 3:
+            level = max(level, 2)
+        elif negative_turns >= 2:
+            level = max(level, 1)
+        return levels[level]
+    
+    def _format_running_state(self, state: ConversationState, running: Dict[str, Any]) -> str:
+        """Compact context for the LLM instead of the raw history"""
+        lines = []
+        if running.get("turns"):
+            lines.append(
+                f"Running sentiment: {running.get('score', 0.0):.2f} over {running['turns']} turns "
+                f"({running.get('negative_turns', 0)} negative)"
+            )
+        if running.get("intents"):
+            lines.append(f"Recent intents: {', '.join(running['intents'])}")
+        previous_reply = next(
+            (m.get("content", "") for m in reversed(state["messages"][:-1]) if m.get("sender") == "ai"), ""
+        )
+        if previous_reply:
+            lines.append(f"Last AI reply: {truncate_text(previous_reply, 80)}")
+        return "\n".join(lines) or "No previous turns"
+    
     def _parse_sentiment_response(self, response: str) -> Dict[str, Any]:
         """Parse Groq sentiment response"""
         try:
@@ -101,33 +191,43 @@ class SentimentDetectionAgent:
         """Detect friction signals in conversation"""
         signals = []
         
-        from config import settings
         # Check sentiment score
         if state["sentiment_score"] < settings.escalation_sentiment_threshold:
             signals.append("negative_sentiment")
         
-        # Check for frustration keywords
-        latest_message = state["messages"][-1]["content"].lower()
-        if any(keyword in latest_message for keyword in self.frustration_keywords):
+        # Check for frustration keywords and explicit requests for a human (one pass)
+        categories = phrase_matcher.categories(state["messages"][-1]["content"])
+        if "frustration" in categories:
             signals.append("frustration_keywords")
+        if "escalation" in categories:
+            signals.append("human_requested")
         
-        # Check for repeated queries (same intent multiple times)
-        if len(state["messages"]) >= 6:
-            recent_intents = [state.get("user_intent", "")] * 3
-            if len(set(recent_intents)) == 1:
-                signals.append("repeated_questions")
+        # Check for repeated queries (same intent three turns running). In
+        # parallel mode this turn's intent is not known yet, so only stored
+        # turns count.
+        intents = list((state.get("sentiment_state") or {}).get("intents") or [])
+        if state.get("user_intent"):
+            intents.append(state["user_intent"])
+        recent_intents = intents[-3:]
+        if len(recent_intents) == 3 and len(set(recent_intents)) == 1 and recent_intents[0] not in REPEATABLE_INTENTS:
+            signals.append("repeated_questions")
         
         # Check AI confidence
-        if state.get("retrieval_score", 1.0) < 0.3:
-            signals.append("low_confidence_retrieval")
-        
+        signals.extend(self.detect_retrieval_friction(state))
+
         # Check escalation recommendation from sentiment analysis
         if sentiment_data.get("escalation_recommended", "no").lower() == "yes":
             signals.append("ai_recommended_escalation")
-        
+
         return signals
 
+    def detect_retrieval_friction(self, state: ConversationState) -> List[str]:
+        """Detect friction caused by poor product retrieval"""
+        if state.get("retrieval_score", 1.0) < 0.3:
+            return ["low_confidence_retrieval"]
+        return []
+
 
-def create_sentiment_agent(llm: ChatGroq) -> SentimentDetectionAgent:
+def create_sentiment_agent(llm: ChatGroq, scheduler: Optional[LLMScheduler] = None) -> SentimentDetectionAgent:
     """Factory function to create sentiment agent"""
-    return SentimentDetectionAgent(llm)
+    return SentimentDetectionAgent(llm, scheduler, settings.sentiment_ewma_alpha)
@@ -0,0 +1,99 @@
+"""Benchmark: IVF-flat approximate search vs exact search
+
+Builds an embedding store per collection size from synthetic products
+(see benchmarks.vector_search), then reports recall@k of the IVF index
+against exact search and queries/sec for a range of nprobe settings.
+Recall is tie-aware: a result counts when its score reaches the k-th
+exact score, since many synthetic products embed identically. A final
+pass deletes and re-inserts 10% of the collection and measures recall
+again to show incremental maintenance keeps the index usable.
+
+Usage (from ai-backend/):
+    python -m benchmarks.ann_search [--sizes 10000 100000] [--nprobe 1 4 8 16 32]
+                                    [--queries 200] [--top-k 10]
+"""
+
+import argparse
+import random
+import time
+from typing import List
+
+from benchmarks.vector_search import BRANDS, FEATURES, STYLES, synthetic_products
+from utils.ann_index import IVFFlatIndex
+from utils.vector_store import EMBEDDING_DIM, SimpleVectorStore
+
+
+def recall(exact: List[List[dict]], approximate: List[List[dict]], top_k: int) -> float:
+    hits = total = 0
+    for truth, found in zip(exact, approximate):
+        if not truth:
+            continue
+        threshold = truth[-1]["similarity_score"] - 1e-6
+        hits += min(len(truth), sum(doc["similarity_score"] >= threshold for doc in found))
+        total += len(truth)
+    return hits / total if total else 1.0
+
+
+def timed(search, queries: List[str], top_k: int):
+    started = time.perf_counter()
+    results = [search(query, top_k) for query in queries]
+    return results, len(queries) / (time.perf_counter() - started)
+
+
+def bench(size: int, queries: List[str], top_k: int, nprobes: List[int]):
+    products = synthetic_products(size)
+    exact_store = SimpleVectorStore()
+    exact_store.load_from_products(products)
+    exact, exact_qps = timed(exact_store.search, queries, top_k)
+
+    ann = IVFFlatIndex(EMBEDDING_DIM)
+    store = SimpleVectorStore(ann=ann, ann_min_documents=0)
+    started = time.perf_counter()
+    store.load_from_products(products)
+    build_s = time.perf_counter() - started
+
+    print(f"\n{size} documents, {len(ann.centroids)} cells, build {build_s:.2f}s, exact {exact_qps:,.0f} qps")
+    print(f"{'nprobe':>7}  {'recall@k':>9}  {'qps':>9}  {'speedup':>8}")
+    for nprobe in nprobes:
+        ann.nprobe = nprobe
+        found, qps = timed(store.search, queries, top_k)
+        print(f"{nprobe:>7}  {recall(exact, found, top_k):9.3f}  {qps:9,.0f}  {qps / exact_qps:7.1f}x")
+
+    # Incremental maintenance: delete 10%, insert 10% new, compare against a fresh exact store
+    churn = size // 10
+    started = time.perf_counter()
+    for product in products[:churn]:
+        store.remove_document(product["id"])
+        exact_store.remove_document(product["id"])
+    fresh = [{**product, "id": f"new-{product['id']}"} for product in synthetic_products(churn, seed=99)]
+    for product in fresh:
+        text = f"{product['name']} {product['brand']} {product['description']} {product['category']}"
+        store.add_document(product["id"], text, product)
+        exact_store.add_document(product["id"], text, product)
+    churn_s = time.perf_counter() - started
+    exact, _ = timed(exact_store.search, queries, top_k)
+    found, qps = timed(store.search, queries, top_k)
+    print(f"after {churn} deletes + {churn} inserts ({churn_s:.2f}s, both stores):"
+          f" nprobe={ann.nprobe} recall@k {recall(exact, found, top_k):.3f}, {qps:,.0f} qps")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 8, 16, 32])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    args = parser.parse_args()
+
+    rng = random.Random(11)
+    queries = [
+        f"{rng.choice(BRANDS)} {rng.choice(STYLES).lower()} with {rng.choice(FEATURES)}"
+        for _ in range(args.queries)
+    ]
+    print(f"top_k={args.top_k} queries={args.queries}")
+    for size in args.sizes:
+        bench(size, queries, args.top_k, args.nprobe)
+
+
+if __name__ == "__main__":
+    main()
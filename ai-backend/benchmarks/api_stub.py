@@ -0,0 +1,156 @@
+"""In-process stub of the Next.js /api endpoints used by tools/database_tools.py
+
+The stub is a small FastAPI app served through httpx's ASGI transport, so
+the real tool functions (request building, status handling, JSON parsing)
+run unchanged without a Next.js server or database. Structured search
+applies the same filter and sort rules the Next.js route asks its LLM
+to generate, directly over a JSON catalog built from prisma/seed.ts.
+"""
+
+import asyncio
+import json
+import os
+from collections import defaultdict
+from contextlib import contextmanager
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+from unittest import mock
+
+import httpx
+from fastapi import FastAPI, Request
+
+import tools.database_tools as database_tools
+
+
+CATALOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "catalog.json")
+
+
+def load_catalog(path: str = CATALOG_PATH) -> List[Dict[str, Any]]:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def structured_search(catalog: List[Dict[str, Any]], params: Dict[str, Any], limit: int) -> List[Dict[str, Any]]:
+    """Deterministic version of the search-structured route's query rules"""
+    intent = (params.get("intent") or "general").lower()
+    min_price = params.get("minPrice")
+    max_price = params.get("maxPrice")
+    if min_price is None and max_price is None:
+        if intent == "luxury":
+            min_price = 5000
+        elif intent == "affordable":
+            max_price = 1000
+
+    results = []
+    for watch in catalog:
+        if watch.get("stock", 0) <= 0:
+            continue
+        if params.get("brand") and params["brand"].lower() not in watch["brand"].lower():
+            continue
+        if params.get("model") and params["model"].lower() not in watch["name"].lower():
+            continue
+        if min_price is not None and watch["price"] < float(min_price):
+            continue
+        if max_price is not None and watch["price"] > float(max_price):
+            continue
+        results.append(watch)
+
+    if intent == "luxury":
+        results.sort(key=lambda w: -w["price"])
+    elif intent == "affordable" or min_price is not None or max_price is not None:
+        results.sort(key=lambda w: w["price"])
+
+    return [
+        {key: watch.get(key) for key in ("id", "name", "brand", "price", "originalPrice", "description")}
+        for watch in results[:limit]
+    ]
+
+
+def create_stub_app(catalog: Optional[List[Dict[str, Any]]] = None, latency: float = 0.0) -> FastAPI:
+    """FastAPI app answering the /api routes the backend tools call"""
+    catalog = catalog if catalog is not None else load_catalog()
+    by_id = {watch["id"]: watch for watch in catalog}
+    carts: Dict[str, Dict[str, int]] = defaultdict(dict)
+    wishlists: Dict[str, List[str]] = defaultdict(list)
+    app = FastAPI()
+    app.state.requests = defaultdict(int)
+
+    @app.middleware("http")
+    async def count_and_delay(request: Request, call_next):
+        app.state.requests[f"{request.method} {request.url.path}"] += 1
+        if latency:
+            await asyncio.sleep(latency)
+        return await call_next(request)
+
+    @app.post("/api/products/search-structured")
+    async def search_structured(request: Request):
+        body = await request.json()
+        return {"products": structured_search(catalog, body.get("params") or {}, body.get("limit", 10))}
+
+    @app.post("/api/products/search")
+    async def search(request: Request):
+        query = ((await request.json()).get("query") or "").lower()
+        words = [word for word in query.split() if len(word) > 2]
+        matches = [w for w in catalog if any(word in f"{w['brand']} {w['name']} {w['description']}".lower() for word in words)]
+        return {"products": matches[:5]}
+
+    @app.get("/api/cart")
+    async def get_cart(userId: str = ""):
+        items = [{"watch": by_id[watch_id], "quantity": qty} for watch_id, qty in carts[userId].items()]
+        return {"items": items}
+
+    @app.post("/api/cart/add")
+    async def add_to_cart(request: Request):
+        body = await request.json()
+        cart = carts[body.get("userId", "")]
+        cart[body["watchId"]] = cart.get(body["watchId"], 0) + body.get("quantity", 1)
+        return {"success": True}
+
+    @app.delete("/api/cart/clear")
+    async def clear_cart(userId: str = ""):
+        carts[userId].clear()
+        return {"success": True}
+
+    @app.get("/api/wishlist")
+    async def get_wishlist(userId: str = ""):
+        return {"items": [{"watch": by_id[watch_id]} for watch_id in wishlists[userId]]}
+
+    @app.post("/api/wishlist")
+    async def add_to_wishlist(request: Request):
+        body = await request.json()
+        wishlists[body.get("userId", "")].append(body["watchId"])
+        return {"success": True}
+
+    @app.get("/api/orders")
+    async def get_orders(userId: str = ""):
+        return {"orders": []}
+
+    @app.post("/api/actions/execute-nlp-action")
+    async def execute_nlp_action(request: Request):
+        body = await request.json()
+        user_id = body.get("userId", "")
+        products = body.get("retrievedProducts") or []
+        message = (body.get("userMessage") or "").lower()
+        if "wishlist" in message and products:
+            wishlists[user_id].append(products[0]["id"])
+            return {"success": True, "message": f"Added {products[0]['name']} to your wishlist."}
+        if products:
+            cart = carts[user_id]
+            cart[products[0]["id"]] = cart.get(products[0]["id"], 0) + 1
+            return {"success": True, "message": f"Added {products[0]['name']} to your cart."}
+        return {"success": False, "error": "No product in context"}
+
+    return app
+
+
+@contextmanager
+def stub_next_api(app: FastAPI):
+    """Route every httpx call made by tools.database_tools to the stub app"""
+    transport = httpx.ASGITransport(app=app)
+
+    class StubClient(httpx.AsyncClient):
+        def __init__(self, **kwargs: Any):
+            super().__init__(transport=transport, **kwargs)
+
+    with mock.patch.object(database_tools, "httpx", SimpleNamespace(AsyncClient=StubClient)):
+        yield app
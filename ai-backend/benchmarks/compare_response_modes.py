@@ -0,0 +1,39 @@
+"""Benchmark: standard (knowledge + decision) vs plan response mode
+
+Replays the conversation corpus (see benchmarks.replay) once per response
+mode with the fake chat model and the Next.js API stub, then reports LLM
+calls per turn and turn latency for each. No Groq key or Next.js app needed.
+
+Usage (from ai-backend/):
+    python -m benchmarks.compare_response_modes [--repeat 2] [--latency 0.2]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import logging
+
+from benchmarks.replay import load_corpus, run_replay
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=2, help="passes over the corpus")
+    parser.add_argument("--latency", type=float, default=0.2, help="fake LLM latency in seconds")
+    args = parser.parse_args()
+
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    corpus = load_corpus()
+    results = []
+    for mode in ("standard", "plan"):
+        with contextlib.redirect_stdout(io.StringIO()):
+            results.append(await run_replay(corpus, response_mode=mode, repeat=args.repeat, latency=args.latency))
+
+    print(f"\n{'mode':<10} {'calls/turn':>10} {'p50 ms':>10} {'p95 ms':>10}")
+    for r in results:
+        print(f"{r['response_mode']:<10} {r['llm_calls_per_turn']:>10.2f} {r['turn_ms']['p50']:>10.1f} {r['turn_ms']['p95']:>10.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,224 @@
+"""Deterministic chat model stand-in for offline benchmarks
+
+FakeChatModel answers every agent prompt with a scripted reply derived
+from the prompt itself (or a recorded reply, when a recording is loaded)
+after a configurable latency, so full workflow runs need no Groq key.
+"""
+
+import asyncio
+import hashlib
+import json
+import re
+import zlib
+from typing import Any, AsyncIterator, Dict, List, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import AsyncCallbackHandler
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult, LLMResult
+
+from utils.speculation import extract_search_params
+
+
+# Ordered keyword rules standing in for the LLM intent classifier
+INTENT_KEYWORDS = [
+    ("refund_request", ("refund", "return", "money back", "send it back")),
+    ("human_handoff", ("human", "real person", "manager", "useless", "ridiculous")),
+    ("consultation", ("help me pick", "help me choose", "not sure", "gift", "recommend", "overwhelmed")),
+    ("cart_management", ("my cart", "clear", "remove")),
+    ("purchase", ("add ", "buy", "wishlist", "checkout")),
+    ("order_tracking", ("my order", "orders", "shipped", "delivery")),
+    ("pricing", ("price", "cost", "discount", "how much")),
+    ("general_chat", ("hello", "hi ", "thanks", "thank you", "good morning")),
+]
+
+NEGATIVE_WORDS = ("useless", "ridiculous", "angry", "terrible", "frustrated", "worst")
+CONSULTATION_STEPS = (("style", "Sport"), ("budget", "Under $1000"))
+REFUND_STEPS = (("order_id", "ORD123"), ("purchase_date", "2026-02-01"), ("reason", "defective"), ("condition", "pristine"))
+
+
+def classify_intent(message: str) -> str:
+    lower = f" {message.lower()} "
+    for intent, keywords in INTENT_KEYWORDS:
+        if any(keyword in lower for keyword in keywords):
+            return intent
+    return "product_inquiry"
+
+
+def _after(prompt: str, marker: str) -> str:
+    """Text of the first line following `marker`, without quotes"""
+    tail = prompt.split(marker, 1)[-1]
+    return tail.strip().splitlines()[0].strip().strip('"') if tail.strip() else ""
+
+
+def _sentiment(message: str) -> Dict[str, Any]:
+    angry = any(word in message.lower() for word in NEGATIVE_WORDS)
+    return {
+        "sentiment_score": -0.7 if angry else 0.2,
+        "frustration_level": "high" if angry else "low",
+        "escalation_recommended": "yes" if angry else "no",
+        "reason": "explicit frustration" if angry else "neutral tone"
+    }
+
+
+def _action(message: str) -> Dict[str, Any]:
+    intent = classify_intent(message)
+    lower = message.lower()
+    if intent == "human_handoff":
+        return {"action": "escalate_to_human", "arguments": {"reason": "user asked for a human"}}
+    if intent == "general_chat":
+        return {"action": "direct_response", "arguments": {"response": "Hello! How can I help you find a watch today?"}}
+    if intent == "order_tracking":
+        return {"action": "get_orders", "arguments": {}}
+    if intent == "cart_management" and "clear" in lower:
+        return {"action": "clear_cart", "arguments": {}}
+    if intent == "purchase":
+        action = "add_to_wishlist" if "wishlist" in lower else "add_to_cart"
+        return {"action": action, "arguments": {"watch_id": "", "quantity": 1}}
+    if intent == "consultation":
+        return {"action": "request_consultation", "arguments": {"topic": message}}
+    return {"action": "search_products", "arguments": {"query": message}}
+
+
+def _flow_reply(prompt: str, marker: str, steps, key: str, done_step: str, done_text: str) -> str:
+    # Collected state sits between the marker and the last user message
+    collected = re.split(r"last user message", prompt.split(marker, 1)[-1], maxsplit=1, flags=re.IGNORECASE)[0]
+    missing = [(name, value) for name, value in steps if name not in collected]
+    if len(missing) <= 1:
+        update = dict(missing)
+        reply = {key: update, "next_step": done_step, "response_text": done_text}
+        if done_step == "search":
+            reply["search_query"] = "sport watches under 1000"
+        return json.dumps(reply)
+    name, value = missing[0]
+    return json.dumps({key: {name: value}, "next_step": "question", "response_text": f"Could you tell me about the {missing[1][0].replace('_', ' ')}?"})
+
+
+def scripted_reply(prompt: str) -> str:
+    """Plausible reply for any agent prompt, keyed on the prompt's own wording"""
+    if "Classify EACH numbered user query" in prompt:
+        queries = re.findall(r"^(\d+)\. (.*)$", prompt, re.MULTILINE)
+        return json.dumps({number: classify_intent(text) for number, text in queries})
+    if "EACH numbered conversation" in prompt:
+        messages = re.findall(r"^Current Message: (.*)$", prompt, re.MULTILINE)
+        return json.dumps({str(i): _sentiment(text) for i, text in enumerate(messages, 1)})
+    if "interaction classifier" in prompt:
+        return classify_intent(_after(prompt, "User Query:"))
+    if "emotional state" in prompt:
+        return json.dumps(_sentiment(_after(prompt, "Current Message:")))
+    if "Summarize the conversation" in prompt or "running summary" in prompt:
+        return "User is browsing watches and comparing a few models."
+    if "handoff summary" in prompt:
+        return json.dumps({"issue_summary": "User asked for a human", "key_points": [], "suggested_approach": "Call back", "urgent_flags": []})
+    if "extract search parameters" in prompt:
+        return json.dumps(extract_search_params(_after(prompt, "Current User Query:")))
+    if "planning agent" in prompt:
+        message = _after(prompt, "User Message:")
+        decision = _action(message)
+        search = extract_search_params(message) if decision["action"] == "search_products" else None
+        return json.dumps({**decision, "search": search, "answer_needed": "?" in message})
+    if "Decision Agent" in prompt:
+        return json.dumps(_action(_after(prompt, "USER MESSAGE:")))
+    if "Luxury Watch Consultant" in prompt:
+        return _flow_reply(prompt, "Collected Preferences:", CONSULTATION_STEPS, "updated_preferences",
+                           "search", "Let me find some sport watches under $1000 for you.")
+    if "Refund Specialist" in prompt:
+        return _flow_reply(prompt, "COLLECTED INFO:", REFUND_STEPS, "updated_info",
+                           "approve", "Your return has been approved.")
+    return "These watches combine reliable movements with classic design; the first one is the best value."
+
+
+def prompt_key(prompt: str) -> str:
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+
+class RecordedReplies:
+    """Replies captured from a live run, looked up by exact prompt hash"""
+
+    def __init__(self, path: str):
+        self.replies: Dict[str, str] = {}
+        self.hits = 0
+        self.misses = 0
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    self.replies[record["prompt_sha256"]] = record["reply"]
+
+    def get(self, prompt: str) -> Optional[str]:
+        reply = self.replies.get(prompt_key(prompt))
+        if reply is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return reply
+
+
+class ReplyRecorder(AsyncCallbackHandler):
+    """Callback that appends every prompt/reply pair of a live run to a JSONL file"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.prompts: Dict[UUID, str] = {}
+
+    async def on_chat_model_start(self, serialized: Dict[str, Any], messages: List[List[BaseMessage]], *, run_id: UUID, **kwargs: Any):
+        self.prompts[run_id] = "\n".join(str(m.content) for m in messages[0])
+
+    async def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any):
+        prompt = self.prompts.pop(run_id, None)
+        if prompt is None:
+            return
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"prompt_sha256": prompt_key(prompt), "reply": response.generations[0][0].text}) + "\n")
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Chat model with deterministic latency and replies that counts its calls.
+    Latency is `latency` plus up to `jitter` seconds derived from the prompt
+    hash, so repeated runs see the same timings. Every `tail_every`-th call
+    started takes an extra `tail_latency`, to model provider stragglers.
+    """
+
+    model_name: str = "fake"
+    latency: float = 0.2
+    jitter: float = 0.0
+    tail_latency: float = 0.0
+    tail_every: int = 0
+    recorded: Optional[Any] = None
+    calls: int = 0
+    started: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-benchmark"
+
+    def _reply(self, messages: List[BaseMessage]) -> str:
+        prompt = "\n".join(str(m.content) for m in messages)
+        self.calls += 1
+        reply = self.recorded.get(prompt) if self.recorded else None
+        return reply if reply is not None else scripted_reply(prompt)
+
+    def _delay(self, messages: List[BaseMessage]) -> float:
+        self.started += 1
+        delay = self.latency
+        if self.tail_every and self.started % self.tail_every == 0:
+            delay += self.tail_latency
+        if self.jitter:
+            fraction = (zlib.crc32(str(messages[-1].content).encode("utf-8")) % 1000) / 1000
+            delay += self.jitter * fraction
+        return delay
+
+    def _generate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        raise NotImplementedError("benchmark model is async only")
+
+    async def _agenerate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        await asyncio.sleep(self._delay(messages))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self._reply(messages)))])
+
+    async def _astream(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        await asyncio.sleep(self._delay(messages))
+        reply = self._reply(messages)
+        for i in range(0, len(reply), 16):
+            yield ChatGenerationChunk(message=AIMessageChunk(content=reply[i:i + 16]))
@@ -0,0 +1,75 @@
+"""Benchmark: startup cost of re-indexing vs mapping a saved index
+
+For each backend and collection size, times building the index from
+synthetic products (what every worker did at boot), saving it, mapping it
+back with load_index, and the first and steady-state query on the mapped
+index.
+
+Usage (from ai-backend/):
+    python -m benchmarks.index_load [--sizes 10000 100000] [--backends bm25 embedding ivf]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.vector_search import synthetic_products
+from utils.ann_index import IVFFlatIndex
+from utils.index_file import catalog_fingerprint
+from utils.text_index import BM25Index
+from utils.vector_store import EMBEDDING_DIM, SimpleVectorStore
+
+BACKENDS = {
+    "bm25": BM25Index,
+    "embedding": SimpleVectorStore,
+    "ivf": lambda: SimpleVectorStore(ann=IVFFlatIndex(EMBEDDING_DIM), ann_min_documents=0),
+}
+
+
+def elapsed_ms(started: float) -> float:
+    return (time.perf_counter() - started) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--backends", nargs="+", choices=list(BACKENDS), default=list(BACKENDS))
+    args = parser.parse_args()
+
+    print(f"{'backend':>10}  {'docs':>7}  {'build ms':>9}  {'save ms':>8}  {'file MB':>8}"
+          f"  {'load ms':>8}  {'1st query ms':>12}  {'query ms':>9}")
+    with tempfile.TemporaryDirectory() as directory:
+        for size in args.sizes:
+            products = synthetic_products(size)
+            fingerprint = catalog_fingerprint(products)
+            for backend in args.backends:
+                path = os.path.join(directory, f"{backend}-{size}.bin")
+                store = BACKENDS[backend]()
+                started = time.perf_counter()
+                store.load_from_products(products)
+                build_ms = elapsed_ms(started)
+
+                started = time.perf_counter()
+                store.save_index(path, fingerprint)
+                save_ms = elapsed_ms(started)
+
+                mapped = BACKENDS[backend]()
+                started = time.perf_counter()
+                assert mapped.load_index(path, fingerprint)
+                load_ms = elapsed_ms(started)
+
+                started = time.perf_counter()
+                mapped.search("rolex diver with ceramic bezel", 5)
+                first_ms = elapsed_ms(started)
+                started = time.perf_counter()
+                for _ in range(20):
+                    mapped.search("casio digital with solar powered", 5)
+                query_ms = elapsed_ms(started) / 20
+
+                print(f"{backend:>10}  {size:>7}  {build_ms:9.0f}  {save_ms:8.0f}  {os.path.getsize(path) / 1e6:8.1f}"
+                      f"  {load_ms:8.2f}  {first_ms:12.2f}  {query_ms:9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Benchmark: in-process structured product search vs a row scan
+
+Answers the same structured search params (brand, model, minPrice,
+maxPrice, intent) with benchmarks.api_stub.structured_search - a scan over
+every row, the query the search-structured route runs - and with
+utils.product_catalog, then reports microseconds per query and checks the
+results are identical. Synthetic catalogs are listed newest first, so
+catalog order is the route's default createdAt-desc order. The catalog's
+extra "discount" ordering and features filter are timed but not compared,
+since the stub implements neither.
+
+Usage (from ai-backend/):
+    python -m benchmarks.product_query [--sizes 10000 100000] [--queries 500] [--limit 10]
+"""
+
+import argparse
+import random
+import time
+from typing import Any, Dict, List
+
+from benchmarks.api_stub import structured_search
+from benchmarks.vector_search import BRANDS, FEATURES, STYLES, synthetic_products
+from utils.product_catalog import ProductCatalog
+
+
+def catalog_rows(size: int) -> List[Dict[str, Any]]:
+    rng = random.Random(5)
+    rows = []
+    for index, product in enumerate(synthetic_products(size)):
+        on_sale = rng.random() < 0.2
+        rows.append({
+            **product,
+            "stock": 0 if rng.random() < 0.1 else rng.randint(1, 40),
+            "originalPrice": round(product["price"] * rng.uniform(1.1, 1.6)) if on_sale else None,
+            "createdAt": f"2025-01-01T00:00:00.{size - index:06d}Z",
+        })
+    return rows
+
+
+def random_params(rng: random.Random) -> Dict[str, Any]:
+    params: Dict[str, Any] = {"intent": rng.choice(["general", "luxury", "affordable", "general"])}
+    if rng.random() < 0.6:
+        params["brand"] = rng.choice(BRANDS).lower()[:rng.randint(3, 8)]
+    if rng.random() < 0.2:
+        params["model"] = rng.choice(STYLES)
+    if rng.random() < 0.5:
+        low = rng.randint(0, 30000)
+        params["minPrice"] = low
+        if rng.random() < 0.7:
+            params["maxPrice"] = low + rng.randint(500, 20000)
+    elif rng.random() < 0.3:
+        params["maxPrice"] = rng.randint(200, 5000)
+    return params
+
+
+def timed_us(search, queries: List[Dict[str, Any]]):
+    started = time.perf_counter()
+    results = [search(params) for params in queries]
+    return results, (time.perf_counter() - started) / len(queries) * 1e6
+
+
+def bench(size: int, queries: List[Dict[str, Any]], extra: List[Dict[str, Any]], limit: int):
+    rows = catalog_rows(size)
+    catalog = ProductCatalog()
+    catalog.load_from_products(rows)
+    started = time.perf_counter()
+    catalog.search({}, limit)
+    build_ms = (time.perf_counter() - started) * 1000
+
+    expected, scan_us = timed_us(lambda params: structured_search(rows, params, limit), queries)
+    found, local_us = timed_us(lambda params: catalog.search(params, limit), queries)
+    _, extra_us = timed_us(lambda params: catalog.search(params, limit), extra)
+
+    fields = ("id", "name", "brand", "price", "originalPrice", "description")
+    mismatches = sum(
+        [[doc[key] for key in fields] for doc in want] != [[doc[key] for key in fields] for doc in got]
+        for want, got in zip(expected, found)
+    )
+    print(f"{size:>8}  {build_ms:9.1f}  {scan_us:10.1f}  {local_us:9.1f}  {scan_us / local_us:8.0f}x"
+          f"  {extra_us:11.1f}  {mismatches:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+
+    rng = random.Random(3)
+    queries = [random_params(rng) for _ in range(args.queries)]
+    extra = [
+        {"intent": "discount", **({"brand": rng.choice(BRANDS)} if rng.random() < 0.5 else {})}
+        if rng.random() < 0.5 else
+        {"intent": "general", "features": rng.sample(FEATURES, rng.randint(1, 2))}
+        for _ in range(args.queries)
+    ]
+    print(f"limit={args.limit} queries={args.queries} (times per query)")
+    print(f"{'docs':>8}  {'build ms':>9}  {'scan µs':>10}  {'local µs':>9}  {'speedup':>9}"
+          f"  {'discount/':>11}  {'mismatches':>10}")
+    print(f"{'':>8}  {'':>9}  {'':>10}  {'':>9}  {'':>9}  {'features µs':>11}")
+    for size in args.sizes:
+        bench(size, queries, extra, args.limit)
+
+
+if __name__ == "__main__":
+    main()
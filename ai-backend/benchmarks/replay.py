@@ -0,0 +1,264 @@
+"""Benchmark: offline replay of a multi-turn conversation corpus
+
+Replays every conversation through AgentWorkflow.process_message with the
+deterministic fake chat model and the in-process Next.js API stub, keeping
+session state between turns the way the Socket.IO handler does. Reports
+turns/sec, per-node latency percentiles and LLM calls per turn. With
+--baseline, exits non-zero when throughput or calls per turn regress
+beyond --tolerance, so it can gate CI.
+
+Usage (from ai-backend/):
+    python -m benchmarks.replay [--concurrency 8] [--repeat 3] [--latency 0.05]
+                                [--mode parallel] [--response-mode plan]
+                                [--tail-latency 1.0 --tail-every 20] [--hedge]
+                                [--recorded replies.jsonl] [--json out.json]
+                                [--baseline baseline.json] [--tolerance 0.15]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import logging
+import math
+import os
+import sys
+import time
+from collections import defaultdict, deque
+from typing import Any, Dict, List, Optional
+from unittest import mock
+
+from benchmarks.api_stub import create_stub_app, stub_next_api
+from benchmarks.fake_llm import FakeChatModel, RecordedReplies
+from config import settings
+from utils.llm_cache import llm_cache
+from utils.session_manager import session_manager
+from utils.tracing import tracer
+from workflow.graph import AgentWorkflow
+
+
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "conversations.json")
+
+
+def load_corpus(path: str = CORPUS_PATH) -> List[Dict[str, Any]]:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+async def _no_email(*args: Any, **kwargs: Any) -> bool:
+    return True
+
+
+async def replay_conversation(workflow: AgentWorkflow, conversation: Dict[str, Any], session_id: str) -> List[float]:
+    """
+    Run one conversation turn by turn, persisting session state like main.run_turn.
+    The background summary is awaited between turns, as if the user took at
+    least that long to read the reply; it is not counted in turn latency.
+    """
+    user_id = conversation.get("user_id")
+    await session_manager.create_session(session_id, user_id)
+    durations = []
+    for message in conversation["turns"]:
+        await session_manager.add_message(session_id, {"content": message, "sender": "user", "timestamp": "", "metadata": None})
+        start = time.perf_counter()
+        response = await workflow.process_message(
+            session_id=session_id, user_message=message, user_id=user_id, message_stored=True
+        )
+        durations.append(time.perf_counter() - start)
+        await session_manager.add_message(session_id, {"content": response["message"], "sender": "ai", "timestamp": "", "metadata": None})
+        await session_manager.update_session(session_id, {
+            "sentiment_score": response["sentiment"],
+            "last_retrieved_products": response["metadata"].get("retrieved_products", []),
+            "consultation_active": response["metadata"].get("consultation_active", False),
+            "collected_preferences": response["metadata"].get("collected_preferences", {}),
+            "refund_active": response["metadata"].get("refund_active", False),
+            "refund_collected_info": response["metadata"].get("refund_collected_info", {}),
+            "conversation_summary": response["metadata"].get("conversation_summary", ""),
+            "summary_watermark": response["metadata"].get("summary_watermark", 0),
+            "sentiment_state": response["metadata"].get("sentiment_state")
+        })
+        workflow.schedule_summary(session_id)
+        pending = workflow.summary_tasks.get(session_id)
+        if pending is not None:
+            await asyncio.gather(pending, return_exceptions=True)
+    await session_manager.delete_session(session_id)
+    return durations
+
+
+def _collect_spans(span: Dict[str, Any], node_times: Dict[str, List[float]], llm_calls: Dict[str, int], node: str = ""):
+    if span["kind"] == "node":
+        node = span["name"]
+        node_times[node].append(span["duration_ms"])
+    elif span["kind"] == "llm":
+        llm_calls[node or "unknown"] += 1
+    for child in span["children"]:
+        _collect_spans(child, node_times, llm_calls, node)
+
+
+async def run_replay(
+    corpus: List[Dict[str, Any]],
+    mode: Optional[str] = None,
+    response_mode: Optional[str] = None,
+    concurrency: int = 8,
+    repeat: int = 1,
+    latency: float = 0.05,
+    jitter: float = 0.0,
+    api_latency: float = 0.0,
+    recorded: Optional[RecordedReplies] = None,
+    tail_latency: float = 0.0,
+    tail_every: int = 0,
+    hedge: bool = False
+) -> Dict[str, Any]:
+    """
+    Replay the corpus and aggregate the results
+
+    Returns:
+        Report dict (throughput, turn latency, per-node percentiles, LLM calls)
+    """
+    timing = {"latency": latency, "jitter": jitter, "tail_latency": tail_latency, "tail_every": tail_every}
+    primary = FakeChatModel(model_name="fake-primary", recorded=recorded, callbacks=[tracer.callback], **timing)
+    fallback = FakeChatModel(model_name="fake-fallback", recorded=recorded, callbacks=[tracer.callback], **timing)
+    # The fake models have no provider rate limits to respect
+    with mock.patch.multiple(settings, groq_requests_per_minute=0, groq_tokens_per_minute=0, llm_hedging=hedge):
+        workflow = AgentWorkflow(mode=mode, response_mode=response_mode, primary_llm=primary, fallback_llm=fallback)
+    app = create_stub_app(latency=api_latency)
+    # Each run starts cold so results do not depend on earlier runs in the process
+    llm_cache.clear()
+
+    previous_traces = tracer.recent_traces
+    tracer.recent_traces = deque()
+    semaphore = asyncio.Semaphore(concurrency)
+    turn_durations: List[float] = []
+
+    async def run_one(index: int, conversation: Dict[str, Any]):
+        async with semaphore:
+            turn_durations.extend(await replay_conversation(workflow, conversation, f"replay-{index}-{conversation['name']}"))
+
+    jobs = [conversation for _ in range(repeat) for conversation in corpus]
+    try:
+        with stub_next_api(app), mock.patch("tools.email_tools.send_escalation_email", _no_email):
+            start = time.perf_counter()
+            await asyncio.gather(*(run_one(i, conversation) for i, conversation in enumerate(jobs)))
+            elapsed = time.perf_counter() - start
+        traces = list(tracer.recent_traces)
+    finally:
+        tracer.recent_traces = previous_traces
+
+    node_times: Dict[str, List[float]] = defaultdict(list)
+    llm_calls: Dict[str, int] = defaultdict(int)
+    for trace in traces:
+        _collect_spans(trace, node_times, llm_calls)
+
+    turns = len(turn_durations)
+    total_calls = primary.calls + fallback.calls
+    return {
+        "mode": workflow.mode,
+        "response_mode": workflow.response_mode,
+        "turns": turns,
+        "elapsed_s": elapsed,
+        "turns_per_sec": turns / elapsed if elapsed else 0.0,
+        "llm_calls_per_turn": total_calls / turns if turns else 0.0,
+        "turn_ms": {f"p{p}": percentile(turn_durations, p) * 1000 for p in (50, 95, 99)},
+        "nodes": {
+            name: {"count": len(times), **{f"p{p}": percentile(times, p) for p in (50, 95, 99)}, "llm_calls": llm_calls.get(name, 0)}
+            for name, times in sorted(node_times.items())
+        },
+        "llm_cache": llm_cache.hit_rates(),
+        "hedging": workflow.scheduler.hedge.snapshot() if workflow.scheduler.hedge else None,
+        "api_requests": dict(app.state.requests),
+        "recorded_hits": recorded.hits if recorded else None,
+        "recorded_misses": recorded.misses if recorded else None
+    }
+
+
+def print_report(report: Dict[str, Any]):
+    print(f"\nmode={report['mode']} response_mode={report['response_mode']} turns={report['turns']}")
+    print(f"turns/sec: {report['turns_per_sec']:.2f}   LLM calls/turn: {report['llm_calls_per_turn']:.2f}")
+    turn = report["turn_ms"]
+    print(f"turn latency ms: p50 {turn['p50']:.1f}  p95 {turn['p95']:.1f}  p99 {turn['p99']:.1f}")
+    print(f"\n{'node':<14} {'count':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'llm/node':>9}")
+    for name, stats in report["nodes"].items():
+        per_node = stats["llm_calls"] / stats["count"] if stats["count"] else 0.0
+        print(f"{name:<14} {stats['count']:>6} {stats['p50']:>9.1f} {stats['p95']:>9.1f} {stats['p99']:>9.1f} {per_node:>9.2f}")
+    for model, stats in (report.get("hedging") or {}).items():
+        print(f"\nhedging {model}: {stats['hedged']}/{stats['calls']} hedged, "
+              f"{stats['hedge_wins']} hedge wins, {stats['primary_wins']} primary wins")
+
+
+def check_regression(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Regressions against a previous --json report (empty when within tolerance)"""
+    failures = []
+    if report["llm_calls_per_turn"] > baseline["llm_calls_per_turn"] * (1 + tolerance):
+        failures.append(f"LLM calls/turn {report['llm_calls_per_turn']:.2f} > baseline {baseline['llm_calls_per_turn']:.2f}")
+    if report["turns_per_sec"] < baseline["turns_per_sec"] * (1 - tolerance):
+        failures.append(f"turns/sec {report['turns_per_sec']:.2f} < baseline {baseline['turns_per_sec']:.2f}")
+    return failures
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus", default=CORPUS_PATH)
+    parser.add_argument("--mode", choices=["sequential", "parallel"])
+    parser.add_argument("--response-mode", choices=["standard", "plan"])
+    parser.add_argument("--concurrency", type=int, default=8, help="conversations in flight")
+    parser.add_argument("--repeat", type=int, default=3, help="passes over the corpus")
+    parser.add_argument("--latency", type=float, default=0.05, help="fake LLM latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra deterministic per-prompt latency")
+    parser.add_argument("--tail-latency", type=float, default=0.0, help="extra latency of straggler LLM calls")
+    parser.add_argument("--tail-every", type=int, default=0, help="every Nth LLM call is a straggler")
+    parser.add_argument("--hedge", action="store_true", help="enable hedged LLM requests")
+    parser.add_argument("--api-latency", type=float, default=0.0, help="stub API latency in seconds")
+    parser.add_argument("--recorded", help="JSONL replies captured with benchmarks.fake_llm.ReplyRecorder")
+    parser.add_argument("--json", help="write the report to this file")
+    parser.add_argument("--baseline", help="report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15)
+    parser.add_argument("--verbose", action="store_true", help="keep agent and HTTP logs")
+    args = parser.parse_args()
+
+    quiet = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+    if not args.verbose:
+        logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    with quiet:
+        report = await run_replay(
+            load_corpus(args.corpus),
+            mode=args.mode,
+            response_mode=args.response_mode,
+            concurrency=args.concurrency,
+            repeat=args.repeat,
+            latency=args.latency,
+            jitter=args.jitter,
+            api_latency=args.api_latency,
+            recorded=RecordedReplies(args.recorded) if args.recorded else None,
+            tail_latency=args.tail_latency,
+            tail_every=args.tail_every,
+            hedge=args.hedge
+        )
+    print_report(report)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            failures = check_regression(report, json.load(f), args.tolerance)
+        for failure in failures:
+            print(f"✗ Regression: {failure}")
+        if failures:
+            sys.exit(1)
+        print("✓ Within baseline tolerance")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,139 @@
+"""Benchmark: vector store search at catalog scale
+
+Fills SimpleVectorStore with synthetic product documents and times
+single-query search, batched search and a pure-Python reference (the old
+per-document dot-product loop plus full sort) at each collection size.
+The top-k scores of the reference and the store are checked to agree.
+The BM25 inverted index is timed on the same catalog, and both backends
+report brand@k: the share of results whose brand is the one queried.
+
+Usage (from ai-backend/):
+    python -m benchmarks.vector_search [--sizes 10000 100000] [--queries 50] [--top-k 5]
+"""
+
+import argparse
+import random
+import time
+from typing import List
+
+from utils.text_index import BM25Index, tokenize
+from utils.vector_store import SimpleVectorStore
+
+BRANDS = ["Rolex", "Omega", "Casio", "Seiko", "Tissot", "Fossil", "Titan", "Cartier", "Tag Heuer"]
+STYLES = ["Diver", "Chronograph", "Dress", "Pilot", "Field", "Digital", "Skeleton", "GMT"]
+FEATURES = [
+    "sapphire crystal", "ceramic bezel", "automatic movement", "quartz movement",
+    "200m water resistance", "leather strap", "steel bracelet", "luminous hands",
+    "date window", "solar powered", "titanium case", "blue dial", "moon phase"
+]
+CATEGORIES = ["Luxury", "Sport", "Casual", "Smart"]
+
+
+def synthetic_products(count: int, seed: int = 7) -> List[dict]:
+    rng = random.Random(seed)
+    products = []
+    for i in range(count):
+        brand = rng.choice(BRANDS)
+        products.append({
+            "id": str(i),
+            "name": f"{brand} {rng.choice(STYLES)} {rng.randint(100, 999)}",
+            "brand": brand,
+            "description": ", ".join(rng.sample(FEATURES, 3)),
+            "category": rng.choice(CATEGORIES),
+            "price": rng.randint(50, 50000)
+        })
+    return products
+
+
+def reference_search(store: SimpleVectorStore, query: str, top_k: int) -> List[float]:
+    """The pre-NumPy implementation: Python lists, a dot product per document, full sort"""
+    query_embedding = store._simple_embed(query).tolist()
+    similarities = []
+    for idx, doc_embedding in enumerate(store.embeddings.tolist()):
+        similarities.append((idx, sum(a * b for a, b in zip(query_embedding, doc_embedding))))
+    similarities.sort(key=lambda x: x[1], reverse=True)
+    return [score for _, score in similarities[:top_k]]
+
+
+def brand_precision(queries: List[str], results: List[List[dict]]) -> float:
+    """Share of results whose brand is the query's (queries start with the brand)"""
+    hits = total = 0
+    for query, docs in zip(queries, results):
+        for doc in docs:
+            hits += query.startswith(doc["metadata"]["brand"])
+            total += 1
+    return hits / total if total else 0.0
+
+
+def bench(size: int, queries: List[str], top_k: int, reference_queries: int):
+    store = SimpleVectorStore()
+    started = time.perf_counter()
+    store.load_from_products(synthetic_products(size))
+    build_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    single = [store.search(query, top_k) for query in queries]
+    single_ms = (time.perf_counter() - started) * 1000 / len(queries)
+
+    started = time.perf_counter()
+    batched = store.search_batch(queries, top_k)
+    batch_ms = (time.perf_counter() - started) * 1000 / len(queries)
+
+    sample = queries[:reference_queries]
+    started = time.perf_counter()
+    reference = [reference_search(store, query, top_k) for query in sample]
+    reference_ms = (time.perf_counter() - started) * 1000 / len(sample)
+
+    # Compare scores rather than ids: synthetic products share many exact ties,
+    # which float32 and float64 rounding may order differently
+    def close(a, b):
+        return all(abs(x - y) < 1e-5 for x, y in zip(a, b))
+
+    agree = sum(
+        close([doc["similarity_score"] for doc in single[i]], reference[i]) for i in range(len(sample))
+    ) / len(sample)
+    assert all(
+        close([doc["similarity_score"] for doc in single[i]], [doc["similarity_score"] for doc in batched[i]])
+        for i in range(len(queries))
+    )
+
+    index = BM25Index()
+    index.load_from_products(synthetic_products(size))
+    started = time.perf_counter()
+    bm25 = [index.search(query, top_k) for query in queries]
+    bm25_ms = (time.perf_counter() - started) * 1000 / len(queries)
+    # BM25 cost follows the postings its query terms touch, not the catalog size
+    touched = sum(
+        len(index._postings.get(term, [])) for query in queries for term in set(tokenize(query))
+    ) / len(queries)
+
+    print(
+        f"{size:>8}  {build_s:8.2f}  {reference_ms:10.2f}  {single_ms:9.3f}  {batch_ms:9.3f}"
+        f"  {reference_ms / single_ms:8.0f}x  {reference_ms / batch_ms:8.0f}x  {agree:6.0%}"
+        f"  {bm25_ms:8.3f}  {touched:9.0f}  {brand_precision(queries, single):8.0%}  {brand_precision(queries, bm25):8.0%}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--reference-queries", type=int, default=5, help="queries timed on the slow reference")
+    args = parser.parse_args()
+
+    rng = random.Random(11)
+    queries = [
+        f"{rng.choice(BRANDS)} {rng.choice(STYLES).lower()} with {rng.choice(FEATURES)}"
+        for _ in range(args.queries)
+    ]
+
+    print(f"top_k={args.top_k} queries={args.queries}")
+    print(f"{'docs':>8}  {'build s':>8}  {'python ms':>10}  {'numpy ms':>9}  {'batch ms':>9}"
+          f"  {'speedup':>9}  {'batched':>9}  {'agree':>6}  {'bm25 ms':>8}  {'postings':>9}  {'emb b@k':>8}  {'bm25 b@k':>8}")
+    for size in args.sizes:
+        bench(size, queries, args.top_k, min(args.reference_queries, args.queries))
+
+
+if __name__ == "__main__":
+    main()
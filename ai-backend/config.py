@@ -28,6 +28,112 @@ class Settings(BaseSettings):
     max_conversation_history: int = 20
     max_conversation_history: int = 20
     
+    # Workflow Configuration
+    # "sequential" chains every agent; "parallel" fans out interaction,
+    # memory and sentiment concurrently and joins them before routing
+    workflow_mode: str = "sequential"
+    
+    # "standard" runs knowledge then decision; "plan" makes one structured
+    # call for search params + tool action, plus an answer call when needed
+    response_mode: str = "standard"
+    
+    # Jump straight back to an active consultation/refund flow, skipping
+    # intent classification and summarization for that turn
+    sticky_flows: bool = True
+    
+    # Local intent classifier in front of the Groq intent call
+    local_intent_classifier: bool = True
+    intent_confidence_threshold: float = 0.85
+    
+    # Local lexicon sentiment scorer; the LLM is asked only when the local
+    # score lands within the margin of ESCALATION_SENTIMENT_THRESHOLD or
+    # the message mixes positive and negative wording
+    local_sentiment_scorer: bool = True
+    sentiment_ambiguity_margin: float = 0.15
+    # Weight of the newest message in the running (exponentially weighted) sentiment score
+    sentiment_ewma_alpha: float = 0.5
+    # JSON {category: [phrases]} extending the built-in friction/escalation/defect phrase dictionaries
+    phrase_dictionary_file: Optional[str] = None
+    
+    # Start a heuristic product lookup while intent classification runs;
+    # reused only when the extracted search params match exactly
+    speculative_retrieval: bool = True
+    
+    # Local product search behind vector_store: "bm25" (inverted index over
+    # name/brand/category/features/description), "embedding" (exact dense
+    # vector search) or "ivf" (approximate dense search)
+    retrieval_backend: str = "bm25"
+    # IVF-flat: cells (0 = 4 * sqrt(documents)) and cells probed per query;
+    # more probes raise recall and latency. Exact search below the minimum.
+    ann_nlist: int = 0
+    ann_nprobe: int = 16
+    ann_min_documents: int = 5000
+    # Index file memory-mapped at startup instead of re-indexing the catalog
+    # (rebuilt and saved when missing or built from a different catalog)
+    vector_index_path: Optional[str] = None
+    # Seconds between incremental syncs from the SQLite Watch table at
+    # DATABASE_URL (re-indexes rows past the updatedAt mark); 0 disables
+    catalog_sync_interval_seconds: float = 30.0
+    # Answer structured product searches (brand/price/intent filters) from an
+    # in-process columnar catalog instead of the Next.js search-structured route
+    local_product_search: bool = True
+    
+    # Shared LLM scheduler: per-model concurrency cap, and micro-batching of
+    # intent/sentiment prompts arriving from different sessions
+    llm_max_concurrency: int = 8
+    llm_batching: bool = True
+    llm_batch_window_ms: int = 15
+    llm_batch_max_size: int = 8
+    
+    # Groq rate limits per model, from the account's limits page (0 disables
+    # pacing; Groq's own 429s are still retried). Bursts queue for up to
+    # LLM_MAX_QUEUE_WAIT_SECONDS; 429/5xx/timeouts are retried with jittered
+    # backoff (honoring retry-after), and after LLM_BREAKER_THRESHOLD
+    # consecutive failures calls fail over to FALLBACK_MODEL for the cooldown
+    groq_requests_per_minute: int = 0
+    groq_tokens_per_minute: int = 0
+    llm_max_queue_wait_seconds: float = 10.0
+    llm_max_retries: int = 3
+    llm_breaker_threshold: int = 5
+    llm_breaker_cooldown_seconds: float = 30.0
+    
+    # Hedged requests: when a call outlives the given latency percentile of
+    # its model, fire a duplicate (on FALLBACK_MODEL when the agent has one)
+    # and keep whichever answers first; hedges are capped at a share of calls
+    llm_hedging: bool = False
+    llm_hedge_percentile: float = 95
+    llm_hedge_min_delay_ms: int = 250
+    llm_hedge_max_rate: float = 0.1
+    llm_hedge_on_fallback: bool = True
+    
+    # Prompt-level response cache for the listed agents (comma separated);
+    # the Redis tier uses REDIS_URL when LLM_CACHE_REDIS is set
+    llm_cache: bool = True
+    llm_cache_agents: str = "interaction,knowledge,consultant"
+    llm_cache_size: int = 2048
+    llm_cache_ttl_seconds: int = 3600
+    llm_cache_redis: bool = False
+    
+    # Conversation history sent to each agent is packed newest-first into a
+    # token budget (agent=tokens, comma separated; "session" caps what the
+    # session store keeps). Longer messages are truncated (0 = never).
+    history_token_budgets: str = "knowledge=300,planner=300,sentiment=500,actions=300,memory=800,handoff=2000,session=4000"
+    history_default_tokens: int = 500
+    history_message_max_tokens: int = 250
+    
+    # Rolling conversation summary: refreshed from the previous summary plus
+    # the messages since, every N user turns or once those exceed the budget.
+    # Keep the budget below the memory history budget so a refresh normally
+    # fits in one window (messages that do not are summarized next time).
+    summary_refresh_turns: int = 3
+    summary_token_budget: int = 500
+    # Refresh the summary after the reply is sent instead of inside the graph;
+    # each turn then reads the summary left by the previous one
+    background_summary: bool = True
+    
+    # Tracing (per-turn span trees appended as JSON lines when set)
+    trace_file: Optional[str] = None
+    
     # Email Configuration
     smtp_host: str = "smtp.gmail.com"
     smtp_port: int = 587
@@ -13,9 +13,12 @@ except ImportError:
     print("------------------------------------------------------------\n")
     exit(1)
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from typing import Dict, List
 import socketio
 import asyncio
+import os
+import sqlite3
 from datetime import datetime
 import uuid
 
@@ -23,6 +26,14 @@ from config import settings
 from workflow.graph import agent_workflow
 from utils.session_manager import session_manager
 from utils.vector_store import vector_store
+from utils.index_file import catalog_fingerprint
+from utils.catalog_sync import catalog_sync
+from utils.product_catalog import product_catalog
+from utils.streaming import stream_tokens
+from utils.tracing import tracer
+from utils.speculation import product_speculator
+from utils.session_actor import SessionActors
+from utils.llm_cache import llm_cache
 
 from contextlib import asynccontextmanager
 
@@ -34,8 +45,9 @@ async def lifespan(app: FastAPI):
     
     # Initialize session manager
     await session_manager.initialize()
+    await llm_cache.initialize()
     
-    # Load products into vector store (placeholder - would fetch from database)
+    # Load products into vector store and keep it in sync with the catalog tables
     await load_products_to_vector_store()
     
     print("✓ Backend ready!")
@@ -43,7 +55,10 @@ async def lifespan(app: FastAPI):
     yield
     
     # Shutdown
+    await catalog_sync.stop()
+    save_synced_index()
     await session_manager.close()
+    await llm_cache.close()
     print("👋 Backend shutdown complete")
 
 # Initialize FastAPI
@@ -81,8 +96,7 @@ active_connections: Dict[str, WebSocket] = {}
 
 async def load_products_to_vector_store():
     """Load product data into vector store"""
-    # This would normally fetch from Prisma database
-    # For now, using placeholder data
+    # Placeholder data when there is no SQLite catalog at DATABASE_URL
     sample_products = [
         {
             "id": "1",
@@ -113,8 +127,54 @@ async def load_products_to_vector_store():
         }
     ]
     
-    vector_store.load_from_products(sample_products)
-    print(f"✓ Loaded {len(sample_products)} products into vector store")
+    products = sample_products
+    if catalog_sync.available:
+        try:
+            products = await asyncio.to_thread(catalog_sync.bulk_load)
+        except sqlite3.Error as e:
+            print(f"✗ Catalog read failed, using sample products: {e}")
+    else:
+        print(f"⚠ No SQLite catalog at {settings.database_url}, using sample products")
+    
+    # Map a saved index when it matches the catalog instead of re-indexing it
+    index_path = settings.vector_index_path
+    fingerprint = catalog_fingerprint(products)
+    if index_path and os.path.exists(index_path) and vector_store.load_index(index_path, fingerprint):
+        print(f"✓ Mapped {len(vector_store)} products from {index_path}")
+    else:
+        vector_store.load_from_products(products)
+        print(f"✓ Loaded {len(products)} products into vector store")
+        
+        if index_path:
+            try:
+                vector_store.save_index(index_path, fingerprint)
+                print(f"✓ Saved vector index to {index_path}")
+            except OSError as e:
+                print(f"⚠ Could not save vector index: {e}")
+    
+    # Apply Watch.updatedAt deltas from here on
+    if catalog_sync.products:
+        # Structured searches (brand/price/intent) are answered in-process only
+        # from the real tables; without them they stay on the Next.js route
+        product_catalog.load_from_products(products)
+        print(f"✓ Loaded {len(product_catalog)} products into product catalog")
+        for sink in (vector_store, product_catalog):
+            if sink not in catalog_sync.sinks:
+                catalog_sync.sinks.append(sink)
+        catalog_sync.start()
+
+
+def save_synced_index():
+    """Save the index at shutdown if catalog deltas were applied, so the next boot can map it"""
+    if not (settings.vector_index_path and catalog_sync.dirty):
+        return
+    try:
+        fingerprint = catalog_fingerprint(list(catalog_sync.products.values()))
+        vector_store.save_index(settings.vector_index_path, fingerprint)
+        catalog_sync.dirty = False
+        print(f"✓ Saved synced vector index to {settings.vector_index_path}")
+    except OSError as e:
+        print(f"⚠ Could not save vector index: {e}")
 
 
 # ============================================================================
@@ -138,10 +198,62 @@ async def health_check():
         "status": "healthy",
         "groq_configured": settings.groq_api_key != "your_groq_api_key_here",
         "redis_connected": session_manager.use_redis,
-        "active_sessions": len(active_connections)
+        "active_sessions": len(active_connections),
+        "intent_classifier": (
+            agent_workflow.interaction_agent.local_classifier.hit_rates()
+            if agent_workflow.interaction_agent.local_classifier else None
+        ),
+        "sentiment_scorer": (
+            agent_workflow.sentiment_agent.local_scorer.hit_rates()
+            if agent_workflow.sentiment_agent.local_scorer else None
+        ),
+        "speculative_retrieval": product_speculator.hit_rates(),
+        "catalog_sync": catalog_sync.stats,
+        "product_catalog": {"products": len(product_catalog), **product_catalog.stats},
+        "llm_queue_depth": agent_workflow.scheduler.queue_depth(),
+        "llm_rate_limits": agent_workflow.scheduler.rate_limits(),
+        "llm_hedging": agent_workflow.scheduler.hedge.snapshot() if agent_workflow.scheduler.hedge else None,
+        "session_actors": session_actors.snapshot(),
+        "llm_cache": llm_cache.hit_rates()
     }
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Per-node latency and LLM token metrics (Prometheus text format)"""
+    output = tracer.render_prometheus()
+    
+    classifier = agent_workflow.interaction_agent.local_classifier
+    if classifier:
+        output += "# TYPE intent_classifier_hits_total counter\n"
+        for tier, count in classifier.stats.items():
+            output += f'intent_classifier_hits_total{{tier="{tier}"}} {count}\n'
+    
+    scorer = agent_workflow.sentiment_agent.local_scorer
+    if scorer:
+        output += "# TYPE sentiment_scorer_hits_total counter\n"
+        for tier, count in scorer.stats.items():
+            output += f'sentiment_scorer_hits_total{{tier="{tier}"}} {count}\n'
+    
+    output += agent_workflow.scheduler.render_prometheus()
+    output += llm_cache.render_prometheus()
+    output += "# TYPE speculative_retrieval_total counter\n"
+    for outcome, count in product_speculator.stats.items():
+        output += f'speculative_retrieval_total{{outcome="{outcome}"}} {count}\n'
+    
+    output += "# TYPE session_actor_total counter\n"
+    for name, count in session_actors.stats.items():
+        output += f'session_actor_total{{event="{name}"}} {count}\n'
+    
+    return output
+
+
+@app.get("/api/traces")
+async def recent_traces(limit: int = 10):
+    """Most recent per-turn span trees"""
+    return {"traces": list(tracer.recent_traces)[-limit:]}
+
+
 @app.post("/api/sessions")
 async def create_session(user_id: str = None):
     """Create a new chat session"""
@@ -239,22 +351,62 @@ async def send_message(sid, data):
     # Send typing indicator
     await sio.emit("typing", {"typing": True}, room=session_id)
     
+    # Turns run one at a time per session; messages sent while a turn is
+    # in flight are answered together by the next turn
+    session_actors.submit(session_id, {
+        "content": message,
+        "user_id": user_id,
+        "timestamp": datetime.utcnow().isoformat()
+    })
+
+
+async def run_turn(session_id: str, queued: List[Dict]):
+    """Run one workflow turn for every message queued for a session"""
+    message = "\n".join(item["content"] for item in queued)
+    user_id = next((item["user_id"] for item in reversed(queued) if item["user_id"]), None)
+    if len(queued) > 1:
+        print(f"✓ Coalesced {len(queued)} messages into one turn for {session_id}")
+    
+    # This turn supersedes any summary still being written for the last one
+    agent_workflow.cancel_summary(session_id)
+    
+    # A previous turn may have just cleared the indicator
+    await sio.emit("typing", {"typing": True}, room=session_id)
+    
     try:
-        # Add user message to session
+        # Add the turn's user message to session; a coalesced burst is stored
+        # as one message so every agent reading messages[-1] sees all of it
         user_message_data = {
             "content": message,
             "sender": "user",
-            "timestamp": datetime.utcnow().isoformat(),
-            "metadata": None
+            "timestamp": queued[-1]["timestamp"],
+            "metadata": {"coalesced": len(queued)} if len(queued) > 1 else None
         }
         await session_manager.add_message(session_id, user_message_data)
         
+        # Stream user-visible tokens from the generating agent as they arrive.
+        # A new segment starts whenever a different agent takes over the answer,
+        # and the closing ai_message event always carries the final text.
+        stream_state = {"agent_type": None, "segment": 0}
+        
+        async def emit_chunk(text: str, agent_type: str):
+            if agent_type != stream_state["agent_type"]:
+                stream_state["agent_type"] = agent_type
+                stream_state["segment"] += 1
+            await sio.emit("ai_message_chunk", {
+                "chunk": text,
+                "agent_type": agent_type,
+                "segment": stream_state["segment"]
+            }, room=session_id)
+        
         # Process through agent workflow
-        response_data = await agent_workflow.process_message(
-            session_id=session_id,
-            user_message=message,
-            user_id=user_id
-        )
+        with stream_tokens(emit_chunk):
+            response_data = await agent_workflow.process_message(
+                session_id=session_id,
+                user_message=message,
+                user_id=user_id,
+                message_stored=True
+            )
         
         # Add AI response to session
         ai_message_data = {
@@ -277,7 +429,10 @@ async def send_message(sid, data):
             "consultation_active": response_data["metadata"].get("consultation_active", False),
             "collected_preferences": response_data["metadata"].get("collected_preferences", {}),
             "refund_active": response_data["metadata"].get("refund_active", False),
-            "refund_collected_info": response_data["metadata"].get("refund_collected_info", {})
+            "refund_collected_info": response_data["metadata"].get("refund_collected_info", {}),
+            "conversation_summary": response_data["metadata"].get("conversation_summary", ""),
+            "summary_watermark": response_data["metadata"].get("summary_watermark", 0),
+            "sentiment_state": response_data["metadata"].get("sentiment_state")
         })
         
         # Stop typing indicator
@@ -288,9 +443,13 @@ async def send_message(sid, data):
             "message": response_data["message"],
             "payload": response_data.get("metadata", {}).get("retrieved_products", []), # Or generic payload field
             "timestamp": ai_message_data["timestamp"],
-            "metadata": ai_message_data["metadata"]
+            "metadata": ai_message_data["metadata"],
+            "streamed": stream_state["segment"] > 0
         }, room=session_id)
         
+        # Summarize off the critical path; the next turn reads the result
+        agent_workflow.schedule_summary(session_id)
+        
         # Send escalation notice if needed
         if response_data["escalated"]:
             await sio.emit("escalation_notice", {
@@ -314,6 +473,9 @@ async def send_message(sid, data):
         }, room=session_id)
 
 
+session_actors = SessionActors(run_turn)
+
+
 # ============================================================================
 # Run Application
 # ============================================================================
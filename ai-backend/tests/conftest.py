@@ -0,0 +1,6 @@
+"""Make the backend modules importable when pytest runs from ai-backend/ or the repo root"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
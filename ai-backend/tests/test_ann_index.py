@@ -0,0 +1,84 @@
+"""IVF-flat index over the vector store: recall and incremental row bookkeeping"""
+
+import numpy as np
+
+from utils.ann_index import IVFFlatIndex
+from utils.vector_store import EMBEDDING_DIM, SimpleVectorStore
+
+
+BRANDS = ["Rolex", "Omega", "Cartier", "Casio", "Seiko", "Tissot"]
+STYLES = ["diver", "dress", "chronograph", "pilot", "field", "digital"]
+
+
+def products(count, start=0):
+    return [
+        {
+            "id": str(index),
+            "name": f"{STYLES[index % len(STYLES)]} model {index}",
+            "brand": BRANDS[index % len(BRANDS)],
+            "description": f"reference {index} {STYLES[(index // 6) % len(STYLES)]}"
+        }
+        for index in range(start, start + count)
+    ]
+
+
+def ann_store(nlist=8, nprobe=8):
+    return SimpleVectorStore(ann=IVFFlatIndex(EMBEDDING_DIM, nlist=nlist, nprobe=nprobe), ann_min_documents=0)
+
+
+def ids(results):
+    return [result["id"] for result in results]
+
+
+def assert_rows_consistent(store):
+    """Every store row sits in exactly one cell, the one recorded for it"""
+    ann = store.ann
+    members = [ann._rows(cell).tolist() for cell in range(len(ann.centroids))]
+    rows = sorted(row for cell in members for row in cell)
+    assert rows == list(range(len(store)))
+    for cell, cell_rows in enumerate(members):
+        assert all(ann._cells[row] == cell for row in cell_rows)
+
+
+def test_probing_every_cell_matches_exact_search():
+    exact, approximate = SimpleVectorStore(), ann_store(nlist=8, nprobe=8)
+    catalog = products(120)
+    exact.load_from_products(catalog)
+    approximate.load_from_products(catalog)
+    assert approximate.ann.trained
+    for query in ("rolex diver", "casio digital watch", "model 42", "dress pilot"):
+        assert ids(approximate.search(query, top_k=5)) == ids(exact.search(query, top_k=5))
+
+
+def test_probes_only_visit_their_cells():
+    store = ann_store(nlist=8, nprobe=1)
+    store.load_from_products(products(120))
+    query = store._simple_embed("rolex diver")[None, :]
+    cell = int(store.ann._nearest_cells(query, 1)[0, 0])
+    rows, _ = store.ann.search(query, store.embeddings, 200)[0]
+    assert sorted(rows.tolist()) == sorted(store.ann._rows(cell).tolist())
+
+
+def test_removals_move_the_last_row_into_the_gap():
+    store = ann_store()
+    store.load_from_products(products(60))
+    for product_id in ("0", "17", "59", "30"):
+        assert store.remove_document(product_id)
+        assert_rows_consistent(store)
+    assert not store.remove_document("17")
+    assert len(store) == 56
+    remaining = {doc["id"] for doc in store.documents}
+    assert not remaining & {"0", "17", "59", "30"}
+    for result in store.search("diver model", top_k=56):
+        assert result["id"] in remaining
+
+
+def test_upserts_and_additions_are_assigned_to_cells():
+    store = ann_store()
+    store.load_from_products(products(60))
+    store.upsert_products([{**products(1, start=5)[0], "name": "gold dress watch"}] + products(10, start=60))
+    assert len(store) == 70
+    assert_rows_consistent(store)
+    row = store._rows["5"]
+    assert np.allclose(store.embeddings[row], store._simple_embed(store.documents[row]["text"]))
+    assert ids(store.search("gold dress watch", top_k=1)) == ["5"]
@@ -0,0 +1,167 @@
+"""Catalog sync: bulk load, watermark deltas, deletions and brand renames"""
+
+import json
+import sqlite3
+
+import pytest
+
+from utils.catalog_sync import CatalogSync, sqlite_path
+
+
+class RecordingSink:
+    def __init__(self, failures=0):
+        self.upserted = []
+        self.removed = []
+        self.failures = failures
+        self.prices = {}
+
+    def upsert_products(self, products):
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("sink unavailable")
+        self.upserted.append(sorted(product["id"] for product in products))
+        self.prices.update({product["id"]: (product["price"], product["brand"]) for product in products})
+
+    def remove_products(self, product_ids):
+        self.removed.append(sorted(product_ids))
+
+
+@pytest.fixture
+def database(tmp_path):
+    path = tmp_path / "dev.db"
+    with sqlite3.connect(path) as connection:
+        connection.executescript("""
+            CREATE TABLE "Brand" (id TEXT PRIMARY KEY, name TEXT, image TEXT);
+            CREATE TABLE "Category" (id TEXT PRIMARY KEY, name TEXT);
+            CREATE TABLE "Watch" (
+                id TEXT PRIMARY KEY, name TEXT, brandId TEXT, categoryId TEXT, price REAL,
+                originalPrice REAL, description TEXT, gender TEXT, stock INTEGER, features TEXT,
+                createdAt TEXT, updatedAt TEXT
+            );
+            INSERT INTO "Brand" VALUES ('b1', 'Rolex', 'rolex.png'), ('b2', 'Omega', 'omega.png');
+            INSERT INTO "Category" VALUES ('c1', 'Diver'), ('c2', 'Dress');
+        """)
+        add_watch(connection, "w1", "b1", "c1", "2024-01-01")
+        add_watch(connection, "w2", "b2", "c1", "2024-01-02", features={"chronograph": True, "strap": "steel"})
+        add_watch(connection, "w3", "b2", "c2", "2024-01-02")
+    return path
+
+
+def add_watch(connection, watch_id, brand_id, category_id, updated_at, features=None):
+    connection.execute(
+        'INSERT INTO "Watch" VALUES (?, ?, ?, ?, 1000, NULL, ?, ?, 5, ?, ?, ?)',
+        (watch_id, f"Watch {watch_id}", brand_id, category_id, "A watch", "unisex",
+         json.dumps(features or {}), updated_at, updated_at)
+    )
+
+
+def execute(path, sql, *params):
+    with sqlite3.connect(path) as connection:
+        connection.execute(sql, params)
+
+
+def loaded_sync(path, sink=None):
+    sink = sink or RecordingSink()
+    sync = CatalogSync(f"file:{path}", [sink], interval=0)
+    sync.bulk_load()
+    return sync, sink
+
+
+def test_sqlite_path_only_accepts_file_urls():
+    assert sqlite_path("file:./dev.db?connection_limit=1") == "./dev.db"
+    assert sqlite_path("postgresql://localhost/db") is None
+    assert not CatalogSync("postgresql://localhost/db", []).available
+
+
+def test_bulk_load_joins_lookups_and_sets_the_watermark(database):
+    sync, sink = loaded_sync(database)
+    products = {product["id"]: product for product in sync.products.values()}
+    assert set(products) == {"w1", "w2", "w3"}
+    assert products["w2"]["brand"] == "Omega" and products["w2"]["image"] == "omega.png"
+    assert products["w2"]["category"] == "Diver"
+    assert products["w2"]["features"] == "chronograph strap steel"
+    assert sync.watermark == "2024-01-02"
+    assert sync.sync() == {"upserted": 0, "removed": 0}
+    assert not sink.upserted and not sync.dirty
+
+
+def test_sync_reindexes_only_rows_past_the_watermark(database):
+    sync, sink = loaded_sync(database)
+    execute(database, 'UPDATE "Watch" SET price = 900, updatedAt = ? WHERE id = ?', "2024-01-03", "w1")
+    with sqlite3.connect(database) as connection:
+        # Shares the old watermark's timestamp but was never applied
+        add_watch(connection, "w4", "b1", "c2", "2024-01-02")
+
+    assert sync.sync() == {"upserted": 2, "removed": 0}
+    assert sink.upserted == [["w1", "w4"]]
+    assert sync.products["w1"]["price"] == 900
+    assert sync.watermark == "2024-01-03"
+    assert sync.sync() == {"upserted": 0, "removed": 0}
+
+
+def test_sync_detects_deleted_rows(database):
+    sync, sink = loaded_sync(database)
+    execute(database, 'DELETE FROM "Watch" WHERE id = ?', "w2")
+    assert sync.sync() == {"upserted": 0, "removed": 1}
+    assert sink.removed == [["w2"]]
+    assert set(sync.products) == {"w1", "w3"}
+
+
+def test_brand_rename_relabels_its_watches(database):
+    sync, sink = loaded_sync(database)
+    execute(database, 'UPDATE "Brand" SET name = ? WHERE id = ?', "Omega SA", "b2")
+    assert sync.sync() == {"upserted": 2, "removed": 0}
+    assert sink.upserted == [["w2", "w3"]]
+    assert sync.products["w3"]["brand"] == "Omega SA"
+    assert sync.products["w1"]["brand"] == "Rolex"
+
+
+def test_failed_sink_leaves_the_delta_for_the_next_sync(database):
+    failing, healthy = RecordingSink(failures=1), RecordingSink()
+    sync, _ = loaded_sync(database, failing)
+    sync.sinks.append(healthy)
+    execute(database, 'UPDATE "Watch" SET price = 900, updatedAt = ? WHERE id = ?', "2024-01-03", "w1")
+    execute(database, 'UPDATE "Brand" SET name = ? WHERE id = ?', "Omega SA", "b2")
+
+    with pytest.raises(RuntimeError):
+        sync.sync()
+    assert not healthy.upserted
+    assert sync.watermark == "2024-01-02"
+    assert sync.products["w1"]["price"] == 1000
+    assert sync.products["w2"]["brand"] == "Omega"
+
+    assert sync.sync() == {"upserted": 3, "removed": 0}
+    for sink in (failing, healthy):
+        assert sink.prices == {"w1": (900, "Rolex"), "w2": (1000, "Omega SA"), "w3": (1000, "Omega SA")}
+    assert sync.products["w1"]["price"] == 900
+    assert sync.sync() == {"upserted": 0, "removed": 0}
+
+
+def test_failed_read_commits_nothing(database, monkeypatch):
+    sync, sink = loaded_sync(database)
+    execute(database, 'UPDATE "Watch" SET price = 900, updatedAt = ? WHERE id = ?', "2024-01-03", "w1")
+    execute(database, 'DELETE FROM "Watch" WHERE id = ?', "w2")
+
+    connect = sync._connect
+
+    def locked_after_changes():
+        connection = connect()
+        original = connection.execute
+
+        class Connection:
+            def execute(self, sql, *args):
+                if sql == 'SELECT id FROM "Watch"':
+                    raise sqlite3.OperationalError("database is locked")
+                return original(sql, *args)
+
+            def close(self):
+                connection.close()
+        return Connection()
+
+    monkeypatch.setattr(sync, "_connect", locked_after_changes)
+    with pytest.raises(sqlite3.OperationalError):
+        sync.sync()
+    monkeypatch.setattr(sync, "_connect", connect)
+
+    assert sync.sync() == {"upserted": 1, "removed": 1}
+    assert sink.upserted == [["w1"]] and sink.removed == [["w2"]]
@@ -0,0 +1,64 @@
+"""Token-budgeted history windows and the memory agent's summary watermark"""
+
+import asyncio
+
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableLambda
+
+from agents.memory_agent import ContextMemoryAgent
+from utils.context_window import TRUNCATION_MARKER, build_window, estimate_tokens, truncate_text
+
+
+def message(index, words=10, sender="user"):
+    return {"sender": sender, "content": " ".join([f"m{index}"] * words)}
+
+
+def test_window_keeps_newest_messages_in_order():
+    messages = [message(i) for i in range(6)]
+    window = build_window(messages, "test", budget=30, max_message_tokens=0)
+    assert window == messages[3:]
+
+
+def test_oldest_first_window_is_a_prefix():
+    messages = [message(i) for i in range(6)]
+    window = build_window(messages, "test", budget=30, max_message_tokens=0, oldest_first=True)
+    assert window == messages[:3]
+
+
+def test_oversized_message_is_truncated_not_dropped():
+    messages = [message(0), message(1, words=100)]
+    window = build_window(messages, "test", budget=20, max_message_tokens=0)
+    assert len(window) == 1
+    assert window[0]["content"].endswith(TRUNCATION_MARKER)
+    assert estimate_tokens(window[0]["content"]) <= 20 + estimate_tokens(TRUNCATION_MARKER)
+    assert messages[1]["content"] == " ".join(["m1"] * 100)
+
+
+def test_long_messages_are_truncated_per_message():
+    messages = [message(0, words=100), message(1)]
+    window = build_window(messages, "test", budget=1000, max_message_tokens=20)
+    assert len(window) == 2
+    assert window[0]["content"] == truncate_text(messages[0]["content"], 20)
+    assert window[1] is messages[1]
+
+
+def test_memory_watermark_only_covers_summarized_messages():
+    agent = ContextMemoryAgent(RunnableLambda(lambda prompt: AIMessage(content="SUM")), refresh_turns=3, token_budget=500)
+    messages = [{"sender": "user" if i % 2 == 0 else "ai", "content": "word " * 300} for i in range(8)]
+
+    state = asyncio.run(agent.process({"messages": messages, "message_offset": 0, "summary_watermark": 0}))
+    assert state["conversation_summary"] == "SUM"
+    assert state["summary_watermark"] == 3
+
+    state = asyncio.run(agent.process({**state, "messages": messages}))
+    assert state["summary_watermark"] == 6
+
+
+def test_memory_skips_refresh_under_budget():
+    agent = ContextMemoryAgent(RunnableLambda(lambda prompt: AIMessage(content="NEW")), refresh_turns=3, token_budget=500)
+    messages = [message(i) for i in range(5)]
+    state = asyncio.run(agent.process({
+        "messages": messages, "message_offset": 0, "summary_watermark": 4, "conversation_summary": "OLD"
+    }))
+    assert state["conversation_summary"] == "OLD"
+    assert state["summary_watermark"] == 4
@@ -0,0 +1,66 @@
+"""Index files: round trips through the mapped format and rejection of stale files"""
+
+from utils.ann_index import IVFFlatIndex
+from utils.index_file import catalog_fingerprint
+from utils.text_index import BM25Index
+from utils.vector_store import EMBEDDING_DIM, SimpleVectorStore
+
+
+PRODUCTS = [
+    {"id": str(index), "name": f"{style} {index}", "brand": brand, "description": f"{style} watch by {brand}"}
+    for index, (style, brand) in enumerate(
+        [(style, brand) for style in ("diver", "dress", "pilot", "chronograph") for brand in ("Rolex", "Omega", "Casio")]
+    )
+]
+
+QUERIES = ("rolex diver", "casio pilot watch", "dress", "chronograph omega")
+
+
+def results(index):
+    return [[(hit["id"], round(hit["similarity_score"], 5)) for hit in index.search(query)] for query in QUERIES]
+
+
+def test_bm25_round_trip_searches_the_mapped_file(tmp_path):
+    path = str(tmp_path / "bm25.idx")
+    built = BM25Index()
+    built.load_from_products(PRODUCTS)
+    built.save_index(path, catalog_fingerprint(PRODUCTS))
+
+    loaded = BM25Index()
+    assert loaded.load_index(path, catalog_fingerprint(PRODUCTS))
+    assert loaded._frozen is not None
+    assert results(loaded) == results(built)
+
+    # The first change copies the mapped index into memory
+    loaded.remove_products(["0"])
+    built.remove_products(["0"])
+    assert loaded._frozen is None
+    assert results(loaded) == results(built)
+
+
+def test_vector_store_round_trip_keeps_the_ann_cells(tmp_path):
+    path = str(tmp_path / "vectors.idx")
+    built = SimpleVectorStore(ann=IVFFlatIndex(EMBEDDING_DIM, nlist=3, nprobe=2), ann_min_documents=0)
+    built.load_from_products(PRODUCTS)
+    built.save_index(path)
+
+    loaded = SimpleVectorStore(ann=IVFFlatIndex(EMBEDDING_DIM, nlist=3, nprobe=2), ann_min_documents=0)
+    assert loaded.load_index(path)
+    assert loaded.ann.trained
+    assert results(loaded) == results(built)
+
+
+def test_stale_or_foreign_files_are_rejected(tmp_path):
+    path = str(tmp_path / "bm25.idx")
+    index = BM25Index()
+    index.load_from_products(PRODUCTS)
+    index.save_index(path, catalog_fingerprint(PRODUCTS))
+
+    assert not BM25Index().load_index(path, catalog_fingerprint(PRODUCTS[1:]))
+    assert not SimpleVectorStore().load_index(path)
+    assert not BM25Index().load_index(str(tmp_path / "missing.idx"))
+
+
+def test_fingerprint_ignores_row_order():
+    assert catalog_fingerprint(PRODUCTS) == catalog_fingerprint(list(reversed(PRODUCTS)))
+    assert catalog_fingerprint(PRODUCTS) != catalog_fingerprint([{**PRODUCTS[0], "price": 1}] + PRODUCTS[1:])
@@ -0,0 +1,80 @@
+"""Rule tier of the local intent classifier"""
+
+import pytest
+
+from utils.intent_classifier import (
+    RULE_AMBIGUOUS_CONFIDENCE, RULE_CONFIDENCE, SEED_EXAMPLES,
+    LocalIntentClassifier, match_intent_rules, score_intent_rules
+)
+
+
+@pytest.fixture(scope="module")
+def classifier():
+    return LocalIntentClassifier()
+
+
+@pytest.mark.parametrize("text, intent", [
+    ("i want a refund", "refund_request"),
+    ("where is my order", "order_tracking"),
+    ("talk to a human", "human_handoff"),
+    ("add the rolex to my cart", "purchase"),
+    ("no, i want my money back", "refund_request"),
+])
+def test_clean_rule_hits_are_confident(text, intent):
+    assert score_intent_rules(text) == (intent, RULE_CONFIDENCE)
+
+
+@pytest.mark.parametrize("text", [
+    "i don't want a refund, i want to buy another one",
+    "i do not want my money back",
+    "i'm not asking to talk to a human",
+    "never talk to a manager about this",
+])
+def test_negated_rule_hits_do_not_count(text):
+    assert match_intent_rules(text) is None
+
+
+@pytest.mark.parametrize("text", [
+    "not sure, is it waterproof?",
+    "clear my cart but keep the rolex",
+])
+def test_ambiguous_hits_stay_below_threshold(text, classifier):
+    intent, confidence = score_intent_rules(text)
+    assert intent is not None
+    assert confidence == RULE_AMBIGUOUS_CONFIDENCE < classifier.confidence_threshold
+
+
+def test_several_intents_match_nothing():
+    assert match_intent_rules("track my order and clear my cart") is None
+
+
+def test_negated_message_goes_to_llm(classifier):
+    assert classifier.classify("I'm not asking to talk to a human") == (None, 0.0, "llm")
+    assert classifier.classify("I don't want a refund, I want to buy another one")[0] is None
+
+
+def test_sentiment_is_not_a_handoff_seed():
+    assert "i am angry" not in SEED_EXAMPLES["human_handoff"]
+    assert "i am frustrated" not in SEED_EXAMPLES["human_handoff"]
+
+
+def test_predict_does_not_count(classifier):
+    before = dict(classifier.stats)
+    assert classifier.predict("where is my order")[0] == "order_tracking"
+    assert classifier.stats == before
+    classifier.classify("where is my order")
+    assert classifier.stats["rules"] == before["rules"] + 1
+
+
+@pytest.mark.parametrize("text", [
+    "my order arrived but the rolex is scratched",
+    "my cart is not loading",
+    "I don't see my order in the history",
+])
+def test_model_tier_defers_contrast_and_negation(text, classifier):
+    intent, _, tier = classifier.predict(text)
+    assert (intent, tier) == (None, "llm")
+
+
+def test_model_tier_accepts_plain_messages(classifier):
+    assert classifier.predict("has my order shipped")[::2] == ("order_tracking", "model")
@@ -0,0 +1,48 @@
+"""Prompt-level LLM cache: key normalization, TTL and LRU eviction"""
+
+import asyncio
+
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from utils import llm_cache
+from utils.llm_cache import LLMCache
+
+
+def test_key_ignores_whitespace_but_not_model_or_role():
+    cache = LLMCache()
+    key = cache.key("m", 0.0, [HumanMessage(content="show me  rolex\nwatches")])
+    assert key == cache.key("m", 0.0, [HumanMessage(content=" show me rolex watches ")])
+    assert key != cache.key("other", 0.0, [HumanMessage(content="show me rolex watches")])
+    assert key != cache.key("m", 0.0, [SystemMessage(content="show me rolex watches")])
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(llm_cache.time, "monotonic", lambda: now[0])
+    cache = LLMCache(max_entries=4, ttl=60)
+
+    asyncio.run(cache.set("k", "v"))
+    assert asyncio.run(cache.get("k", "agent")) == "v"
+    now[0] += 61
+    assert asyncio.run(cache.get("k", "agent")) is None
+    assert "k" not in cache.entries
+    assert cache.hit_rates()["agent"]["hit_rate"] == 0.5
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = LLMCache(max_entries=2, ttl=60)
+
+    async def run():
+        await cache.set("a", "1")
+        await cache.set("b", "2")
+        await cache.get("a", "agent")
+        await cache.set("c", "3")
+        return [await cache.get(key, "agent") for key in ("a", "b", "c")]
+
+    assert asyncio.run(run()) == ["1", None, "3"]
+
+
+def test_empty_completions_are_not_cached():
+    cache = LLMCache()
+    asyncio.run(cache.set("k", ""))
+    assert not cache.entries
@@ -0,0 +1,112 @@
+"""Shared LLM scheduler: micro-batching, failure handling and failover caching"""
+
+import asyncio
+import json
+from typing import Any, Callable, List, Optional
+
+import pytest
+from langchain.prompts import ChatPromptTemplate
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from utils.llm_cache import LLMCache
+from utils.llm_scheduler import LLMScheduler
+from utils.rate_limit import LLMUnavailableError
+
+
+class ScriptedModel(BaseChatModel):
+    """Chat model answering with `reply(prompt_text)`, or raising `error`"""
+
+    model_name: str = "scripted"
+    reply: Optional[Callable[[str], str]] = None
+    error: Optional[Exception] = None
+    prompts: List[str] = []
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def _generate(self, messages: List[BaseMessage], stop: Any = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        text = "\n".join(str(message.content) for message in messages)
+        self.prompts.append(text)
+        if self.error is not None:
+            raise self.error
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.reply(text)))])
+
+
+def batch_reply(text: str) -> str:
+    """Intent batch prompts list queries as "N. text"; answer each by its text"""
+    if "Queries:" not in text:
+        return "single"
+    lines = [line for line in text.split("\n") if line[:1].isdigit() and ". " in line]
+    return json.dumps({line.split(". ", 1)[0]: f"intent:{line.split('. ', 1)[1]}" for line in lines})
+
+
+PROMPT = ChatPromptTemplate.from_template("{user_message}")
+
+
+def classify_all(scheduler: LLMScheduler, llm: Any, messages: List[str]):
+    async def run():
+        return await asyncio.gather(
+            *(scheduler.batched(llm, "intent", PROMPT, {"user_message": message}) for message in messages),
+            return_exceptions=True
+        )
+    return asyncio.run(run())
+
+
+def test_concurrent_prompts_share_one_request():
+    model = ScriptedModel(reply=batch_reply, prompts=[])
+    scheduler = LLMScheduler(batch_window=0.01)
+    results = classify_all(scheduler, model, ["a", "b", "c"])
+    assert results == ["intent:a", "intent:b", "intent:c"]
+    assert len(model.prompts) == 1
+    assert scheduler.stats["batches"] == 1
+    assert not scheduler._batch_tasks
+
+
+def test_unparseable_batch_falls_back_to_single_requests():
+    model = ScriptedModel(reply=lambda text: "not json" if "Queries:" in text else "single", prompts=[])
+    scheduler = LLMScheduler(batch_window=0.01)
+    assert classify_all(scheduler, model, ["a", "b"]) == ["single", "single"]
+    assert len(model.prompts) == 3
+    assert scheduler.stats["split_failures"] == 1
+
+
+@pytest.mark.parametrize("error", [LLMUnavailableError("m is saturated", retry_in=5.0)])
+def test_throttled_batch_fails_without_fanning_out(error):
+    model = ScriptedModel(error=error, prompts=[])
+    scheduler = LLMScheduler(batch_window=0.01, max_retries=0)
+    results = classify_all(scheduler, model, ["a", "b", "c"])
+    assert all(isinstance(result, LLMUnavailableError) for result in results)
+    assert len(model.prompts) == 1
+    assert scheduler.stats["failed_batches"] == 1
+
+
+def test_failover_reply_is_not_cached_under_the_primary():
+    primary = ScriptedModel(model_name="primary", error=TimeoutError("Timeout"), prompts=[])
+    fallback = ScriptedModel(model_name="fallback", reply=lambda text: "from fallback", prompts=[])
+    scheduler = LLMScheduler(max_retries=0, breaker_threshold=1)
+    cache = LLMCache(max_entries=16, ttl=60)
+    llm = scheduler.wrap(primary, cache=cache, agent="test", fallback=scheduler.wrap(fallback))
+
+    async def run():
+        response = await (PROMPT | llm).ainvoke({"user_message": "hi"})
+        cached = await cache.get(llm.cache_key(PROMPT.format_prompt(user_message="hi")), "test")
+        return response.content, cached
+
+    assert asyncio.run(run()) == ("from fallback", None)
+
+
+def test_primary_reply_is_cached():
+    primary = ScriptedModel(model_name="primary", reply=lambda text: "from primary", prompts=[])
+    scheduler = LLMScheduler()
+    cache = LLMCache(max_entries=16, ttl=60)
+    llm = scheduler.wrap(primary, cache=cache, agent="test")
+
+    async def run():
+        await (PROMPT | llm).ainvoke({"user_message": "hi"})
+        await (PROMPT | llm).ainvoke({"user_message": "hi"})
+
+    asyncio.run(run())
+    assert len(primary.prompts) == 1
@@ -0,0 +1,82 @@
+"""Aho-Corasick phrase matcher against a naive per-phrase regex scan"""
+
+import random
+import re
+
+import pytest
+
+from utils.phrase_matcher import PHRASE_DICTIONARIES, PhraseMatcher
+
+
+def naive_find(dictionaries, text):
+    """(start, phrase, sorted categories) of every whole-word occurrence, one regex per phrase"""
+    categories = {}
+    for category, phrases in dictionaries.items():
+        for phrase in phrases:
+            categories.setdefault(phrase.strip().lower(), set()).add(category)
+    hits = set()
+    for phrase, phrase_categories in categories.items():
+        for match in re.finditer(rf"(?<!\w)(?={re.escape(phrase)}(?!\w))", text.lower()):
+            hits.add((match.start(), phrase, tuple(sorted(phrase_categories))))
+    return hits
+
+
+def normalized(hits):
+    return {(start, phrase, tuple(sorted(categories))) for start, phrase, categories in hits}
+
+
+def naive_match(dictionaries, text):
+    matches = {}
+    for _, phrase, categories in sorted(naive_find(dictionaries, text)):
+        for category in categories:
+            matches.setdefault(category, set()).add(phrase)
+    return matches
+
+
+def as_sets(matches):
+    return {category: set(phrases) for category, phrases in matches.items()}
+
+
+OVERLAPPING = {
+    "refund": ["send back", "send it back", "money back"],
+    "anger": ["mad", "so mad", "made me mad"],
+    "suffix": ["she", "he", "hers", "his"],
+    "shared": ["refund", "money back"],
+}
+
+
+@pytest.mark.parametrize("text", [
+    "please send it back and send back the box",
+    "I made a mistake, not mad",
+    "this made me so mad",
+    "ushers said his and hers",
+    "she, he: hers!",
+    "i want my MONEY BACK, a refund",
+    "",
+])
+def test_overlapping_phrases_match_the_naive_scan(text):
+    matcher = PhraseMatcher(OVERLAPPING)
+    assert normalized(matcher.find(text)) == naive_find(OVERLAPPING, text)
+    assert as_sets(matcher.match(text)) == naive_match(OVERLAPPING, text)
+
+
+def test_word_boundaries():
+    matcher = PhraseMatcher({"anger": ["mad"]})
+    assert matcher.match("this was made in the madhouse") == {}
+    assert matcher.match("I am MAD.") == {"anger": ["mad"]}
+
+
+def test_phrase_in_two_categories():
+    matcher = PhraseMatcher({"refund": ["money back"], "escalation": ["money back", "manager"]})
+    assert matcher.categories("i want my money back") == {"refund", "escalation"}
+    assert len(matcher.find("i want my money back")) == 1
+
+
+def test_random_messages_match_the_naive_scan():
+    rng = random.Random(7)
+    vocabulary = sorted({word for phrases in PHRASE_DICTIONARIES.values() for phrase in phrases for word in phrase.split()})
+    vocabulary += ["the", "my", "made", "watch", "it", "is", "a", "backs", "refunds", "unbroken"]
+    matcher = PhraseMatcher(PHRASE_DICTIONARIES)
+    for _ in range(500):
+        text = " ".join(rng.choice(vocabulary) for _ in range(rng.randint(1, 12)))
+        assert normalized(matcher.find(text)) == naive_find(PHRASE_DICTIONARIES, text), text
@@ -0,0 +1,72 @@
+"""In-process product catalog against the search-structured route's row scan"""
+
+import random
+
+import pytest
+
+from benchmarks.api_stub import structured_search
+from benchmarks.product_query import catalog_rows, random_params
+from utils.product_catalog import ProductCatalog
+
+
+FIELDS = ("id", "name", "brand", "price", "originalPrice", "description")
+
+
+def comparable(results):
+    return [[doc[key] for key in FIELDS] for doc in results]
+
+
+@pytest.fixture(scope="module")
+def rows():
+    return catalog_rows(3000)
+
+
+@pytest.fixture(scope="module")
+def catalog(rows):
+    catalog = ProductCatalog()
+    catalog.load_from_products(rows)
+    return catalog
+
+
+@pytest.mark.parametrize("limit", [1, 10, 200])
+def test_search_matches_a_linear_scan(rows, catalog, limit):
+    rng = random.Random(limit)
+    for _ in range(300):
+        params = random_params(rng)
+        assert comparable(catalog.search(params, limit)) == comparable(structured_search(rows, params, limit)), params
+
+
+def test_discount_intent_orders_by_markdown(rows, catalog):
+    results = catalog.search({"intent": "discount"}, 50)
+    markdowns = [1 - doc["price"] / doc["originalPrice"] for doc in results]
+    assert results and markdowns == sorted(markdowns, reverse=True)
+    in_stock = {row["id"] for row in rows if row["stock"] > 0}
+    assert all(doc["id"] in in_stock for doc in results)
+
+
+def test_features_and_category_filter_rows():
+    catalog = ProductCatalog()
+    catalog.load_from_products([
+        {"id": "1", "name": "A", "brand": "Rolex", "price": 100, "stock": 1, "category": "Diver", "features": "chronograph date"},
+        {"id": "2", "name": "B", "brand": "Rolex", "price": 200, "stock": 1, "category": "Dress", "features": "date"},
+        {"id": "3", "name": "C", "brand": "Rolex", "price": 300, "stock": 0, "category": "Diver", "features": "chronograph"},
+    ])
+    assert [doc["id"] for doc in catalog.search({"features": ["chronograph"]})] == ["1"]
+    assert [doc["id"] for doc in catalog.search({"category": "dress"})] == ["2"]
+    assert [doc["id"] for doc in catalog.search({"brand": "rol", "features": "date"})] == ["2", "1"]
+
+
+def test_changes_rebuild_the_columns_on_the_next_query():
+    catalog = ProductCatalog()
+    catalog.load_from_products([
+        {"id": "1", "name": "A", "brand": "Omega", "price": 100, "stock": 1},
+        {"id": "2", "name": "B", "brand": "Omega", "price": 200, "stock": 1},
+    ])
+    assert [doc["id"] for doc in catalog.search({"maxPrice": 500})] == ["1", "2"]
+
+    catalog.upsert_products([{"id": "1", "name": "A", "brand": "Omega", "price": 900, "stock": 1}])
+    catalog.remove_products(["2"])
+    catalog.upsert_products([{"id": "3", "name": "C", "brand": "Seiko", "price": 50, "stock": 1}])
+    assert [doc["id"] for doc in catalog.search({"maxPrice": 500})] == ["3"]
+    assert [doc["id"] for doc in catalog.search({"brand": "omega"})] == ["1"]
+    assert catalog.stats["rebuilds"] == 2
@@ -0,0 +1,71 @@
+"""A coalesced burst reaches the session and the workflow as one user message"""
+
+import asyncio
+
+import main
+
+
+class RecordingSessions:
+    def __init__(self):
+        self.messages = []
+
+    async def add_message(self, session_id, message):
+        self.messages.append(message)
+
+    async def update_session(self, session_id, updates):
+        pass
+
+
+class RecordingWorkflow:
+    def __init__(self):
+        self.user_messages = []
+
+    def cancel_summary(self, session_id):
+        pass
+
+    def schedule_summary(self, session_id):
+        pass
+
+    async def process_message(self, session_id, user_message, user_id=None, message_stored=False):
+        assert message_stored
+        self.user_messages.append(user_message)
+        return {
+            "message": "ok", "agent_type": "interaction", "confidence": 1.0, "intent": "general",
+            "sentiment": 0.0, "escalated": False, "metadata": {}
+        }
+
+
+class SilentSocket:
+    async def emit(self, *args, **kwargs):
+        pass
+
+
+def run_burst(monkeypatch, contents):
+    sessions, workflow = RecordingSessions(), RecordingWorkflow()
+    monkeypatch.setattr(main, "session_manager", sessions)
+    monkeypatch.setattr(main, "agent_workflow", workflow)
+    monkeypatch.setattr(main, "sio", SilentSocket())
+    queued = [
+        {"content": content, "user_id": "u1", "timestamp": f"t{index}"}
+        for index, content in enumerate(contents)
+    ]
+    asyncio.run(main.run_turn("s", queued))
+    return sessions.messages, workflow.user_messages
+
+
+def test_burst_is_stored_as_one_user_message(monkeypatch):
+    stored, processed = run_burst(monkeypatch, ["show me", "rolex watches", "under 10k"])
+    user_messages = [message for message in stored if message["sender"] == "user"]
+    assert user_messages == [{
+        "content": "show me\nrolex watches\nunder 10k",
+        "sender": "user",
+        "timestamp": "t2",
+        "metadata": {"coalesced": 3}
+    }]
+    assert processed == ["show me\nrolex watches\nunder 10k"]
+
+
+def test_single_message_has_no_coalesced_metadata(monkeypatch):
+    stored, processed = run_burst(monkeypatch, ["hi"])
+    assert stored[0]["content"] == "hi" and stored[0]["metadata"] is None
+    assert processed == ["hi"]
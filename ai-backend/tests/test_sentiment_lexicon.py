@@ -0,0 +1,59 @@
+"""Local lexicon sentiment scorer: scoring heuristics and when to defer to the LLM"""
+
+import pytest
+
+from utils.sentiment_lexicon import LexiconSentimentScorer
+
+
+@pytest.fixture
+def scorer():
+    return LexiconSentimentScorer(["frustrated", "angry", "terrible"], escalation_threshold=-0.1, ambiguity_margin=0.15)
+
+
+@pytest.mark.parametrize("text", [
+    "show me rolex watches",
+    "thanks, that was really helpful",
+    "hi",
+])
+def test_clear_messages_stay_local(text, scorer):
+    result = scorer.score(text)
+    assert not result["ambiguous"]
+    assert result["sentiment_score"] >= 0
+    assert scorer.stats["local"] == 1
+
+
+def test_strong_negatives_escalate_locally(scorer):
+    result = scorer.score("This is TERRIBLE, I am so angry!!")
+    assert not result["ambiguous"]
+    assert result["frustration_level"] == "high"
+    assert result["escalation_recommended"] == "yes"
+
+
+def test_negation_and_intensifiers(scorer):
+    assert scorer.score("not good")["sentiment_score"] < 0 < scorer.score("not bad")["sentiment_score"]
+    assert scorer.score("very good")["sentiment_score"] > scorer.score("good")["sentiment_score"]
+
+
+def test_shouting_without_sentiment_words_reads_as_irritation(scorer):
+    assert scorer.score("WHERE IS MY WATCH")["sentiment_score"] < 0
+
+
+@pytest.mark.parametrize("text", [
+    "I've been waiting three weeks for my order and nobody answers my emails",
+    "This is the third time I'm asking. Where is my watch?",
+    "I don't like this watch at all",
+    "Great, another delay. Just great.",
+    "I still haven't received anything",
+])
+def test_complaints_and_conflicting_signals_go_to_the_llm(text, scorer):
+    result = scorer.score(text)
+    assert result["ambiguous"]
+    assert scorer.stats["local"] == 0
+
+
+def test_hit_rates_count_llm_escalations(scorer):
+    scorer.score("hi")
+    scorer.score("I don't like this watch at all")
+    scorer.record_llm_escalation()
+    rates = scorer.hit_rates()
+    assert (rates["local_hits"], rates["llm_hits"], rates["local_rate"]) == (1, 1, 0.5)
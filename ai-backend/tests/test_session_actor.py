@@ -0,0 +1,52 @@
+"""Per-session actors: one turn at a time, bursts coalesced into the next turn"""
+
+import asyncio
+
+from utils.session_actor import SessionActors
+
+
+def test_messages_arriving_mid_turn_share_the_next_turn():
+    turns = []
+
+    async def run():
+        gate = asyncio.Event()
+
+        async def handler(session_id, batch):
+            turns.append((session_id, [item["content"] for item in batch]))
+            if len(turns) == 1:
+                await gate.wait()
+
+        actors = SessionActors(handler)
+        actors.submit("s", {"content": "hi"})
+        await asyncio.sleep(0)
+        for content in ("show me", "rolex", "watches"):
+            actors.submit("s", {"content": content})
+        assert actors.snapshot()["queued_messages"] == 3
+        gate.set()
+        while actors.workers:
+            await asyncio.sleep(0)
+        return actors
+
+    actors = asyncio.run(run())
+    assert turns == [("s", ["hi"]), ("s", ["show me", "rolex", "watches"])]
+    assert actors.stats == {"messages": 4, "turns": 2, "coalesced": 2}
+
+
+def test_failed_turn_does_not_stop_the_worker():
+    turns = []
+
+    async def handler(session_id, batch):
+        turns.append(batch[0]["content"])
+        if batch[0]["content"] == "boom":
+            raise RuntimeError("boom")
+
+    async def run():
+        actors = SessionActors(handler)
+        actors.submit("s", {"content": "boom"})
+        await asyncio.sleep(0)
+        actors.submit("s", {"content": "next"})
+        while actors.workers:
+            await asyncio.sleep(0)
+
+    asyncio.run(run())
+    assert turns == ["boom", "next"]
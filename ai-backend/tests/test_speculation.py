@@ -0,0 +1,74 @@
+"""Speculative product retrieval: parameter extraction, gating and claiming"""
+
+import asyncio
+from unittest import mock
+
+from utils.speculation import ProductSpeculator, extract_search_params, param_count, params_match
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_extract_search_params():
+    assert extract_search_params("Rolex between $5k and 10,000") == {
+        "brand": "Rolex", "minPrice": 5000.0, "maxPrice": 10000.0, "intent": "general"
+    }
+    assert extract_search_params("cheap casio under 200") == {
+        "brand": "Casio", "maxPrice": 200.0, "intent": "affordable"
+    }
+    assert extract_search_params("hello") == {"intent": "general"}
+
+
+def test_param_count_ignores_general_intent():
+    assert param_count({"intent": "general"}) == 0
+    assert param_count({"brand": "Rolex", "intent": "general"}) == 1
+    assert param_count({"brand": "Rolex", "intent": "luxury"}) == 2
+
+
+def test_params_match_normalizes():
+    assert params_match({"brand": "Rolex", "maxPrice": 5000}, {"brand": " rolex ", "maxPrice": "5000", "intent": None})
+    assert not params_match({"brand": "Rolex"}, {"brand": "Omega"})
+
+
+def _speculate(speculator, message, intent, claim_params=None):
+    calls = []
+
+    async def search(params, limit=10):
+        calls.append(params)
+        return [{"id": "1"}]
+
+    async def turn():
+        with mock.patch("tools.database_tools.search_products_with_params", search):
+            with speculator.speculate(message, intent) as speculation:
+                claimed = await speculator.claim(claim_params) if claim_params is not None else None
+                return speculation, claimed
+
+    speculation, claimed = run(turn())
+    return speculation, claimed, calls
+
+
+def test_speculation_is_gated_on_likely_retrieval():
+    speculator = ProductSpeculator()
+    assert _speculate(speculator, "my rolex arrived scratched", "technical_issue")[0] is None
+    assert _speculate(speculator, "tell me about rolex", None)[0] is None
+    assert _speculate(speculator, "show me rolex watches", "product_inquiry")[0] is not None
+    assert _speculate(speculator, "rolex under 5000", None)[0] is not None
+    assert speculator.stats["skipped"] == 2
+    assert speculator.stats["started"] == 2
+    assert speculator.stats["unused"] == 2
+
+
+def test_matching_claim_reuses_the_lookup():
+    speculator = ProductSpeculator()
+    _, claimed, calls = _speculate(speculator, "rolex under 5000", None, {"brand": "rolex", "maxPrice": 5000})
+    assert claimed == [{"id": "1"}]
+    assert len(calls) == 1
+    assert speculator.stats["hits"] == 1
+
+
+def test_mismatched_claim_searches_again():
+    speculator = ProductSpeculator()
+    _, claimed, _ = _speculate(speculator, "rolex under 5000", None, {"brand": "omega", "maxPrice": 5000})
+    assert claimed is None
+    assert speculator.stats["mismatches"] == 1
@@ -0,0 +1,79 @@
+"""BM25 product index: tokenization, ranking and incremental updates"""
+
+from utils.text_index import BM25Index, tokenize
+
+
+PRODUCTS = [
+    {"id": "1", "name": "Submariner", "brand": "Rolex", "category": "Diver", "description": "Steel dive watch"},
+    {"id": "2", "name": "Seamaster", "brand": "Omega", "category": "Diver", "description": "Ceramic bezel dive watch"},
+    {"id": "3", "name": "Santos", "brand": "Cartier", "category": "Dress", "description": "Gold dress watch"},
+    {"id": "4", "name": "G-Shock", "brand": "Casio", "category": "Sport", "description": "Resin digital watch"},
+]
+
+
+def ids(results):
+    return [result["id"] for result in results]
+
+
+def index():
+    bm25 = BM25Index()
+    bm25.load_from_products(PRODUCTS)
+    return bm25
+
+
+def test_tokenize_drops_stopwords_and_folds_plurals():
+    assert tokenize("Show me the Dive Watches with batteries") == ["dive", "watch", "battery"]
+
+
+def test_search_ranks_matching_fields():
+    bm25 = index()
+    assert ids(bm25.search("rolex dive watch"))[0] == "1"
+    assert set(ids(bm25.search("diver"))) == {"1", "2"}
+    assert bm25.search("platinum") == []
+
+
+def test_name_outweighs_description():
+    bm25 = BM25Index()
+    bm25.load_from_products([
+        {"id": "desc", "name": "Classic", "description": "a santos style case"},
+        {"id": "name", "name": "Santos", "description": "a classic case"},
+    ])
+    assert ids(bm25.search("santos")) == ["name", "desc"]
+
+
+def test_upsert_reindexes_changed_product():
+    bm25 = index()
+    bm25.upsert_products([{**PRODUCTS[0], "description": "Platinum dive watch"}])
+    assert ids(bm25.search("platinum")) == ["1"]
+    assert "1" not in ids(bm25.search("steel"))
+    assert len(bm25) == len(PRODUCTS)
+
+    bm25.upsert_products([{"id": "5", "name": "Aquanaut", "brand": "Patek Philippe"}])
+    assert ids(bm25.search("aquanaut")) == ["5"]
+    assert len(bm25) == len(PRODUCTS) + 1
+
+
+def test_removed_products_leave_results_and_are_compacted():
+    bm25 = index()
+    bm25.remove_products(["2"])
+    assert ids(bm25.search("diver")) == ["1"]
+    assert len(bm25) == 3
+    assert len(bm25.documents) == 4
+
+    # Past COMPACT_FRACTION dead documents the postings are rebuilt
+    bm25.remove_products(["4", "missing"])
+    assert len(bm25.documents) == len(bm25) == 2
+    assert set(ids(bm25.search("watch"))) == {"1", "3"}
+    assert ids(bm25.search("santos")) == ["3"]
+
+
+def test_search_matches_a_fresh_index_after_updates():
+    bm25 = index()
+    bm25.remove_products(["3"])
+    bm25.upsert_products([{**PRODUCTS[1], "description": "Blue dive watch"}])
+    fresh = BM25Index()
+    fresh.load_from_products([PRODUCTS[0], PRODUCTS[3], {**PRODUCTS[1], "description": "Blue dive watch"}])
+    for query in ("dive watch", "blue", "rolex", "digital"):
+        expected = {result["id"]: round(result["similarity_score"], 9) for result in fresh.search(query)}
+        actual = {result["id"]: round(result["similarity_score"], 9) for result in bm25.search(query)}
+        assert actual == expected
@@ -3,6 +3,7 @@ import logging
 from typing import List, Dict, Any, Optional
 
 from config import settings
+from utils.product_catalog import product_catalog
 
 # Base URL for Next.js API
 API_BASE_URL = "http://127.0.0.1:3000/api"
@@ -112,7 +113,14 @@ async def search_products_with_params(params: Dict[str, Any], limit: int = 10) -
     - minPrice: int - Minimum price
     - features: str - Features to search for
     - intent: str - "luxury", "affordable", "discount", "general"
+    
+    Answered from the in-process product catalog when it was loaded from
+    the SQLite catalog tables; otherwise (e.g. a PostgreSQL DATABASE_URL)
+    the Next.js route runs the query.
     """
+    if settings.local_product_search and product_catalog.ready:
+        return product_catalog.search(params, limit)
+    
     try:
         async with httpx.AsyncClient() as client:
             response = await client.post(
@@ -0,0 +1,182 @@
+"""Approximate nearest-neighbour search (IVF-flat) over SimpleVectorStore embeddings"""
+
+import math
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+# Vectors sampled to train the coarse quantizer
+TRAINING_SAMPLE = 20000
+KMEANS_ITERATIONS = 10
+
+
+class IVFFlatIndex:
+    """
+    Inverted-file index: k-means splits the vectors into `nlist` cells and
+    a query is scored exactly against the rows of its `nprobe` closest
+    cells only. More probes buy recall at the cost of latency.
+
+    The index stores row numbers, not vectors; scoring reads the rows from
+    the store's matrix. Rows are added and removed incrementally, and the
+    quantizer is retrained once the collection has grown `retrain_growth`
+    times past the size it was trained on.
+    """
+
+    def __init__(self, dim: int, nlist: int = 0, nprobe: int = 8, retrain_growth: float = 4.0, seed: int = 0):
+        self.dim = dim
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.retrain_growth = retrain_growth
+        self.seed = seed
+        self.reset()
+
+    def reset(self):
+        """Forget the cells and every row"""
+        self.centroids: Optional[np.ndarray] = None
+        self.trained_size = 0
+        self._lists: Optional[List[List[int]]] = []
+        self._cells = np.zeros(0, dtype=np.int32)  # row -> cell
+        self._arrays: List[Optional[np.ndarray]] = []  # per-cell row arrays, rebuilt lazily
+        # Cell membership as (offsets, rows) arrays while mapped from an index file
+        self._frozen: Optional[Tuple[np.ndarray, np.ndarray]] = None
+
+    @property
+    def trained(self) -> bool:
+        return self.centroids is not None
+
+    def needs_training(self, size: int) -> bool:
+        return not self.trained or size > self.trained_size * self.retrain_growth
+
+    def train(self, vectors: np.ndarray):
+        """Fit the cells on `vectors` (the whole collection) and assign every row"""
+        count = len(vectors)
+        nlist = self.nlist or max(1, int(4 * math.sqrt(count)))
+        nlist = min(nlist, count)
+        rng = np.random.default_rng(self.seed)
+        sample = vectors[rng.choice(count, min(count, max(TRAINING_SAMPLE, nlist)), replace=False)]
+
+        # Spherical k-means: vectors are unit length, so assign by dot product
+        centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+        for _ in range(KMEANS_ITERATIONS):
+            assignment = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, sample)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            filled = norms[:, 0] > 0
+            centroids[filled] = sums[filled] / norms[filled]
+
+        self.centroids = centroids.astype(np.float32)
+        self.trained_size = count
+        self._lists = [[] for _ in range(nlist)]
+        self._arrays = [None] * nlist
+        self._cells = np.zeros(0, dtype=np.int32)
+        self._frozen = None
+        self.add(np.arange(count), vectors)
+
+    def add(self, rows: np.ndarray, vectors: np.ndarray):
+        """Assign new rows (with their vectors) to their nearest cells"""
+        if not self.trained or not len(rows):
+            return
+        self._thaw()
+        cells = self._nearest_cells(vectors, 1)[:, 0]
+        end = int(rows.max()) + 1
+        if end > len(self._cells):
+            grown = np.zeros(max(end, 2 * len(self._cells)), dtype=np.int32)
+            grown[:len(self._cells)] = self._cells
+            self._cells = grown
+        self._cells[rows] = cells
+
+        # Group rows by cell so each touched list is extended once
+        order = np.argsort(cells, kind="stable")
+        touched, starts = np.unique(cells[order], return_index=True)
+        for cell, group in zip(touched.tolist(), np.split(rows[order], starts[1:])):
+            self._lists[cell].extend(group.tolist())
+            self._arrays[cell] = None
+
+    def remove(self, row: int):
+        if not self.trained:
+            return
+        self._thaw()
+        cell = int(self._cells[row])
+        self._lists[cell].remove(row)
+        self._arrays[cell] = None
+
+    def move(self, source: int, target: int):
+        """Row `source` now lives at `target` (the store compacts on delete)"""
+        if not self.trained:
+            return
+        self._thaw()
+        cell = int(self._cells[source])
+        members = self._lists[cell]
+        members[members.index(source)] = target
+        self._cells[target] = cell
+        self._arrays[cell] = None
+
+    def search(self, queries: np.ndarray, matrix: np.ndarray, k: int) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """(rows, scores) of the approximate top-k for each query, best first"""
+        probes = self._nearest_cells(queries, min(self.nprobe, len(self.centroids)))
+        results = []
+        for query, cells in zip(queries, probes):
+            candidates = np.concatenate([self._rows(cell) for cell in cells])
+            if not len(candidates):
+                results.append((candidates, np.zeros(0, dtype=np.float32)))
+                continue
+            scores = matrix[candidates] @ query
+            if k < len(candidates):
+                best = np.argpartition(-scores, k - 1)[:k]
+            else:
+                best = np.arange(len(candidates))
+            best = best[np.lexsort((candidates[best], -scores[best]))]
+            results.append((candidates[best], scores[best]))
+        return results
+
+    def to_arrays(self, count: int) -> Tuple[Dict[str, np.ndarray], Dict[str, Any]]:
+        """Cells of the first `count` rows as flat arrays, plus metadata, for an index file"""
+        members = [self._rows(cell) for cell in range(len(self.centroids))]
+        offsets = np.zeros(len(members) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(rows) for rows in members])
+        arrays = {
+            "centroids": self.centroids,
+            "cells": self._cells[:count].astype(np.int32),
+            "list_offsets": offsets,
+            "list_rows": np.concatenate(members).astype(np.int64) if members else np.zeros(0, dtype=np.int64)
+        }
+        return arrays, {"trained_size": self.trained_size}
+
+    def restore(self, arrays: Dict[str, np.ndarray], meta: Dict[str, Any]):
+        """Adopt cells saved by to_arrays; they stay memory-mapped until the first change"""
+        self.centroids = arrays["centroids"]
+        self.trained_size = meta["trained_size"]
+        self._cells = arrays["cells"]
+        self._lists = None
+        self._arrays = [None] * len(self.centroids)
+        self._frozen = (arrays["list_offsets"], arrays["list_rows"])
+
+    def _thaw(self):
+        """Copy mapped cells into mutable lists before the first change"""
+        if self._frozen is None:
+            return
+        offsets, rows = self._frozen
+        self._lists = [rows[offsets[cell]:offsets[cell + 1]].tolist() for cell in range(len(offsets) - 1)]
+        self._cells = np.array(self._cells, dtype=np.int32)
+        self._arrays = [None] * len(self._lists)
+        self._frozen = None
+
+    def _rows(self, cell: int) -> np.ndarray:
+        if self._frozen is not None:
+            offsets, rows = self._frozen
+            return rows[offsets[cell]:offsets[cell + 1]]
+        if self._arrays[cell] is None:
+            self._arrays[cell] = np.array(self._lists[cell], dtype=np.int64)
+        return self._arrays[cell]
+
+    def _nearest_cells(self, vectors: np.ndarray, count: int) -> np.ndarray:
+        similarity = vectors @ self.centroids.T
+        if count == 1:
+            return np.argmax(similarity, axis=1)[:, None]
+        if count < similarity.shape[1]:
+            nearest = np.argpartition(-similarity, count - 1, axis=1)[:, :count]
+        else:
+            nearest = np.tile(np.arange(similarity.shape[1]), (len(vectors), 1))
+        return nearest
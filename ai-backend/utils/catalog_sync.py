@@ -0,0 +1,276 @@
+"""Catalog sync - bulk load and incremental deltas from the Watch/Brand/Category tables into the retrieval index"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import time
+from contextlib import closing
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from config import settings
+
+
+_WATCH_COLUMNS = (
+    'id, name, brandId, categoryId, price, originalPrice, description, '
+    'gender, stock, features, createdAt, updatedAt'
+)
+
+
+def sqlite_path(database_url: str) -> Optional[str]:
+    """Filesystem path of a Prisma SQLite URL ("file:./dev.db"), else None"""
+    if not database_url or not database_url.startswith("file:"):
+        return None
+    return database_url[len("file:"):].split("?", 1)[0]
+
+
+class CatalogSync:
+    """
+    Keeps search indexes in step with the product tables. A bulk load reads
+    every watch once; after that each sync reads only the watches whose
+    `updatedAt` moved past the high-water mark and re-indexes just those.
+    Deletions are detected by comparing the row count with the known ids
+    (the id list is only read when they disagree), and renamed brands or
+    categories re-index the watches that reference them. The watermark and
+    lookups only move once every sink has taken a delta, so a failed read
+    or sink is retried on the next sync.
+
+    Indexes are registered as sinks and need upsert_products and
+    remove_products.
+    """
+
+    def __init__(self, database_url: str, sinks: List[Any], interval: float = 30.0):
+        self.path = sqlite_path(database_url)
+        self.sinks = sinks
+        self.interval = interval
+        self.products: Dict[str, Dict[str, Any]] = {}
+        self.watermark: Any = None
+        # Ids already applied at exactly the watermark (rows can share an updatedAt)
+        self._at_watermark: Set[str] = set()
+        self._brands: Dict[str, Dict[str, Any]] = {}
+        self._categories: Dict[str, str] = {}
+        self._task: Optional[asyncio.Task] = None
+        # Set when deltas were applied since the index was last saved
+        self.dirty = False
+        self.stats = {"syncs": 0, "upserted": 0, "removed": 0, "last_sync": None, "last_error": None}
+
+    @property
+    def available(self) -> bool:
+        return self.path is not None and os.path.exists(self.path)
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+        connection.row_factory = sqlite3.Row
+        return connection
+
+    def bulk_load(self) -> List[Dict[str, Any]]:
+        """Read the whole catalog and set the high-water mark (the caller loads the sinks)"""
+        with closing(self._connect()) as connection:
+            brands, categories, _ = self._read_lookups(connection)
+            rows = connection.execute(f'SELECT {_WATCH_COLUMNS} FROM "Watch"').fetchall()
+
+        self._brands, self._categories = brands, categories
+        self.products = {}
+        watermark, at_watermark = None, set()
+        for row in rows:
+            self.products[row["id"]] = self._to_product(row, brands, categories)
+            watermark, at_watermark = _advance_watermark(watermark, at_watermark, row)
+        self.watermark, self._at_watermark = watermark, at_watermark
+        print(f"✓ Catalog read: {len(self.products)} watches from {self.path}")
+        return list(self.products.values())
+
+    def sync(self) -> Dict[str, int]:
+        """Apply changes since the last sync; returns counts of re-indexed and removed watches"""
+        return self.apply_changes(*self.fetch_changes())
+
+    def fetch_changes(self) -> Tuple[Dict[str, Dict[str, Any]], List[str], Dict[str, Any]]:
+        """
+        (changed products by id, removed ids, cursor) since the last sync.
+        Reads the database only; the cursor (next watermark and lookups) is
+        committed by apply_changes once every sink took the changes.
+        """
+        with closing(self._connect()) as connection:
+            brands, categories, lookups_changed = self._read_lookups(connection)
+            if self.watermark is None:
+                rows = connection.execute(f'SELECT {_WATCH_COLUMNS} FROM "Watch"').fetchall()
+            else:
+                rows = connection.execute(
+                    f'SELECT {_WATCH_COLUMNS} FROM "Watch" WHERE updatedAt >= ? ORDER BY updatedAt',
+                    (self.watermark,)
+                ).fetchall()
+            count = connection.execute('SELECT COUNT(*) FROM "Watch"').fetchone()[0]
+
+            changed: Dict[str, Dict[str, Any]] = {}
+            watermark, at_watermark = self.watermark, set(self._at_watermark)
+            for row in rows:
+                if row["updatedAt"] == self.watermark and row["id"] in self._at_watermark:
+                    continue
+                changed[row["id"]] = self._to_product(row, brands, categories)
+                watermark, at_watermark = _advance_watermark(watermark, at_watermark, row)
+
+            # Watches whose brand or category row changed keep their updatedAt
+            if lookups_changed:
+                for product_id, product in self.products.items():
+                    if product_id not in changed and (
+                        product["brandId"] in lookups_changed or product["categoryId"] in lookups_changed
+                    ):
+                        changed[product_id] = _relabel(product, brands, categories)
+
+            removed: List[str] = []
+            known = set(self.products) | set(changed)
+            if count != len(known):
+                live = {row[0] for row in connection.execute('SELECT id FROM "Watch"')}
+                removed = [product_id for product_id in known if product_id not in live]
+
+        cursor = {"watermark": watermark, "at_watermark": at_watermark, "brands": brands, "categories": categories}
+        return changed, removed, cursor
+
+    def apply_changes(
+        self,
+        changed: Dict[str, Dict[str, Any]],
+        removed: List[str],
+        cursor: Dict[str, Any]
+    ) -> Dict[str, int]:
+        """
+        Update the sinks, then commit the cursor; runs on the event loop so
+        searches never see a half-applied batch. If a sink raises nothing is
+        committed and the next sync fetches the same delta again (upserts
+        and removals are idempotent, so sinks that already took it are fine).
+        """
+        for product_id in removed:
+            changed.pop(product_id, None)
+        if changed or removed:
+            for sink in self.sinks:
+                if changed:
+                    sink.upsert_products(list(changed.values()))
+                if removed:
+                    sink.remove_products(removed)
+            self.dirty = True
+
+        for product_id in removed:
+            self.products.pop(product_id, None)
+        self.products.update(changed)
+        self.watermark, self._at_watermark = cursor["watermark"], cursor["at_watermark"]
+        self._brands, self._categories = cursor["brands"], cursor["categories"]
+
+        self.stats["syncs"] += 1
+        self.stats["upserted"] += len(changed)
+        self.stats["removed"] += len(removed)
+        self.stats["last_sync"] = time.time()
+        return {"upserted": len(changed), "removed": len(removed)}
+
+    def start(self):
+        """Sync every `interval` seconds in the background (no-op when the interval is 0)"""
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                # sqlite3 blocks; read in a thread, apply on the loop
+                result = self.apply_changes(*await asyncio.to_thread(self.fetch_changes))
+                self.stats["last_error"] = None
+                if result["upserted"] or result["removed"]:
+                    print(f"✓ Catalog sync: {result['upserted']} re-indexed, {result['removed']} removed")
+            except Exception as e:
+                self.stats["last_error"] = str(e)
+                print(f"✗ Catalog sync error: {e}")
+
+    def _read_lookups(
+        self,
+        connection: sqlite3.Connection
+    ) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, str], Set[str]]:
+        """(brands, categories, ids whose name or image changed since the committed lookups)"""
+        brands = {
+            row["id"]: {"name": row["name"], "image": row["image"]}
+            for row in connection.execute('SELECT id, name, image FROM "Brand"')
+        }
+        categories = {row["id"]: row["name"] for row in connection.execute('SELECT id, name FROM "Category"')}
+        changed = set()
+        if self._brands or self._categories:
+            changed = {
+                key for key in set(brands) | set(self._brands) if brands.get(key) != self._brands.get(key)
+            } | {
+                key for key in set(categories) | set(self._categories) if categories.get(key) != self._categories.get(key)
+            }
+        return brands, categories, changed
+
+    def _to_product(
+        self,
+        row: sqlite3.Row,
+        brands: Dict[str, Dict[str, Any]],
+        categories: Dict[str, str]
+    ) -> Dict[str, Any]:
+        """Same shape as the Next.js product search results, plus category and index fields"""
+        features = row["features"]
+        try:
+            features = json.loads(features) if isinstance(features, str) else features
+        except ValueError:
+            pass
+        return _relabel({
+            "id": row["id"],
+            "name": row["name"],
+            "price": row["price"],
+            "originalPrice": row["originalPrice"],
+            "description": row["description"],
+            "gender": row["gender"],
+            "stock": row["stock"],
+            "features": _feature_text(features),
+            "brandId": row["brandId"],
+            "categoryId": row["categoryId"],
+            "createdAt": row["createdAt"],
+            "updatedAt": row["updatedAt"],
+        }, brands, categories)
+
+
+def _advance_watermark(watermark: Any, at_watermark: Set[str], row: sqlite3.Row) -> Tuple[Any, Set[str]]:
+    """(watermark, ids applied at it) after also applying `row`"""
+    updated_at = row["updatedAt"]
+    if watermark is None or updated_at > watermark:
+        return updated_at, {row["id"]}
+    if updated_at == watermark:
+        at_watermark.add(row["id"])
+    return watermark, at_watermark
+
+
+def _relabel(
+    product: Dict[str, Any],
+    brands: Dict[str, Dict[str, Any]],
+    categories: Dict[str, str]
+) -> Dict[str, Any]:
+    brand = brands.get(product["brandId"], {})
+    return {
+        **product,
+        "brand": brand.get("name", ""),
+        "image": brand.get("image"),
+        "category": categories.get(product["categoryId"], ""),
+    }
+
+
+def _feature_text(features: Any) -> str:
+    """Flatten the features JSON into searchable text ({"chronograph": true} -> "chronograph")"""
+    if isinstance(features, dict):
+        parts = []
+        for key, value in features.items():
+            if value is True:
+                parts.append(str(key))
+            elif value not in (False, None, ""):
+                parts.append(f"{key} {_feature_text(value)}")
+        return " ".join(parts)
+    if isinstance(features, list):
+        return " ".join(_feature_text(item) for item in features)
+    return "" if features is None else str(features)
+
+
+# Global catalog sync instance (indexes register as sinks at startup)
+catalog_sync = CatalogSync(settings.database_url, [], settings.catalog_sync_interval_seconds)
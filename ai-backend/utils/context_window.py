@@ -0,0 +1,112 @@
+"""Token-budgeted conversation history windows shared by all agents"""
+
+import re
+from typing import Any, Dict, List, Optional
+
+from config import settings
+
+
+# Words, numbers and single punctuation marks; long words count as several tokens
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+TRUNCATION_MARKER = " [...]"
+
+
+def estimate_tokens(text: str) -> int:
+    """Fast local approximation of the model's token count (no tokenizer needed)"""
+    return sum((len(piece) + 3) // 4 for piece in _TOKEN_PATTERN.findall(text or ""))
+
+
+def parse_budgets(spec: str) -> Dict[str, int]:
+    """"agent=tokens,agent=tokens" -> {agent: tokens}"""
+    budgets = {}
+    for item in spec.split(","):
+        name, _, value = item.partition("=")
+        if name.strip() and value.strip():
+            budgets[name.strip()] = int(value)
+    return budgets
+
+
+_BUDGETS = parse_budgets(settings.history_token_budgets)
+
+
+def budget_for(agent: str) -> int:
+    return _BUDGETS.get(agent, settings.history_default_tokens)
+
+
+def truncate_text(text: str, max_tokens: int) -> str:
+    """Cut `text` to roughly `max_tokens`, keeping its beginning"""
+    if max_tokens <= 0 or estimate_tokens(text) <= max_tokens:
+        return text
+    used = 0
+    for match in _TOKEN_PATTERN.finditer(text):
+        used += (len(match.group()) + 3) // 4
+        if used > max_tokens:
+            return text[:match.start()].rstrip() + TRUNCATION_MARKER
+    return text
+
+
+def build_window(
+    messages: List[Dict[str, Any]],
+    agent: str,
+    budget: Optional[int] = None,
+    max_message_tokens: Optional[int] = None,
+    oldest_first: bool = False
+) -> List[Dict[str, Any]]:
+    """
+    Newest messages that fit in the agent's token budget, in chronological order
+
+    Args:
+        messages: Conversation messages, oldest first
+        agent: Key into HISTORY_TOKEN_BUDGETS
+        budget: Explicit budget overriding the agent's
+        max_message_tokens: Truncate longer messages to this size
+            (defaults to HISTORY_MESSAGE_MAX_TOKENS; 0 disables truncation)
+        oldest_first: Pack the oldest messages instead, so the window is
+            always a prefix of `messages` (the memory agent summarizes
+            the rest on its next refresh)
+
+    Returns:
+        The packed window. The newest (oldest with `oldest_first`)
+        message is always included, truncated to the budget if it is
+        larger on its own.
+    """
+    budget = budget_for(agent) if budget is None else budget
+    if max_message_tokens is None:
+        max_message_tokens = settings.history_message_max_tokens
+
+    window = []
+    used = 0
+    for msg in (messages if oldest_first else reversed(messages)):
+        content = msg.get("content", "") or ""
+        if max_message_tokens:
+            content = truncate_text(content, max_message_tokens)
+        tokens = estimate_tokens(content)
+        if used + tokens > budget:
+            if not window:
+                window.append({**msg, "content": truncate_text(content, budget)})
+            break
+        window.append(msg if content is msg.get("content") else {**msg, "content": content})
+        used += tokens
+    if not oldest_first:
+        window.reverse()
+    return window
+
+
+def window_tokens(messages: List[Dict[str, Any]], max_message_tokens: Optional[int] = None) -> int:
+    """Tokens `messages` take in a window, after per-message truncation"""
+    if max_message_tokens is None:
+        max_message_tokens = settings.history_message_max_tokens
+    return sum(
+        estimate_tokens(truncate_text(msg.get("content", "") or "", max_message_tokens) if max_message_tokens else msg.get("content", ""))
+        for msg in messages
+    )
+
+
+def format_history(messages: List[Dict[str, Any]], timestamps: bool = False) -> str:
+    """SENDER: content lines, as the agents' prompts expect"""
+    lines = []
+    for msg in messages:
+        line = f"{msg.get('sender', 'unknown').upper()}: {msg.get('content', '')}"
+        lines.append(f"[{msg.get('timestamp', '')}] {line}" if timestamps else line)
+    return "\n".join(lines)
@@ -66,15 +66,33 @@ Create a concise summary including:
 
 Summary (max 100 words):"""
 
+# Incremental summary: fold only the messages since the last summary into it
+INCREMENTAL_SUMMARY_PROMPT = """Update the running summary of a customer conversation with the new messages.
+
+Current Summary:
+{conversation_summary}
+
+New Messages:
+{new_messages}
+
+Keep everything in the current summary that still matters and add from the new messages:
+- User's main intent/goal
+- Products discussed
+- Questions asked and answered
+- Any unresolved issues
+- User preferences mentioned
+
+Updated summary (max 100 words):"""
+
 # Sentiment Analysis Prompt (Agent 4)
-SENTIMENT_ANALYSIS_PROMPT = """Analyze the user's emotional state based on the ENTIRE conversation history.
+SENTIMENT_ANALYSIS_PROMPT = """Analyze the user's emotional state in their current message, given the running conversation state.
 Look for:
-1. Cumulative frustration (user repeating themselves, getting impatient).
+1. Cumulative frustration (negative turns so far, user repeating themselves, getting impatient).
 2. Explicit signs of anger ("useless", "stupid", "bad", "human").
 3. Unresolved issues (AI failing to give a good answer multiple times).
 
-Chat History:
-{chat_history}
+Conversation State:
+{conversation_state}
 
 Current Message: {user_message}
 
@@ -82,7 +100,7 @@ Provide:
 1. Sentiment Score (-1.0 to 1.0): -1 is very angry, 0 is neutral, 1 is happy.
 2. Frustration Level (low/medium/high):
 3. Escalation Recommended (yes/no): Recommend YES if there is any sign of frustration or if the AI is failing.
-4. Reason: specific evidence from history.
+4. Reason: specific evidence from the message and conversation state.
 
 Format your response as JSON with keys: sentiment_score, frustration_level, escalation_recommended, reason"""
 
@@ -125,3 +143,70 @@ Generate:
 4. Any urgent flags or concerns
 
 Format as structured JSON with keys: issue_summary, key_points, suggested_approach, urgent_flags"""
+
+# Response Plan Prompt (Agent 9) - search parameters and tool action in one call
+RESPONSE_PLAN_PROMPT = """You are the planning agent for Chronos, a luxury watch store.
+In ONE step, decide which products to look up and which action to take for the user's message.
+
+Conversation History:
+{conversation_context}
+
+CONTEXT:
+{context}
+
+User Message: "{user_message}"
+
+1. SEARCH (set to null if no product lookup is needed):
+   - brand: brand name if mentioned (e.g., "Rolex", "Patek Philippe", "Titan", "Casio", "Fossil")
+   - model: specific model name if mentioned (e.g., "Submariner", "G-Shock")
+   - maxPrice: for "under X", "below X", "less than X"
+   - minPrice: for "above X", "over X", "at least X"; "between X and Y" sets both
+   - intent: "luxury" (expensive, premium, costliest), "affordable" (cheap, budget, cheapest), "discount" (sale, deal) or "general"
+   - features: e.g. "chronograph", "automatic", "diving"
+   Numbers are extracted as-is (10000 stays 10000). Resolve references to earlier products from the history.
+
+2. ACTION, one of:
+   - "search_products": user is browsing or asking about watches
+   - "add_to_cart" {{"watch_id": "string", "quantity": number}}, "update_cart_quantity" {{"watch_id": "string", "quantity": number}}, "add_to_wishlist" {{"watch_id": "string"}}
+     (ALWAYS use an "id" from the Retrieved Products in CONTEXT)
+   - "create_order", "clear_cart", "clear_wishlist", "get_orders", "wishlist_to_order", "wishlist_to_cart" {{}}
+   - "update_address" {{"new_address": "string"}}
+   - "escalate_to_human" {{"reason": "string"}}: very angry user, legal threats, or explicit request for a human. Required if Frustration Level is HIGH.
+   - "request_consultation" {{"topic": "string"}}: user is undecided or confused
+   - "direct_response" {{"response": "string"}}: greetings, small talk, cart/wishlist questions answered from CONTEXT
+
+3. ANSWER_NEEDED: true only when the action is "search_products" and the user asked a question that needs a
+   written answer about the products (features, comparisons, prices). false for plain browsing.
+
+Return ONLY valid JSON, no markdown:
+{{"search": {{"brand": "Rolex", "maxPrice": 20000, "intent": "general"}}, "action": "search_products", "arguments": {{}}, "answer_needed": false}}
+
+Example (Chat):
+{{"search": null, "action": "direct_response", "arguments": {{"response": "Hello! Welcome to Chronos. How can I assist you today?"}}, "answer_needed": false}}"""
+
+# Batched classification prompts (LLM scheduler) - one request answers several sessions
+INTENT_BATCH_PROMPT = """You are a website interaction classifier. Classify EACH numbered user query independently.
+
+Queries:
+{items}
+
+Categories:
+product_inquiry, purchase, cart_management, order_tracking, account_support, pricing,
+technical_issue, general_chat, consultation, refund_request, human_handoff
+- "cart_management" covers viewing or clearing; "purchase" covers adding or buying
+- "consultation" is for undecided users who need guidance choosing a watch
+- "refund_request" is for returns/refunds; "human_handoff" is for explicit requests for a human or anger
+
+Return ONLY a JSON object mapping each query number to its category name, e.g.:
+{{"1": "product_inquiry", "2": "general_chat"}}"""
+
+SENTIMENT_BATCH_PROMPT = """Analyze the user's emotional state in the current message of EACH numbered conversation independently.
+Use its conversation state for cumulative frustration; look for explicit anger ("useless", "stupid", "bad", "human") and unresolved issues.
+
+{items}
+
+For each conversation provide sentiment_score (-1.0 very angry to 1.0 happy), frustration_level (low/medium/high),
+escalation_recommended (yes/no; yes on any sign of frustration or AI failure) and reason.
+
+Return ONLY a JSON object keyed by conversation number, e.g.:
+{{"1": {{"sentiment_score": 0.2, "frustration_level": "low", "escalation_recommended": "no", "reason": "..."}}}}"""
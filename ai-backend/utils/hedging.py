@@ -0,0 +1,168 @@
+"""Hedged LLM requests - fire a duplicate when a call outlives its latency percentile"""
+
+import asyncio
+import time
+from collections import defaultdict, deque
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, Optional, Tuple
+
+
+class HedgePolicy:
+    """
+    Tracks recent call latencies per model. Once a call has run longer
+    than the `percentile` of its model's latencies (clamped to
+    [min_delay, max_delay]), a duplicate is started and whichever answers
+    first wins; the other is cancelled. At most `max_rate` of calls are
+    hedged so a slow provider is not hit with twice the load. With
+    `on_fallback`, the duplicate goes to the fallback model when the caller
+    has one.
+    """
+
+    def __init__(
+        self,
+        percentile: float = 95,
+        min_delay: float = 0.25,
+        max_delay: float = 10.0,
+        min_samples: int = 20,
+        max_rate: float = 0.1,
+        on_fallback: bool = True,
+        window: int = 200
+    ):
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.min_samples = min_samples
+        self.max_rate = max_rate
+        self.on_fallback = on_fallback
+        self.latencies: Dict[str, Deque[float]] = defaultdict(lambda: deque(maxlen=window))
+        self.stats: Dict[str, Dict[str, int]] = defaultdict(
+            lambda: {"calls": 0, "hedged": 0, "primary_wins": 0, "hedge_wins": 0, "both_failed": 0}
+        )
+
+    def deadline(self, model: str) -> Optional[float]:
+        """Seconds to wait before hedging a call to `model` (None = do not hedge)"""
+        samples = self.latencies[model]
+        stats = self.stats[model]
+        if len(samples) < self.min_samples or stats["hedged"] >= self.max_rate * stats["calls"]:
+            return None
+        ordered = sorted(samples)
+        value = ordered[min(len(ordered) - 1, int(len(ordered) * self.percentile / 100))]
+        return min(self.max_delay, max(self.min_delay, value))
+
+    def observe(self, model: str, seconds: float):
+        self.latencies[model].append(seconds)
+
+    async def run(
+        self,
+        model: str,
+        primary: Callable[[], Awaitable[Any]],
+        hedge: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """Await `primary()`, racing `hedge()` against it past the deadline"""
+        stats = self.stats[model]
+        stats["calls"] += 1
+        deadline = self.deadline(model)
+        start = time.perf_counter()
+        first = asyncio.ensure_future(primary())
+        tasks = [first]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=deadline)
+            if done:
+                self.observe(model, time.perf_counter() - start)
+                return first.result()
+
+            stats["hedged"] += 1
+            tasks.append(asyncio.ensure_future(hedge()))
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        stats["primary_wins" if task is first else "hedge_wins"] += 1
+                        # A lower bound when the hedge won; still keeps the percentile honest
+                        self.observe(model, time.perf_counter() - start)
+                        return task.result()
+            stats["both_failed"] += 1
+            return first.result()
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    async def run_stream(
+        self,
+        model: str,
+        primary: Callable[[], AsyncIterator[Any]],
+        hedge: Callable[[], AsyncIterator[Any]]
+    ) -> AsyncIterator[Any]:
+        """Stream from whichever of `primary()`/`hedge()` produces a first chunk sooner"""
+        stats = self.stats[model]
+        stats["calls"] += 1
+        deadline = self.deadline(model)
+        start = time.perf_counter()
+        streams = [primary()]
+        tasks = [asyncio.ensure_future(_first_chunk(streams[0]))]
+        winner = None
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=deadline)
+            if done:
+                winner = 0
+            else:
+                stats["hedged"] += 1
+                streams.append(hedge())
+                tasks.append(asyncio.ensure_future(_first_chunk(streams[1])))
+                pending = set(tasks)
+                while pending and winner is None:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        if task.exception() is None:
+                            winner = tasks.index(task)
+                            stats["primary_wins" if winner == 0 else "hedge_wins"] += 1
+                            break
+                if winner is None:
+                    stats["both_failed"] += 1
+                    winner = 0
+            self.observe(model, time.perf_counter() - start)
+        finally:
+            for index, task in enumerate(tasks):
+                if index != winner:
+                    task.cancel()
+                    await asyncio.gather(task, return_exceptions=True)
+                    await _close_quietly(streams[index])
+
+        has_chunk, chunk = tasks[winner].result()
+        if not has_chunk:
+            return
+        yield chunk
+        try:
+            async for chunk in streams[winner]:
+                yield chunk
+        finally:
+            await _close_quietly(streams[winner])
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Hedge rate and win counts per model"""
+        return {
+            model: {**counts, "hedge_rate": counts["hedged"] / counts["calls"] if counts["calls"] else 0.0}
+            for model, counts in self.stats.items()
+        }
+
+    def render_prometheus(self) -> str:
+        lines = ["# TYPE llm_hedge_total counter"]
+        for model, counts in sorted(self.stats.items()):
+            for event, count in counts.items():
+                lines.append(f'llm_hedge_total{{model="{model}",event="{event}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+
+async def _first_chunk(stream: AsyncIterator[Any]) -> Tuple[bool, Any]:
+    try:
+        return True, await stream.__anext__()
+    except StopAsyncIteration:
+        return False, None
+
+
+async def _close_quietly(stream: AsyncIterator[Any]):
+    try:
+        await stream.aclose()
+    except Exception:
+        pass
@@ -0,0 +1,136 @@
+"""Versioned single-file format for search indexes, memory-mapped on load
+
+Layout: MAGIC, uint32 format version, uint64 header length, a JSON header
+(backend, fingerprint, backend metadata and the dtype/shape/offset of every
+array), then the raw arrays, each aligned to ARRAY_ALIGNMENT bytes. Arrays
+are opened with np.memmap, so loading costs the same for any catalog size
+and every worker process maps the same page-cache copy of the file.
+"""
+
+import hashlib
+import json
+import os
+import struct
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+
+MAGIC = b"WCHIDX\x00\x00"
+INDEX_FORMAT_VERSION = 1
+ARRAY_ALIGNMENT = 64
+
+_PREFIX = struct.Struct("<8sIQ")
+
+
+class IndexFormatError(Exception):
+    """File is missing, truncated, from another format version or for another backend"""
+
+
+def catalog_fingerprint(products: List[Dict[str, Any]]) -> str:
+    """Content hash of the catalog an index was built from (independent of row order)"""
+    rows = sorted(products, key=lambda product: str(product.get("id", "")))
+    payload = json.dumps(rows, sort_keys=True, default=str).encode()
+    return hashlib.sha256(payload).hexdigest()
+
+
+def write_index(
+    path: str,
+    backend: str,
+    arrays: Dict[str, np.ndarray],
+    meta: Optional[Dict[str, Any]] = None,
+    fingerprint: Optional[str] = None
+):
+    """Write atomically: a temporary file is renamed over `path`, so readers never see a partial index"""
+    layout = {}
+    offset = 0
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        arrays[name] = array
+        offset = -(-offset // ARRAY_ALIGNMENT) * ARRAY_ALIGNMENT
+        layout[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+        offset += array.nbytes
+
+    header = json.dumps({
+        "backend": backend,
+        "fingerprint": fingerprint,
+        "meta": meta or {},
+        "arrays": layout
+    }).encode()
+    data_start = -(-(_PREFIX.size + len(header)) // ARRAY_ALIGNMENT) * ARRAY_ALIGNMENT
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    temporary = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temporary, "wb") as f:
+            f.write(_PREFIX.pack(MAGIC, INDEX_FORMAT_VERSION, len(header)))
+            f.write(header)
+            for name, array in arrays.items():
+                f.seek(data_start + layout[name]["offset"])
+                f.write(array.tobytes())
+        os.replace(temporary, path)
+    finally:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+
+
+def read_index(path: str, backend: str) -> Tuple[Dict[str, Any], Dict[str, np.ndarray]]:
+    """(header, read-only memory-mapped arrays) of an index written for `backend`"""
+    try:
+        with open(path, "rb") as f:
+            magic, version, header_length = _PREFIX.unpack(f.read(_PREFIX.size))
+            if magic != MAGIC:
+                raise IndexFormatError(f"{path} is not an index file")
+            if version != INDEX_FORMAT_VERSION:
+                raise IndexFormatError(f"{path} has format version {version}, expected {INDEX_FORMAT_VERSION}")
+            header = json.loads(f.read(header_length))
+    except (OSError, struct.error, ValueError) as e:
+        raise IndexFormatError(f"Cannot read {path}: {e}")
+
+    if header.get("backend") != backend:
+        raise IndexFormatError(f"{path} was written by the {header.get('backend')} backend, expected {backend}")
+
+    data_start = -(-(_PREFIX.size + header_length) // ARRAY_ALIGNMENT) * ARRAY_ALIGNMENT
+    arrays = {}
+    for name, spec in header["arrays"].items():
+        shape = tuple(spec["shape"])
+        if 0 in shape:
+            arrays[name] = np.zeros(shape, dtype=spec["dtype"])
+        else:
+            arrays[name] = np.memmap(path, dtype=spec["dtype"], mode="r", offset=data_start + spec["offset"], shape=shape)
+    return header, arrays
+
+
+def encode_documents(documents: List[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    """Documents as one JSON-lines byte blob plus row offsets"""
+    blobs = [json.dumps(doc, default=str).encode() for doc in documents]
+    offsets = np.zeros(len(blobs) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(blob) for blob in blobs])
+    return {
+        "documents": np.frombuffer(b"".join(blobs), dtype=np.uint8),
+        "document_offsets": offsets
+    }
+
+
+class LazyDocuments:
+    """Read-only document list decoding rows from the mapped blob on access"""
+
+    def __init__(self, blob: np.ndarray, offsets: np.ndarray):
+        self._blob = blob
+        self._offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index: int) -> Dict[str, Any]:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        start, end = int(self._offsets[index]), int(self._offsets[index + 1])
+        return json.loads(self._blob[start:end].tobytes())
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for index in range(len(self)):
+            yield self[index]
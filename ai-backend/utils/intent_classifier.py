@@ -0,0 +1,359 @@
+"""Local tiered intent classifier - regex rules and hashed n-gram model before Groq"""
+
+import math
+import re
+import zlib
+from typing import Dict, List, Optional, Set, Tuple
+
+from utils.phrase_matcher import phrase_matcher
+
+
+# Intents understood by the Website Interaction Agent
+VALID_INTENTS = [
+    "product_inquiry",
+    "order_tracking",
+    "account_support",
+    "pricing",
+    "technical_issue",
+    "general_chat",
+    "purchase",
+    "cart_management",
+    "consultation",
+    "refund_request",
+    "human_handoff"
+]
+
+# Tier 1: high-precision patterns. A rule tier label is only returned when
+# every matching rule agrees on the same intent.
+INTENT_RULES: Dict[str, List[str]] = {
+    "general_chat": [
+        r"^(hi|hello|hey|hiya|yo|greetings|good (morning|afternoon|evening))( there)?[\s!.]*$",
+        r"^(thanks|thank you|thx|ok|okay|cool|great|bye|goodbye)[\s!.]*$",
+        r"^how are you\??[\s!.]*$",
+    ],
+    "human_handoff": [
+        r"\b(talk|speak|chat|connect me) (to|with) (a |an |some )?(human|person|agent|representative|manager|someone real)\b",
+        r"\b(get|give) me (a |an )?(human|agent|manager|real person)\b",
+        r"\breal (human|person)\b",
+    ],
+    "cart_management": [
+        r"\b(clear|empty|view|show|see) (my |the )?(cart|basket|wishlist)\b",
+        r"\bremove .+ from (my |the )?(cart|basket|wishlist)\b",
+        r"\bwhat('s| is) in my (cart|basket|wishlist)\b",
+    ],
+    "purchase": [
+        r"\badd .+ to (my |the )?(cart|basket|wishlist)\b",
+        r"\b(place|make) (an |my )?order\b",
+        r"\b(checkout|check out)\b",
+        r"\bi('ll| will)? (buy|take|purchase) (it|this|that|one)\b",
+    ],
+    "order_tracking": [
+        r"\b(track|trace) (my |an |the )?(order|package|shipment|delivery)\b",
+        r"\bwhere('s| is) my (order|package|watch|delivery)\b",
+        r"\b(order|delivery) status\b",
+    ],
+    "refund_request": [
+        r"\b(refund|money back|send (it )?back)\b",
+        r"\breturn (my|this|the|a|an) (watch|order|item|purchase)\b",
+        r"\breturn policy\b",
+    ],
+    "account_support": [
+        r"\b(reset|forgot|change) (my )?password\b",
+        r"\b(can('t|not)|unable to) (log ?in|sign ?in)\b",
+        r"\b(update|change) my (email|profile|address)\b",
+    ],
+    "technical_issue": [
+        r"\b(website|site|page|app|checkout) (is )?(not loading|broken|down|crashing|crashed)\b",
+        r"\b(error|bug|glitch) (on|in) (the )?(site|website|page|app)\b",
+    ],
+    "consultation": [
+        r"\bhelp me (choose|pick|decide|find)\b",
+        r"\b(i('m| am) )?(not sure|undecided|overwhelmed)\b",
+        r"\bwhat (watch )?should i (buy|get|choose)\b",
+    ],
+}
+
+# One compiled alternation per intent keeps the rule tier to a few scans
+_COMPILED_RULES = [
+    (intent, re.compile("|".join(f"(?:{p})" for p in patterns), re.IGNORECASE))
+    for intent, patterns in INTENT_RULES.items()
+]
+
+
+# Phrase-dictionary categories that also vote in the rule tier
+PHRASE_INTENTS = {
+    "escalation": "human_handoff",
+    "refund": "refund_request",
+}
+
+# Rule confidence for a clean hit, and for a hit the rest of the message may
+# contradict (a negated rule, a contrast, or a separate question), which
+# stays below the classifier threshold so the model or LLM decides
+RULE_CONFIDENCE = 0.95
+RULE_AMBIGUOUS_CONFIDENCE = 0.7
+
+# A negation up to three words before a rule hit ("i don't want a refund")
+_NEGATION = re.compile(
+    r"\b(not|no|never|don'?t|doesn'?t|didn'?t|won'?t|isn'?t|without|no longer)(\s+[\w']+){0,3}\s*$",
+    re.IGNORECASE
+)
+_CONTRAST = re.compile(r"\b(but|however|instead|although|though|rather)\b", re.IGNORECASE)
+# A negation anywhere in the message, for the model tier
+_NEGATION_WORD = re.compile(
+    r"\b(not|no|never|don'?t|doesn'?t|didn'?t|won'?t|isn'?t|without|no longer)\b",
+    re.IGNORECASE
+)
+_QUESTION = re.compile(r"\b(is|are|does|do|can|will|how|what|which|where|when|why)\b[^.!]*\?", re.IGNORECASE)
+
+
+def _negated(text: str, start: int) -> bool:
+    return bool(_NEGATION.search(text[:start]))
+
+
+def _scan_rules(text: str) -> Tuple[Set[str], List[Tuple[int, int]], bool]:
+    """(intents with a non-negated hit, their spans, whether any hit was negated)"""
+    matched = set()
+    spans = []
+    negated = False
+    hits = [
+        (intent, match.start(), match.end())
+        for intent, pattern in _COMPILED_RULES
+        for match in pattern.finditer(text)
+    ]
+    hits.extend(
+        (PHRASE_INTENTS[category], start, start + len(phrase))
+        for start, phrase, categories in phrase_matcher.find(text)
+        for category in categories if category in PHRASE_INTENTS
+    )
+    for intent, start, end in hits:
+        if _negated(text, start):
+            negated = True
+            continue
+        matched.add(intent)
+        spans.append((start, end))
+    return matched, spans, negated
+
+
+def score_intent_rules(text: str) -> Tuple[Optional[str], float]:
+    """
+    Rule tier only: (intent every non-negated rule hit agrees on, confidence),
+    or (None, 0.0) when no rule or several intents match
+    """
+    matched, spans, negated = _scan_rules(text)
+    if len(matched) != 1:
+        return None, 0.0
+
+    # Text outside the rule hits, to spot a question asked alongside them
+    rest, last = [], 0
+    for start, end in sorted(spans):
+        rest.append(text[last:start])
+        last = max(last, end)
+    rest.append(text[last:])
+    ambiguous = negated or _CONTRAST.search(text) or _QUESTION.search(" ".join(rest))
+    return matched.pop(), RULE_AMBIGUOUS_CONFIDENCE if ambiguous else RULE_CONFIDENCE
+
+
+def match_intent_rules(text: str) -> Optional[str]:
+    """Rule tier only: the intent every non-negated matching rule agrees on, else None"""
+    return score_intent_rules(text)[0]
+
+
+# Tier 2: seed phrases the hashed n-gram model is trained on at startup
+SEED_EXAMPLES: Dict[str, List[str]] = {
+    "product_inquiry": [
+        "show me rolex watches", "do you have any diving watches",
+        "tell me about the submariner", "what automatic watches do you have",
+        "is the nautilus in stock", "which watches are water resistant",
+        "show me chronograph watches", "do you sell casio",
+        "what features does the g-shock have", "any dress watches available",
+        "show me luxury watches", "list your omega models",
+    ],
+    "pricing": [
+        "how much is the submariner", "what is the price of this watch",
+        "are there any discounts", "do you have a sale on",
+        "how much does it cost", "what payment methods do you accept",
+        "cheapest watch you have", "price of the rolex",
+        "is there a discount code", "can i pay in installments",
+    ],
+    "purchase": [
+        "add it to my cart", "i want to buy this watch",
+        "add the rolex to my wishlist", "place an order",
+        "buy the cheapest one", "i will take it",
+        "checkout now", "purchase the omega",
+        "add two of these to cart", "order this watch for me",
+    ],
+    "cart_management": [
+        "clear my cart", "what is in my cart",
+        "show my wishlist", "remove the casio from my cart",
+        "empty my wishlist", "view my cart",
+        "delete everything in my cart", "show my basket",
+    ],
+    "order_tracking": [
+        "where is my order", "track my package",
+        "when will my watch arrive", "what is my order status",
+        "has my order shipped", "show my past orders",
+        "my delivery is late", "order history",
+    ],
+    "account_support": [
+        "i forgot my password", "i cannot log in",
+        "how do i reset my password", "update my email address",
+        "change my shipping address", "delete my account",
+        "my account is locked", "how do i sign up",
+    ],
+    "technical_issue": [
+        "the website is not loading", "checkout page is broken",
+        "i get an error when paying", "the site keeps crashing",
+        "images are not showing", "the page is stuck loading",
+        "button does not work", "app shows an error",
+    ],
+    "general_chat": [
+        "hi", "hello there", "hey", "good morning",
+        "thanks", "thank you so much", "how are you",
+        "bye", "who are you", "nice to meet you",
+    ],
+    "consultation": [
+        "help me pick a watch", "i need a watch for my dad",
+        "what is good for diving", "i am overwhelmed by the choices",
+        "i do not know what to get", "can you recommend something",
+        "i need a gift for my wife", "which watch suits me",
+        "help me choose", "i am not sure what i want",
+    ],
+    "refund_request": [
+        "i want a refund", "i want to return my watch",
+        "how do i send it back", "i want my money back",
+        "what is your return policy", "can i exchange this watch",
+        "the watch arrived damaged", "i am not satisfied with my order",
+    ],
+    "human_handoff": [
+        "speak to a human", "get me an agent",
+        "i want to talk to a real person", "connect me with support",
+        "this is useless let me talk to someone", "i need a human agent",
+        "can someone from your team call me", "transfer me to a manager",
+    ],
+}
+
+
+class LocalIntentClassifier:
+    """
+    Two local tiers in front of the LLM intent call:
+    compiled regex rules, then a hashed word n-gram softmax model.
+    Returns a label only when the tier is confident enough.
+    """
+
+    TIERS = ("rules", "model", "llm")
+
+    def __init__(
+        self,
+        confidence_threshold: float = 0.85,
+        num_buckets: int = 4096,
+        epochs: int = 30,
+        learning_rate: float = 0.5,
+        l2: float = 1e-4
+    ):
+        self.confidence_threshold = confidence_threshold
+        self.num_buckets = num_buckets
+        self.intents = list(VALID_INTENTS)
+        self.weights: List[Dict[int, float]] = [{} for _ in self.intents]
+        self.bias = [0.0] * len(self.intents)
+        self.stats = {tier: 0 for tier in self.TIERS}
+
+        self._train(SEED_EXAMPLES, epochs, learning_rate, l2)
+
+    def classify(self, text: str) -> Tuple[Optional[str], float, str]:
+        """
+        Classify a message locally
+
+        Returns:
+            (intent, confidence, tier); intent is None when the LLM is needed
+        """
+        intent, confidence, tier = self.predict(text)
+        if intent:
+            self.stats[tier] += 1
+        return intent, confidence, tier
+
+    def predict(self, text: str) -> Tuple[Optional[str], float, str]:
+        """Same as classify, without counting towards the hit rates"""
+        normalized = self._normalize(text)
+
+        intent, confidence = score_intent_rules(normalized)
+        if intent and confidence >= self.confidence_threshold:
+            return intent, confidence, "rules"
+
+        # The n-gram model cannot read negation ("i'm not asking for a refund")
+        if _scan_rules(normalized)[2]:
+            return None, 0.0, "llm"
+
+        # Nor contrast ("it arrived but is scratched") or negation outside a
+        # rule ("my cart is not loading"): its words vote for the wrong intent
+        intent, confidence = self._predict(normalized)
+        if confidence >= self.confidence_threshold and not self._model_ambiguous(normalized):
+            return intent, confidence, "model"
+
+        return None, confidence, "llm"
+
+    def record_llm_fallback(self):
+        """Count a message that had to be classified by the LLM"""
+        self.stats["llm"] += 1
+
+    def hit_rates(self) -> Dict[str, float]:
+        """Per-tier hit counts and rates"""
+        total = sum(self.stats.values())
+        rates = {f"{tier}_hits": count for tier, count in self.stats.items()}
+        rates["total"] = total
+        for tier, count in self.stats.items():
+            rates[f"{tier}_rate"] = count / total if total else 0.0
+        return rates
+
+    def _model_ambiguous(self, text: str) -> bool:
+        return bool(_CONTRAST.search(text) or _NEGATION_WORD.search(text))
+
+    def _normalize(self, text: str) -> str:
+        text = text.lower().replace("’", "'")
+        return re.sub(r"\s+", " ", text).strip()
+
+    def _features(self, text: str) -> List[int]:
+        """Hashed word unigrams and bigrams (crc32 is stable across processes)"""
+        tokens = re.findall(r"[a-z0-9']+", text)
+        grams = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+        return [zlib.crc32(gram.encode()) % self.num_buckets for gram in grams]
+
+    def _scores(self, features: List[int]) -> List[float]:
+        scores = []
+        for idx, weights in enumerate(self.weights):
+            score = self.bias[idx]
+            for feature in features:
+                score += weights.get(feature, 0.0)
+            scores.append(score)
+        return scores
+
+    def _softmax(self, scores: List[float]) -> List[float]:
+        top = max(scores)
+        exps = [math.exp(s - top) for s in scores]
+        total = sum(exps)
+        return [e / total for e in exps]
+
+    def _predict(self, text: str) -> Tuple[str, float]:
+        features = self._features(text)
+        if not features:
+            return "general_chat", 0.0
+        probs = self._softmax(self._scores(features))
+        best = max(range(len(probs)), key=probs.__getitem__)
+        return self.intents[best], probs[best]
+
+    def _train(self, examples: Dict[str, List[str]], epochs: int, learning_rate: float, l2: float):
+        """Multinomial logistic regression with plain SGD on the seed phrases"""
+        data = [
+            (self._features(self._normalize(text)), self.intents.index(intent))
+            for intent, texts in examples.items()
+            for text in texts
+        ]
+        for _ in range(epochs):
+            for features, label in data:
+                probs = self._softmax(self._scores(features))
+                for idx, prob in enumerate(probs):
+                    grad = prob - (1.0 if idx == label else 0.0)
+                    self.bias[idx] -= learning_rate * grad
+                    weights = self.weights[idx]
+                    for feature in features:
+                        w = weights.get(feature, 0.0)
+                        weights[feature] = w - learning_rate * (grad + l2 * w)
@@ -0,0 +1,126 @@
+"""Prompt-level LLM response cache - in-process LRU with an optional Redis tier"""
+
+import hashlib
+import time
+from collections import OrderedDict, defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from langchain_core.messages import BaseMessage
+
+from config import settings
+
+try:
+    import redis.asyncio as redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+
+class LLMCache:
+    """
+    Completions keyed on model, temperature and a whitespace-normalized
+    prompt hash. Entries expire after `ttl` seconds in both tiers; the
+    in-process tier also evicts least recently used entries past
+    `max_entries`.
+    """
+
+    def __init__(self, max_entries: int = 2048, ttl: int = 3600, redis_url: Optional[str] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.redis_url = redis_url
+        self.redis_client = None
+        self.entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self.stats: Dict[str, Dict[str, int]] = defaultdict(lambda: {"memory_hits": 0, "redis_hits": 0, "misses": 0})
+
+    async def initialize(self):
+        """Connect the Redis tier if configured"""
+        if not (self.redis_url and REDIS_AVAILABLE):
+            return
+        try:
+            self.redis_client = await redis.from_url(self.redis_url, encoding="utf-8", decode_responses=True)
+            await self.redis_client.ping()
+            print("✓ LLM cache Redis tier connected")
+        except Exception as e:
+            print(f"⚠ LLM cache Redis tier unavailable: {e}. Using in-process cache only.")
+            self.redis_client = None
+
+    async def close(self):
+        if self.redis_client is not None:
+            await self.redis_client.close()
+
+    def clear(self):
+        """Drop in-process entries and counters (the Redis tier is left alone)"""
+        self.entries.clear()
+        self.stats.clear()
+
+    def key(self, model: str, temperature: Optional[float], messages: List[BaseMessage]) -> str:
+        normalized = "\n".join(f"{m.type}:{' '.join(str(m.content).split())}" for m in messages)
+        digest = hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+        return f"{model}:{temperature}:{digest}"
+
+    async def get(self, key: str, agent: str) -> Optional[str]:
+        """Cached completion for `key`, counting the lookup against `agent`"""
+        entry = self.entries.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > time.monotonic():
+                self.entries.move_to_end(key)
+                self.stats[agent]["memory_hits"] += 1
+                return value
+            del self.entries[key]
+
+        if self.redis_client is not None:
+            try:
+                value = await self.redis_client.get(f"llmcache:{key}")
+            except Exception as e:
+                print(f"⚠ LLM cache Redis get error: {e}")
+                value = None
+            if value is not None:
+                self._remember(key, value)
+                self.stats[agent]["redis_hits"] += 1
+                return value
+
+        self.stats[agent]["misses"] += 1
+        return None
+
+    async def set(self, key: str, value: str):
+        if not value:
+            return
+        self._remember(key, value)
+        if self.redis_client is not None:
+            try:
+                await self.redis_client.setex(f"llmcache:{key}", self.ttl, value)
+            except Exception as e:
+                print(f"⚠ LLM cache Redis set error: {e}")
+
+    def _remember(self, key: str, value: str):
+        self.entries[key] = (time.monotonic() + self.ttl, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def hit_rates(self) -> Dict[str, Dict[str, float]]:
+        """Per-agent lookups and hit rate"""
+        rates = {}
+        for agent, counts in self.stats.items():
+            hits = counts["memory_hits"] + counts["redis_hits"]
+            lookups = hits + counts["misses"]
+            rates[agent] = {**counts, "hit_rate": hits / lookups if lookups else 0.0}
+        return rates
+
+    def render_prometheus(self) -> str:
+        lines = ["# TYPE llm_cache_lookups_total counter"]
+        for agent, counts in sorted(self.stats.items()):
+            for result, count in counts.items():
+                lines.append(f'llm_cache_lookups_total{{agent="{agent}",result="{result}"}} {count}')
+        lines.append("# TYPE llm_cache_entries gauge")
+        lines.append(f"llm_cache_entries {len(self.entries)}")
+        return "\n".join(lines) + "\n"
+
+
+# Global cache instance
+llm_cache = LLMCache(
+    max_entries=settings.llm_cache_size,
+    ttl=settings.llm_cache_ttl_seconds,
+    redis_url=settings.redis_url if settings.llm_cache_redis else None
+)
@@ -0,0 +1,576 @@
+"""Shared LLM scheduler - per-model concurrency lanes and cross-session micro-batching"""
+
+import asyncio
+import json
+import re
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Set, Tuple
+
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.runnables import Runnable, RunnableConfig
+
+from utils.groq_prompts import INTENT_BATCH_PROMPT, SENTIMENT_BATCH_PROMPT
+from utils.hedging import HedgePolicy
+from utils.llm_cache import LLMCache
+from utils.rate_limit import (
+    CircuitBreaker, LLMUnavailableError, TokenBucket,
+    backoff_delay, is_rate_limit, is_retryable, retry_after_seconds
+)
+
+
+def model_key(llm: Any) -> str:
+    """Lane key for a chat model (its model name, else its class)"""
+    return getattr(llm, "model_name", None) or getattr(llm, "model", None) or type(llm).__name__
+
+
+class ModelLane:
+    """
+    Concurrency cap, queue depth and rate-limit state for one model.
+    Requests are paced FIFO against requests/min and tokens/min buckets
+    (and any retry-after pause) before taking a concurrency slot.
+    """
+
+    def __init__(
+        self,
+        model: str,
+        max_concurrency: int,
+        requests_per_minute: int = 0,
+        tokens_per_minute: int = 0,
+        max_queue_wait: float = 10.0,
+        max_retries: int = 3,
+        breaker_threshold: int = 5,
+        breaker_cooldown: float = 30.0
+    ):
+        self.model = model
+        self.max_concurrency = max_concurrency
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.waiting = 0
+        self.in_flight = 0
+        self.completed = 0
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_queue_wait = max_queue_wait
+        self.max_retries = max_retries
+        self.breaker = CircuitBreaker(breaker_threshold, breaker_cooldown)
+        self.pace_lock = asyncio.Lock()
+        self.paused_until = 0.0
+        self.stats = {"throttled": 0, "rejected": 0, "retries": 0, "rate_limited": 0, "failovers": 0}
+        self.throttle_seconds = 0.0
+
+    @asynccontextmanager
+    async def slot(self):
+        self.waiting += 1
+        try:
+            await self.semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+            self.semaphore.release()
+
+    async def pace(self, estimated_tokens: int):
+        """Wait (in arrival order) until the buckets allow this request"""
+        self.waiting += 1
+        try:
+            async with self.pace_lock:
+                waited = 0.0
+                while True:
+                    wait = max(
+                        self.paused_until - time.monotonic(),
+                        self.requests.wait_time(1),
+                        self.tokens.wait_time(estimated_tokens)
+                    )
+                    if wait <= 0:
+                        break
+                    if waited + wait > self.max_queue_wait:
+                        self.stats["rejected"] += 1
+                        raise LLMUnavailableError(
+                            f"{self.model} is saturated (next slot in {wait:.0f}s)", retry_in=wait
+                        )
+                    await asyncio.sleep(wait)
+                    waited += wait
+                if waited:
+                    self.stats["throttled"] += 1
+                    self.throttle_seconds += waited
+                self.requests.take(1)
+                self.tokens.take(estimated_tokens)
+        finally:
+            self.waiting -= 1
+
+    def record_usage(self, estimated_tokens: int, response: Any):
+        """Correct the token bucket with the usage Groq reports, when present"""
+        usage = (getattr(response, "response_metadata", None) or {}).get("token_usage") or {}
+        actual = usage.get("total_tokens")
+        if isinstance(actual, int):
+            self.tokens.refund(estimated_tokens - actual)
+
+    def retry_delay(self, error: Exception, attempt: int) -> Optional[float]:
+        """Seconds to wait before retrying `error`, or None to give up"""
+        if not is_retryable(error):
+            # The model answered; the request itself was bad
+            self.breaker.record_success()
+            return None
+        self.breaker.record_failure()
+        if is_rate_limit(error):
+            self.stats["rate_limited"] += 1
+        if attempt >= self.max_retries:
+            return None
+        self.stats["retries"] += 1
+        retry_after = retry_after_seconds(error)
+        if retry_after is not None:
+            # Every request on this lane honors the server's pause via pace()
+            self.paused_until = max(self.paused_until, time.monotonic() + retry_after)
+            return 0.0
+        return backoff_delay(attempt, base=0.5, cap=8.0)
+
+
+class ScheduledLLM(Runnable):
+    """
+    Drop-in view of a chat model whose calls wait for a slot in its lane.
+    Supports ainvoke/astream and `prompt | llm` chains like the model itself.
+    With a cache, identical prompts are answered without calling the model.
+    Transient failures are retried; while the lane's circuit is open, calls
+    go to `fallback` (another model's lane) if one is set. With a hedge
+    policy, calls that run past their deadline are raced by a duplicate.
+    """
+
+    def __init__(
+        self,
+        llm: Any,
+        lane: ModelLane,
+        cache: Optional[LLMCache] = None,
+        agent: str = "",
+        fallback: Optional["ScheduledLLM"] = None,
+        hedge: Optional[HedgePolicy] = None
+    ):
+        self.llm = llm
+        self.lane = lane
+        self.cache = cache
+        self.agent = agent
+        self.fallback = fallback if fallback is not None and fallback.lane is not lane else None
+        self.hedge = hedge
+
+    @property
+    def model_name(self) -> str:
+        return self.lane.model
+
+    def cache_key(self, input: Any) -> str:
+        messages = self.llm._convert_input(input).to_messages()
+        return self.cache.key(self.lane.model, getattr(self.llm, "temperature", None), messages)
+
+    def invoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Any:
+        return self.llm.invoke(input, config, **kwargs)
+
+    async def ainvoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Any:
+        if self.cache is None:
+            return await self.ainvoke_uncached(input, config, **kwargs)
+
+        key = self.cache_key(input)
+        cached = await self.cache.get(key, self.agent)
+        if cached is not None:
+            return AIMessage(content=cached)
+        response, served_by = await self.ainvoke_served(input, config, **kwargs)
+        # A failover or hedge model's reply is not cached under this model
+        if served_by == self.lane.model:
+            await self.cache.set(key, response.content)
+        return response
+
+    def estimate_tokens(self, input: Any) -> int:
+        """Prompt size at ~4 characters per token plus the completion allowance"""
+        try:
+            prompt = self.llm._convert_input(input).to_string()
+        except Exception:
+            prompt = str(input)
+        return len(prompt) // 4 + (getattr(self.llm, "max_tokens", None) or 256)
+
+    def _admit(self) -> bool:
+        """False when the circuit is open and the call should fail over"""
+        if self.lane.breaker.allow():
+            return True
+        if self.fallback is None:
+            raise LLMUnavailableError(
+                f"{self.lane.model} is unavailable (circuit open)", retry_in=self.lane.breaker.remaining
+            )
+        self.lane.stats["failovers"] += 1
+        return False
+
+    async def _pace(self, tokens: int):
+        try:
+            await self.lane.pace(tokens)
+        except BaseException:
+            self.lane.breaker.cancel()
+            raise
+
+    def _hedge_target(self) -> "ScheduledLLM":
+        return self.fallback if self.fallback is not None and self.hedge.on_fallback else self
+
+    async def ainvoke_uncached(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Any:
+        return (await self.ainvoke_served(input, config, **kwargs))[0]
+
+    async def ainvoke_served(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Tuple[Any, str]:
+        """(response, name of the model that produced it), bypassing the cache"""
+        if self.hedge is None:
+            return await self._invoke_with_retries(input, config, **kwargs)
+        target = self._hedge_target()
+        return await self.hedge.run(
+            self.lane.model,
+            lambda: self._invoke_with_retries(input, config, **kwargs),
+            lambda: target._invoke_with_retries(input, config, **kwargs)
+        )
+
+    async def _invoke_with_retries(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Tuple[Any, str]:
+        tokens = self.estimate_tokens(input)
+        attempt = 0
+        while True:
+            if not self._admit():
+                return await self.fallback._invoke_with_retries(input, config, **kwargs)
+            await self._pace(tokens)
+            try:
+                async with self.lane.slot():
+                    response = await self.llm.ainvoke(input, config, **kwargs)
+            except Exception as e:
+                delay = self.lane.retry_delay(e, attempt)
+                if delay is None:
+                    if self.fallback is not None and self.lane.breaker.state != "closed":
+                        self.lane.stats["failovers"] += 1
+                        return await self.fallback._invoke_with_retries(input, config, **kwargs)
+                    raise
+                print(f"⚠ {self.lane.model} call failed ({e}); retry {attempt + 1} in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            self.lane.breaker.record_success()
+            self.lane.record_usage(tokens, response)
+            return response, self.lane.model
+
+    async def astream(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> AsyncIterator[Any]:
+        key = None
+        if self.cache is not None:
+            key = self.cache_key(input)
+            cached = await self.cache.get(key, self.agent)
+            if cached is not None:
+                yield AIMessageChunk(content=cached)
+                return
+
+        parts = []
+        served_here = True
+        async for chunk, served_by in self._stream_uncached(input, config, **kwargs):
+            parts.append(chunk.content)
+            served_here = served_here and served_by == self.lane.model
+            yield chunk
+        if key is not None and served_here:
+            await self.cache.set(key, "".join(parts))
+
+    def _stream_uncached(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> AsyncIterator[Tuple[Any, str]]:
+        if self.hedge is None:
+            return self._stream_with_retries(input, config, **kwargs)
+        target = self._hedge_target()
+        return self.hedge.run_stream(
+            self.lane.model,
+            lambda: self._stream_with_retries(input, config, **kwargs),
+            lambda: target._stream_with_retries(input, config, **kwargs)
+        )
+
+    async def _stream_with_retries(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> AsyncIterator[Tuple[Any, str]]:
+        # Yields (chunk, answering model); retries and failover only happen
+        # before the first chunk is emitted
+        tokens = self.estimate_tokens(input)
+        attempt = 0
+        while True:
+            if not self._admit():
+                async for item in self.fallback._stream_with_retries(input, config, **kwargs):
+                    yield item
+                return
+            await self._pace(tokens)
+            started = False
+            try:
+                async with self.lane.slot():
+                    async for chunk in self.llm.astream(input, config, **kwargs):
+                        started = True
+                        yield chunk, self.lane.model
+            except Exception as e:
+                if started:
+                    self.lane.breaker.record_failure()
+                    raise
+                delay = self.lane.retry_delay(e, attempt)
+                if delay is None:
+                    if self.fallback is not None and self.lane.breaker.state != "closed":
+                        self.lane.stats["failovers"] += 1
+                        async for item in self.fallback._stream_with_retries(input, config, **kwargs):
+                            yield item
+                        return
+                    raise
+                print(f"⚠ {self.lane.model} stream failed ({e}); retry {attempt + 1} in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            self.lane.breaker.record_success()
+            return
+
+
+class BatchShape:
+    """How to combine several single-item prompts into one request and split the reply"""
+
+    def __init__(self, name: str, build: Callable[[List[Dict[str, Any]]], str]):
+        self.name = name
+        self.build = build
+
+    def split(self, content: str, count: int) -> Optional[List[str]]:
+        """Per-item reply text, or None when the combined reply is unusable"""
+        content = content.replace("```json", "").replace("```", "").strip()
+        json_match = re.search(r'\{.*\}', content, re.DOTALL)
+        if not json_match:
+            return None
+        try:
+            data = json.loads(json_match.group())
+        except json.JSONDecodeError:
+            return None
+        if not isinstance(data, dict):
+            return None
+
+        parts = []
+        for index in range(1, count + 1):
+            value = data.get(str(index))
+            if value is None:
+                return None
+            parts.append(value if isinstance(value, str) else json.dumps(value))
+        return parts
+
+
+def _build_intent_batch(items: List[Dict[str, Any]]) -> str:
+    lines = [f"{i}. {item['user_message']}" for i, item in enumerate(items, 1)]
+    return INTENT_BATCH_PROMPT.format(items="\n".join(lines))
+
+
+def _build_sentiment_batch(items: List[Dict[str, Any]]) -> str:
+    blocks = [
+        f"Conversation {i}:\nConversation State:\n{item['conversation_state']}\nCurrent Message: {item['user_message']}"
+        for i, item in enumerate(items, 1)
+    ]
+    return SENTIMENT_BATCH_PROMPT.format(items="\n\n".join(blocks))
+
+
+# Prompt shapes that can be answered for several sessions in one request
+BATCH_SHAPES: Dict[str, BatchShape] = {
+    "intent": BatchShape("intent", _build_intent_batch),
+    "sentiment": BatchShape("sentiment", _build_sentiment_batch),
+}
+
+
+class _PendingBatch:
+    def __init__(self):
+        self.entries: List[Tuple[Any, Dict[str, Any], asyncio.Future]] = []
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+
+class LLMScheduler:
+    """
+    Owned by the workflow and shared by every session. Each model gets a
+    lane that caps concurrent requests and paces them under the provider's
+    rate limits; short classification prompts that arrive within
+    `batch_window` of each other are answered by one request.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 8,
+        batch_window: float = 0.015,
+        max_batch_size: int = 8,
+        batching: bool = True,
+        requests_per_minute: int = 0,
+        tokens_per_minute: int = 0,
+        max_queue_wait: float = 10.0,
+        max_retries: int = 3,
+        breaker_threshold: int = 5,
+        breaker_cooldown: float = 30.0,
+        hedge: Optional[HedgePolicy] = None
+    ):
+        self.max_concurrency = max_concurrency
+        self.hedge = hedge
+        self.lane_options = {
+            "requests_per_minute": requests_per_minute,
+            "tokens_per_minute": tokens_per_minute,
+            "max_queue_wait": max_queue_wait,
+            "max_retries": max_retries,
+            "breaker_threshold": breaker_threshold,
+            "breaker_cooldown": breaker_cooldown
+        }
+        self.batch_window = batch_window
+        self.max_batch_size = max_batch_size
+        self.batching = batching
+        self.lanes: Dict[str, ModelLane] = {}
+        self.pending: Dict[Tuple[str, str], _PendingBatch] = {}
+        # Strong references to running batch tasks (the loop only keeps weak ones)
+        self._batch_tasks: Set[asyncio.Task] = set()
+        self.stats = {"batches": 0, "batched_items": 0, "unbatched": 0, "split_failures": 0, "failed_batches": 0}
+
+    def lane(self, llm: Any) -> ModelLane:
+        key = model_key(llm)
+        if key not in self.lanes:
+            self.lanes[key] = ModelLane(key, self.max_concurrency, **self.lane_options)
+        return self.lanes[key]
+
+    def wrap(self, llm: Any, cache: Optional[LLMCache] = None, agent: str = "", fallback: Any = None) -> ScheduledLLM:
+        """
+        Route every call of `llm` through its model lane, optionally cached
+        for `agent` and failing over to `fallback` while the lane's circuit is open
+        """
+        if isinstance(llm, ScheduledLLM):
+            return llm
+        fallback_llm = self.wrap(fallback) if fallback is not None else None
+        return ScheduledLLM(llm, self.lane(llm), cache, agent, fallback_llm, self.hedge)
+
+    async def batched(self, llm: Any, shape: str, prompt: Runnable, inputs: Dict[str, Any]) -> str:
+        """
+        Answer one classification prompt, batched with other sessions when possible
+
+        Args:
+            llm: Model to call (wrapped into its lane if needed)
+            shape: Key into BATCH_SHAPES
+            prompt: The single-item prompt template, used when no batch forms
+            inputs: Template variables for this item
+
+        Returns:
+            Reply text for this item, as the single prompt would produce it
+        """
+        llm = self.wrap(llm)
+        if not self.batching or shape not in BATCH_SHAPES:
+            chain = prompt | llm
+            return (await chain.ainvoke(inputs)).content
+
+        # Look up the single-item prompt, so batched answers are cached per item
+        key = None
+        if llm.cache is not None:
+            key = llm.cache_key(prompt.format_prompt(**inputs))
+            cached = await llm.cache.get(key, llm.agent)
+            if cached is not None:
+                return cached
+
+        batch_key = (llm.model_name, shape)
+        pending = self.pending.get(batch_key)
+        if pending is None:
+            pending = self.pending[batch_key] = _PendingBatch()
+            loop = asyncio.get_running_loop()
+            pending.timer = loop.call_later(self.batch_window, self._flush, batch_key, llm)
+
+        # Resolves to (reply text, model that produced it)
+        future = asyncio.get_running_loop().create_future()
+        pending.entries.append((prompt, inputs, future))
+        if len(pending.entries) >= self.max_batch_size:
+            self._flush(batch_key, llm)
+        result, served_by = await future
+        if key is not None and served_by == llm.model_name:
+            await llm.cache.set(key, result)
+        return result
+
+    def _flush(self, key: Tuple[str, str], llm: ScheduledLLM):
+        pending = self.pending.pop(key, None)
+        if pending is None:
+            return
+        if pending.timer is not None:
+            pending.timer.cancel()
+        # The combined call is traced under whichever turn opened the batch
+        task = asyncio.ensure_future(self._run_batch(BATCH_SHAPES[key[1]], llm, pending.entries))
+        self._batch_tasks.add(task)
+        task.add_done_callback(self._batch_tasks.discard)
+
+    async def _run_batch(self, shape: BatchShape, llm: ScheduledLLM, entries: List[Tuple[Any, Dict[str, Any], asyncio.Future]]):
+        if len(entries) == 1:
+            self.stats["unbatched"] += 1
+            await self._resolve(llm, entries[0])
+            return
+
+        parts = None
+        try:
+            response, served_by = await llm.ainvoke_served(shape.build([inputs for _, inputs, _ in entries]))
+            parts = shape.split(response.content, len(entries))
+        except Exception as e:
+            print(f"⚠ Batched {shape.name} request failed: {e}")
+            if isinstance(e, LLMUnavailableError) or is_rate_limit(e):
+                # The lane is throttled; N single calls would only add load
+                self.stats["failed_batches"] += 1
+                for _, _, future in entries:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+
+        if parts is None:
+            # Fall back to one request per item rather than guessing
+            self.stats["split_failures"] += 1
+            await asyncio.gather(*(self._resolve(llm, entry) for entry in entries))
+            return
+
+        self.stats["batches"] += 1
+        self.stats["batched_items"] += len(entries)
+        for (_, _, future), part in zip(entries, parts):
+            if not future.done():
+                future.set_result((part, served_by))
+
+    async def _resolve(self, llm: ScheduledLLM, entry: Tuple[Any, Dict[str, Any], asyncio.Future]):
+        prompt, inputs, future = entry
+        try:
+            result = await self._single(llm, prompt, inputs)
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+            return
+        if not future.done():
+            future.set_result(result)
+
+    async def _single(self, llm: ScheduledLLM, prompt: Runnable, inputs: Dict[str, Any]) -> Tuple[str, str]:
+        # Cache lookup and store already happen around the batch in batched()
+        response, served_by = await llm.ainvoke_served(prompt.format_prompt(**inputs))
+        return response.content, served_by
+
+    def queue_depth(self) -> Dict[str, Dict[str, int]]:
+        """Waiting and in-flight requests per model, plus items waiting to batch"""
+        depth = {
+            model: {"waiting": lane.waiting, "in_flight": lane.in_flight, "completed": lane.completed, "pending_batch": 0}
+            for model, lane in self.lanes.items()
+        }
+        for (model, _), pending in self.pending.items():
+            if model in depth:
+                depth[model]["pending_batch"] += len(pending.entries)
+        return depth
+
+    def rate_limits(self) -> Dict[str, Dict[str, Any]]:
+        """Circuit state, bucket levels and throttling counters per model"""
+        return {
+            model: {
+                "circuit": lane.breaker.state,
+                "circuit_opened": lane.breaker.times_opened,
+                "requests_available": round(lane.requests.tokens, 1) if lane.requests.per_minute else None,
+                "tokens_available": round(lane.tokens.tokens) if lane.tokens.per_minute else None,
+                "throttle_seconds": round(lane.throttle_seconds, 3),
+                **lane.stats
+            }
+            for model, lane in self.lanes.items()
+        }
+
+    def render_prometheus(self) -> str:
+        """Queue depth gauges, rate-limit state and batching counters"""
+        lines = ["# TYPE llm_queue_depth gauge"]
+        for model, depth in sorted(self.queue_depth().items()):
+            for state in ("waiting", "in_flight", "pending_batch"):
+                lines.append(f'llm_queue_depth{{model="{model}",state="{state}"}} {depth[state]}')
+        lines.append("# TYPE llm_circuit_open gauge")
+        for model, lane in sorted(self.lanes.items()):
+            lines.append(f'llm_circuit_open{{model="{model}"}} {0 if lane.breaker.state == "closed" else 1}')
+        lines.append("# TYPE llm_rate_limit_total counter")
+        for model, lane in sorted(self.lanes.items()):
+            for event, count in lane.stats.items():
+                lines.append(f'llm_rate_limit_total{{model="{model}",event="{event}"}} {count}')
+        lines.append("# TYPE llm_throttle_seconds_total counter")
+        for model, lane in sorted(self.lanes.items()):
+            lines.append(f'llm_throttle_seconds_total{{model="{model}"}} {lane.throttle_seconds:.3f}')
+        if self.hedge is not None:
+            lines.append(self.hedge.render_prometheus().rstrip("\n"))
+        lines.append("# TYPE llm_scheduler_total counter")
+        for name, count in self.stats.items():
+            lines.append(f'llm_scheduler_total{{event="{name}"}} {count}')
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,148 @@
+"""Compiled multi-phrase matcher (Aho-Corasick) - every signal category in one pass over a message"""
+
+import json
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from config import settings
+
+
+# Signal categories -> phrases, matched case-insensitively on word boundaries.
+# PHRASE_DICTIONARY_FILE (JSON, same shape) adds phrases and categories.
+PHRASE_DICTIONARIES: Dict[str, List[str]] = {
+    "frustration": [
+        "frustrated", "angry", "terrible", "awful", "useless",
+        "worst", "horrible", "disappointed", "annoyed", "upset"
+    ],
+    "escalation": [
+        "talk to a human", "speak to a human", "talk to a person", "speak to a person",
+        "talk to someone", "speak to someone", "real person", "real human",
+        "human agent", "live agent", "support agent",
+        "speak to a manager", "talk to a manager", "your manager", "representative"
+    ],
+    "product_defect": [
+        "defective", "damaged", "broken", "faulty", "cracked", "scratched",
+        "not working", "stopped working", "doesn't work", "does not work"
+    ],
+    "refund": [
+        "refund", "money back", "send it back", "send back", "return policy",
+        "return my", "return this", "return the"
+    ],
+}
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char == "_"
+
+
+class PhraseMatcher:
+    """
+    Aho-Corasick automaton over every phrase of every category. Scanning a
+    message costs one pass regardless of how many phrases are loaded; a hit
+    only counts when it starts and ends on a word boundary, so "mad" does
+    not fire inside "made".
+    """
+
+    def __init__(self, dictionaries: Dict[str, Iterable[str]]):
+        self.dictionaries = {
+            category: sorted({phrase.strip().lower() for phrase in phrases if phrase.strip()})
+            for category, phrases in dictionaries.items()
+        }
+        # Trie as parallel arrays: goto transitions, failure links and the
+        # (phrase, categories) outputs ending at each state
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._outputs: List[List[Tuple[str, Tuple[str, ...]]]] = [[]]
+
+        phrase_categories: Dict[str, List[str]] = {}
+        for category, phrases in self.dictionaries.items():
+            for phrase in phrases:
+                phrase_categories.setdefault(phrase, []).append(category)
+        for phrase, categories in phrase_categories.items():
+            self._add(phrase, tuple(categories))
+        self._link()
+
+    def _add(self, phrase: str, categories: Tuple[str, ...]):
+        state = 0
+        for char in phrase:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._outputs.append([])
+            state = next_state
+        self._outputs[state].append((phrase, categories))
+
+    def _link(self):
+        # Breadth-first so every failure target is resolved before it is used
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self._goto[state].items():
+                queue.append(child)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[child] = target if target != child else 0
+                self._outputs[child] = self._outputs[child] + self._outputs[self._fail[child]]
+
+    def find(self, text: str) -> List[Tuple[int, str, Tuple[str, ...]]]:
+        """(start offset, phrase, categories) for every whole-word phrase occurrence"""
+        text = text.lower()
+        hits = []
+        state = 0
+        for index, char in enumerate(text):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            if not self._outputs[state]:
+                continue
+            after = index + 1
+            if after < len(text) and _is_word_char(text[after]):
+                continue
+            for phrase, categories in self._outputs[state]:
+                start = after - len(phrase)
+                if start > 0 and _is_word_char(text[start - 1]):
+                    continue
+                hits.append((start, phrase, categories))
+        return hits
+
+    def match(self, text: str) -> Dict[str, List[str]]:
+        """Matched phrases grouped by category"""
+        matches: Dict[str, List[str]] = {}
+        for _, phrase, categories in self.find(text):
+            for category in categories:
+                phrases = matches.setdefault(category, [])
+                if phrase not in phrases:
+                    phrases.append(phrase)
+        return matches
+
+    def categories(self, text: str) -> Set[str]:
+        """Signal categories present in `text`"""
+        return {category for _, _, categories in self.find(text) for category in categories}
+
+    def phrases(self, category: str) -> List[str]:
+        return list(self.dictionaries.get(category, []))
+
+
+def load_phrase_dictionaries(path: Optional[str] = None) -> Dict[str, List[str]]:
+    """Built-in dictionaries extended with the categories/phrases in a JSON file"""
+    dictionaries = {category: list(phrases) for category, phrases in PHRASE_DICTIONARIES.items()}
+    if not path:
+        return dictionaries
+    try:
+        with open(path) as f:
+            extra = json.load(f)
+        for category, phrases in extra.items():
+            dictionaries.setdefault(category, []).extend(phrases)
+        print(f"✓ Phrase dictionaries loaded from {path}")
+    except (OSError, ValueError, AttributeError) as e:
+        print(f"⚠ Could not load phrase dictionaries from {path}: {e}")
+    return dictionaries
+
+
+# Global matcher instance (compiled once at startup)
+phrase_matcher = PhraseMatcher(load_phrase_dictionaries(settings.phrase_dictionary_file))
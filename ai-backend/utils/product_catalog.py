@@ -0,0 +1,214 @@
+"""In-process columnar product catalog answering structured searches without the Next.js hop"""
+
+import math
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+
+# Price bounds implied by an intent when the query names no price (same as the search-structured route)
+LUXURY_MIN_PRICE = 5000
+AFFORDABLE_MAX_PRICE = 1000
+
+# Fields returned per product, matching the search-structured route
+RESULT_FIELDS = ("id", "name", "brand", "price", "originalPrice", "description", "image")
+# First slice of ordered candidates checked against the filters (doubles until the limit is met)
+CHUNK_ROWS = 64
+
+
+class ProductCatalog:
+    """
+    Columnar copy of the catalog built for the structured search parameters
+    (brand, model, minPrice, maxPrice, intent, features):
+
+    - prices sorted once, so a price range is two binary searches and a
+      slice that is already in price order
+    - one boolean bitmap per brand and per category, ANDed with the
+      in-stock bitmap
+    - precomputed row orders for the "luxury" (price desc), "affordable"
+      (price asc), "discount" (deepest markdown first) and default
+      (newest first) sorts
+
+    Changes from the catalog sync mark the columns stale; they are rebuilt
+    on the next query.
+    """
+
+    def __init__(self):
+        self._products: Dict[str, Dict[str, Any]] = {}
+        self._stale = True
+        self.stats = {"queries": 0, "rebuilds": 0}
+
+    def __len__(self) -> int:
+        return len(self._products)
+
+    @property
+    def ready(self) -> bool:
+        return bool(self._products)
+
+    def load_from_products(self, products: List[Dict[str, Any]]):
+        self._products = {str(product.get("id", "")): product for product in products}
+        self._stale = True
+
+    def upsert_products(self, products: List[Dict[str, Any]]):
+        for product in products:
+            self._products[str(product.get("id", ""))] = product
+        self._stale = True
+
+    def remove_products(self, product_ids: Iterable[str]):
+        for product_id in product_ids:
+            self._products.pop(str(product_id), None)
+        self._stale = True
+
+    def clear(self):
+        self._products = {}
+        self._stale = True
+
+    def _build(self):
+        rows = list(self._products.values())
+        self._results = [{field: row.get(field) for field in RESULT_FIELDS} for row in rows]
+        self._names = [str(row.get("name") or "").lower() for row in rows]
+        self._features = [
+            f"{row.get('description') or ''} {row.get('features') or ''} {row.get('category') or ''}".lower()
+            for row in rows
+        ]
+
+        price = np.array([float(row.get("price") or 0) for row in rows], dtype=np.float64)
+        original = np.array(
+            [float(row["originalPrice"]) if row.get("originalPrice") else math.nan for row in rows],
+            dtype=np.float64
+        )
+        self._in_stock = np.array([(row.get("stock") or 0) > 0 for row in rows], dtype=bool)
+
+        self._brands = _bitmaps(rows, "brand")
+        self._categories = _bitmaps(rows, "category")
+        # Bitmaps of partial brand/category queries, ORed once per rebuild
+        self._unions: Dict[Any, np.ndarray] = {}
+
+        # Stable sorts keep catalog order among equal prices; luxury gets its
+        # own descending order (searched on negated prices) for the same reason
+        self._by_price = np.argsort(price, kind="stable")
+        self._sorted_prices = price[self._by_price]
+        self._by_price_desc = np.argsort(-price, kind="stable")
+        self._sorted_prices_desc = -price[self._by_price_desc]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            markdown = np.where(original > price, 1 - price / original, 0.0)
+        on_sale = np.flatnonzero(markdown > 0)
+        self._by_discount = on_sale[np.argsort(-markdown[on_sale], kind="stable")]
+        # Newest first: createdAt when present, else later catalog rows first
+        created = [row.get("createdAt") for row in rows]
+        if rows and all(value is not None for value in created):
+            self._newest = np.array(sorted(range(len(rows)), key=lambda i: created[i], reverse=True), dtype=np.int64)
+        else:
+            self._newest = np.arange(len(rows) - 1, -1, -1, dtype=np.int64)
+
+        self._stale = False
+        self.stats["rebuilds"] += 1
+
+    def search(self, params: Dict[str, Any], limit: int = 10) -> List[Dict[str, Any]]:
+        """Products matching the structured search params, in the route's sort order"""
+        if self._stale:
+            self._build()
+        self.stats["queries"] += 1
+        if not self._results or limit <= 0:
+            return []
+
+        intent = str(params.get("intent") or "general").lower()
+        min_price = _number(params.get("minPrice"))
+        max_price = _number(params.get("maxPrice"))
+        has_price = min_price is not None or max_price is not None
+        if not has_price:
+            if intent == "luxury":
+                min_price = LUXURY_MIN_PRICE
+            elif intent == "affordable":
+                max_price = AFFORDABLE_MAX_PRICE
+
+        # Candidate rows, already in result order
+        if intent == "discount" and not has_price:
+            rows = self._by_discount
+        elif intent == "luxury":
+            low = 0 if max_price is None else np.searchsorted(self._sorted_prices_desc, -max_price, side="left")
+            high = len(self._sorted_prices_desc) if min_price is None else np.searchsorted(self._sorted_prices_desc, -min_price, side="right")
+            rows = self._by_price_desc[low:high]
+        elif intent == "affordable" or has_price:
+            low = 0 if min_price is None else np.searchsorted(self._sorted_prices, min_price, side="left")
+            high = len(self._sorted_prices) if max_price is None else np.searchsorted(self._sorted_prices, max_price, side="right")
+            rows = self._by_price[low:high]
+        else:
+            rows = self._newest
+
+        bitmaps = [self._in_stock]
+        brand = params.get("brand")
+        if brand:
+            bitmaps.append(self._lookup("brand", self._brands, str(brand)))
+        category = params.get("category")
+        if category:
+            bitmaps.append(self._lookup("category", self._categories, str(category)))
+        model = str(params.get("model") or "").lower()
+        features = [str(feature).lower() for feature in _as_list(params.get("features"))]
+
+        # Filter the ordered candidates in growing chunks and stop at the
+        # limit, so a query costs about the rows it returns, not the catalog
+        results = []
+        start, step = 0, max(CHUNK_ROWS, 4 * limit)
+        while start < len(rows) and len(results) < limit:
+            chunk = rows[start:start + step]
+            start, step = start + step, step * 2
+            keep = bitmaps[0][chunk]
+            for bitmap in bitmaps[1:]:
+                keep &= bitmap[chunk]
+            for row in chunk[keep].tolist():
+                if model and model not in self._names[row]:
+                    continue
+                if features and not all(feature in self._features[row] for feature in features):
+                    continue
+                results.append(dict(self._results[row]))
+                if len(results) >= limit:
+                    break
+        return results
+
+    def _lookup(self, field: str, bitmaps: Dict[str, np.ndarray], value: str) -> np.ndarray:
+        """Union of the bitmaps whose value contains the query, case-insensitive ("patek" -> "patek philippe")"""
+        value = value.strip().lower()
+        key = (field, value)
+        if key not in self._unions:
+            matches = [bitmap for name, bitmap in bitmaps.items() if value in name]
+            if len(matches) == 1:
+                self._unions[key] = matches[0]
+            else:
+                union = np.zeros(len(self._results), dtype=bool)
+                for bitmap in matches:
+                    union |= bitmap
+                self._unions[key] = union
+        return self._unions[key]
+
+
+def _bitmaps(rows: List[Dict[str, Any]], field: str) -> Dict[str, np.ndarray]:
+    """Lowercased field value -> boolean row mask"""
+    codes: Dict[str, List[int]] = {}
+    for index, row in enumerate(rows):
+        codes.setdefault(str(row.get(field) or "").lower(), []).append(index)
+    bitmaps = {}
+    for value, indices in codes.items():
+        bitmap = np.zeros(len(rows), dtype=bool)
+        bitmap[indices] = True
+        bitmaps[value] = bitmap
+    return bitmaps
+
+
+def _number(value: Any) -> Optional[float]:
+    try:
+        return float(value) if value is not None and value != "" else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _as_list(value: Any) -> List[Any]:
+    if not value:
+        return []
+    if isinstance(value, (list, tuple)):
+        return list(value)
+    return [value]
+
+
+# Global product catalog instance (loaded at startup only from the synced catalog tables)
+product_catalog = ProductCatalog()
@@ -0,0 +1,152 @@
+"""Groq rate-limit handling - token buckets, retry classification and circuit breakers"""
+
+import random
+import time
+from typing import Optional
+
+
+class LLMUnavailableError(Exception):
+    """Raised when a model cannot be called within the queueing/retry budget"""
+
+    def __init__(self, message: str, retry_in: Optional[float] = None):
+        super().__init__(message)
+        # Seconds until the lane expects to take calls again, when known
+        self.retry_in = retry_in
+
+
+def unavailable_message(error: LLMUnavailableError) -> str:
+    """User-facing reply for a call our own lane turned away (not a provider quota)"""
+    if error.retry_in is not None and error.retry_in > 60:
+        return "I'm handling a lot of requests right now. Please try again in a couple of minutes."
+    return "I'm handling a lot of requests right now. Please try again in a few seconds."
+
+
+class TokenBucket:
+    """Refills continuously at `per_minute`; capacity is one minute of budget (0 = unlimited)"""
+
+    def __init__(self, per_minute: int):
+        self.per_minute = per_minute
+        self.capacity = float(per_minute)
+        self.tokens = float(per_minute)
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.per_minute / 60)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` is available (requests above capacity wait for a full bucket)"""
+        if self.per_minute <= 0:
+            return 0.0
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) * 60 / self.per_minute
+
+    def take(self, amount: float):
+        if self.per_minute > 0:
+            self._refill()
+            self.tokens -= amount
+
+    def refund(self, amount: float):
+        """Return an over-estimate (or charge an under-estimate when negative)"""
+        if self.per_minute > 0:
+            self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class CircuitBreaker:
+    """
+    Opens after `threshold` consecutive failures and stays open for
+    `cooldown` seconds; then a single trial call is let through
+    (half-open) and its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, threshold: int = 5, cooldown: float = 30.0):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial_in_flight = False
+        self.times_opened = 0
+
+    @property
+    def remaining(self) -> float:
+        """Seconds left before an open circuit lets a trial call through"""
+        if self.opened_at is None:
+            return 0.0
+        return max(0.0, self.opened_at + self.cooldown - time.monotonic())
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.cooldown:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self.trial_in_flight:
+            self.trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+
+    def cancel(self):
+        """Give back a half-open trial that never reached the model"""
+        self.trial_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self.trial_in_flight or self.failures >= self.threshold:
+            if self.opened_at is None or self.trial_in_flight:
+                self.times_opened += 1
+            self.opened_at = time.monotonic()
+        self.trial_in_flight = False
+
+
+def status_code(error: BaseException) -> Optional[int]:
+    code = getattr(error, "status_code", None)
+    if code is None:
+        code = getattr(getattr(error, "response", None), "status_code", None)
+    return code if isinstance(code, int) else None
+
+
+def is_rate_limit(error: BaseException) -> bool:
+    return status_code(error) == 429 or "rate limit" in str(error).lower()
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Rate limits, server errors and connection/timeout failures"""
+    if is_rate_limit(error):
+        return True
+    code = status_code(error)
+    if code is not None:
+        return code >= 500
+    name = type(error).__name__
+    return "Timeout" in name or "Connection" in name
+
+
+def retry_after_seconds(error: BaseException) -> Optional[float]:
+    """The server's retry-after hint, if the error carries one"""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    value = headers.get("retry-after")
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Full-jitter exponential backoff"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
@@ -0,0 +1,180 @@
+"""Local lexicon sentiment scorer - negation, intensifiers and punctuation/caps heuristics before Groq"""
+
+import math
+import re
+from typing import Any, Dict, Iterable, List
+
+
+# Word valences in [-1, 1]. The agent's frustration keywords are added on
+# top as strong negatives.
+LEXICON: Dict[str, float] = {
+    # negative
+    "bad": -0.5, "poor": -0.5, "wrong": -0.4, "broken": -0.4, "defective": -0.4,
+    "damaged": -0.4, "slow": -0.3, "late": -0.3, "delay": -0.4, "delayed": -0.4,
+    "waiting": -0.3, "missing": -0.4, "refund": -0.2,
+    "confusing": -0.4, "confused": -0.3, "unhappy": -0.6, "sad": -0.4, "hate": -0.8,
+    "ridiculous": -0.7, "stupid": -0.8, "pathetic": -0.8, "waste": -0.6, "scam": -0.9,
+    "unacceptable": -0.8, "nonsense": -0.6, "rubbish": -0.7, "garbage": -0.8,
+    "problem": -0.3, "issue": -0.2, "fail": -0.5, "failed": -0.5,
+    "mad": -0.6, "furious": -0.9, "ugh": -0.5, "wtf": -0.8, "sucks": -0.7,
+    "pointless": -0.6, "incompetent": -0.8, "ripoff": -0.8, "complaint": -0.5,
+    # positive
+    "good": 0.4, "great": 0.6, "excellent": 0.8, "amazing": 0.8, "awesome": 0.7,
+    "perfect": 0.8, "love": 0.7, "lovely": 0.6, "nice": 0.4, "beautiful": 0.6,
+    "helpful": 0.6, "thanks": 0.4, "thank": 0.4, "appreciate": 0.5, "happy": 0.6,
+    "glad": 0.5, "fantastic": 0.8, "wonderful": 0.8, "cool": 0.3, "stunning": 0.7,
+    "impressed": 0.6, "pleased": 0.6, "fine": 0.1, "like": 0.4,
+}
+
+NEGATORS = {
+    "not", "no", "never", "none", "nothing", "hardly", "barely", "neither", "nor",
+    "dont", "doesnt", "didnt", "isnt", "wasnt", "arent", "werent", "cant", "cannot",
+    "couldnt", "wont", "wouldnt", "shouldnt", "aint", "havent", "hasnt"
+}
+INTENSIFIERS = {
+    "very": 1.4, "really": 1.4, "so": 1.3, "extremely": 1.7, "totally": 1.5,
+    "absolutely": 1.6, "completely": 1.5, "incredibly": 1.6, "super": 1.4, "too": 1.2,
+    "slightly": 0.6, "somewhat": 0.7, "bit": 0.7, "kinda": 0.7, "little": 0.7
+}
+
+# Tokens after a negator that it still applies to
+NEGATION_SCOPE = 3
+# Score normalization (VADER-style): s / sqrt(s^2 + alpha)
+NORMALIZATION_ALPHA = 1.0
+
+_WORD_PATTERN = re.compile(r"[A-Za-z']+|[!?]")
+
+# Complaint shapes the lexicon cannot weigh: long waits, unanswered or
+# repeated requests ("nobody answers", "third time i'm asking")
+_COMPLAINT = re.compile(
+    r"\b(waiting|waited|(still|never) (not |haven'?t )?(received|arrived|heard|got)"
+    r"|(nobody|no one|no-one) (answers|answered|replies|replied|responds|responded|helps|helped|cares)"
+    r"|(second|third|fourth|fifth|\d+(st|nd|rd|th)) time|again and again|how many times"
+    r"|still (no|not|nothing|haven'?t))\b",
+    re.IGNORECASE
+)
+
+
+class LexiconSentimentScorer:
+    """
+    Scores a single message locally. Returns the same fields as the
+    sentiment prompt plus `ambiguous`, which is set when the message
+    carries sentiment evidence and lands within `ambiguity_margin` of the
+    escalation threshold, mixes positive and negative terms, or reads as
+    a complaint (a long wait, a repeated ask) that is not already clearly
+    negative; only those messages need the LLM.
+    """
+
+    TIERS = ("local", "llm")
+
+    def __init__(
+        self,
+        frustration_keywords: Iterable[str] = (),
+        escalation_threshold: float = -0.1,
+        ambiguity_margin: float = 0.15
+    ):
+        self.lexicon = dict(LEXICON)
+        self.frustration_keywords = set(frustration_keywords)
+        for keyword in self.frustration_keywords:
+            self.lexicon[keyword] = min(self.lexicon.get(keyword, 0.0), -0.7)
+        self.escalation_threshold = escalation_threshold
+        self.ambiguity_margin = ambiguity_margin
+        self.stats = {tier: 0 for tier in self.TIERS}
+
+    def score(self, text: str) -> Dict[str, Any]:
+        """Sentiment of one message; counts a local hit unless it is ambiguous"""
+        tokens = _WORD_PATTERN.findall(text)
+        words = [token.lower().replace("'", "") for token in tokens]
+
+        total = 0.0
+        positives = negatives = 0
+        negated_until = -1
+        weight = 1.0
+        for index, word in enumerate(words):
+            if word in NEGATORS:
+                negated_until = index + NEGATION_SCOPE
+                continue
+            if word in INTENSIFIERS:
+                weight *= INTENSIFIERS[word]
+                continue
+            valence = self.lexicon.get(word)
+            if valence is None:
+                if word not in ("!", "?"):
+                    weight = 1.0
+                continue
+            valence *= weight
+            if tokens[index].isupper() and len(tokens[index]) > 2:
+                valence *= 1.3
+            if index <= negated_until:
+                # "not good" is mildly negative; "not bad" mildly positive
+                valence *= -0.5
+            weight = 1.0
+            total += valence
+            if valence > 0:
+                positives += 1
+            elif valence < 0:
+                negatives += 1
+
+        shouting = self._is_shouting(tokens)
+        exclamations = min(words.count("!"), 3)
+        if total:
+            total *= 1 + 0.1 * exclamations + (0.2 if shouting else 0.0)
+        elif shouting or exclamations >= 3:
+            # Raised voice with no sentiment words still reads as irritation
+            total = -0.3
+            negatives += 1
+
+        score = total / math.sqrt(total * total + NORMALIZATION_ALPHA) if total else 0.0
+        score = max(-1.0, min(1.0, score))
+
+        has_evidence = positives + negatives > 0
+        mixed = positives > 0 and negatives > 0
+        near_threshold = has_evidence and abs(score - self.escalation_threshold) <= self.ambiguity_margin
+        complaint = score > -0.5 and bool(_COMPLAINT.search(text))
+        ambiguous = mixed or near_threshold or complaint
+        if not ambiguous:
+            self.stats["local"] += 1
+
+        keyword_hit = any(word in self.frustration_keywords for word in words)
+        if score <= -0.5:
+            frustration_level = "high"
+        elif score <= -0.2 or keyword_hit:
+            frustration_level = "medium"
+        else:
+            frustration_level = "low"
+
+        return {
+            "sentiment_score": round(score, 3),
+            "frustration_level": frustration_level,
+            "escalation_recommended": "yes" if score <= -0.6 else "no",
+            "reason": self._reason(score, mixed, shouting),
+            "ambiguous": ambiguous
+        }
+
+    def record_llm_escalation(self):
+        """Count a message that had to be scored by the LLM"""
+        self.stats["llm"] += 1
+
+    def hit_rates(self) -> Dict[str, float]:
+        """Per-tier hit counts and rates"""
+        total = sum(self.stats.values())
+        rates = {f"{tier}_hits": count for tier, count in self.stats.items()}
+        rates["total"] = total
+        for tier, count in self.stats.items():
+            rates[f"{tier}_rate"] = count / total if total else 0.0
+        return rates
+
+    def _is_shouting(self, tokens: List[str]) -> bool:
+        words = [token for token in tokens if len(token) > 2 and token.isalpha()]
+        return len(words) >= 2 and sum(1 for word in words if word.isupper()) / len(words) > 0.6
+
+    def _reason(self, score: float, mixed: bool, shouting: bool) -> str:
+        if mixed:
+            return "mixed positive and negative wording"
+        if shouting:
+            return "raised voice (caps/exclamations)"
+        if score < 0:
+            return "negative wording"
+        if score > 0:
+            return "positive wording"
+        return "neutral tone"
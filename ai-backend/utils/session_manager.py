@@ -5,6 +5,8 @@ from typing import Optional, Dict, Any
 from datetime import datetime, timedelta
 import asyncio
 
+from utils.context_window import build_window
+
 try:
     import redis.asyncio as redis
     REDIS_AVAILABLE = True
@@ -48,9 +50,12 @@ class SessionManager:
             "user_id": user_id,
             "created_at": datetime.utcnow().isoformat(),
             "messages": [],
+            "message_count": 0,
             "conversation_summary": "",
+            "summary_watermark": 0,
             "sentiment_score": 0.0,
             "escalation_signals": [],
+            "sentiment_state": None,
             "last_retrieved_products": [],
             "consultation_active": False,
             "collected_preferences": {},
@@ -101,9 +106,11 @@ class SessionManager:
         """Add a message to session history"""
         session = await self.get_session(session_id)
         if session:
+            # Running total, so positions stay stable after old messages are dropped
+            session["message_count"] = session.get("message_count", len(session["messages"])) + 1
             session["messages"].append(message)
-            # Keep only last 20 messages to prevent memory bloat
-            session["messages"] = session["messages"][-20:]
+            # Keep only the newest messages within the session token budget
+            session["messages"] = build_window(session["messages"], "session", max_message_tokens=0)
             await self.set_session(session_id, session)
     
     async def delete_session(self, session_id: str):
@@ -0,0 +1,208 @@
+"""Speculative product retrieval - start the catalog lookup as soon as a message arrives"""
+
+import asyncio
+import re
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+from utils.phrase_matcher import PhraseMatcher
+
+
+KNOWN_BRANDS = [
+    "Patek Philippe", "Audemars Piguet", "Tag Heuer", "Rolex", "Omega",
+    "Cartier", "Titan", "Casio", "Fossil", "Seiko", "Tissot"
+]
+
+LUXURY_WORDS = ("expensive", "premium", "high-end", "high end", "costliest", "luxury")
+AFFORDABLE_WORDS = ("cheap", "budget", "affordable", "cheapest", "inexpensive")
+DISCOUNT_WORDS = ("sale", "discount", "deal", "offer")
+
+# Brands and price-intent words compiled into one automaton
+_PARAM_MATCHER = PhraseMatcher({
+    "brand": KNOWN_BRANDS,
+    "luxury": LUXURY_WORDS,
+    "affordable": AFFORDABLE_WORDS,
+    "discount": DISCOUNT_WORDS,
+})
+
+_NUMBER = r"\$?\s*(\d[\d,]*(?:\.\d+)?)\s*(k)?"
+_BETWEEN = re.compile(rf"between\s+{_NUMBER}\s+(?:and|to|-)\s+{_NUMBER}")
+_MAX = re.compile(rf"(?:under|below|less than|cheaper than|up to|within|max(?:imum)?)\s+{_NUMBER}")
+_MIN = re.compile(rf"(?:above|over|more than|at least|min(?:imum)?)\s+{_NUMBER}")
+
+# Intents whose turns usually reach the structured product search
+RETRIEVAL_INTENTS = {"product_inquiry", "pricing"}
+# Without such an intent, start only when the message names this many
+# search params (brand, price bounds, price intent)
+MIN_SPECULATIVE_PARAMS = 2
+
+_current: ContextVar[Optional["Speculation"]] = ContextVar("speculation", default=None)
+
+
+def _to_number(digits: str, thousands: Optional[str]) -> float:
+    value = float(digits.replace(",", ""))
+    return value * 1000 if thousands else value
+
+
+def _discard_result(task: asyncio.Task):
+    # Unclaimed lookups may fail; retrieve the exception so it is not logged as unhandled
+    if not task.cancelled():
+        task.exception()
+
+
+def extract_search_params(text: str) -> Dict[str, Any]:
+    """
+    Local approximation of the knowledge agent's LLM parameter extraction
+    (brand, price bounds and price intent) used to start the lookup early
+    """
+    lower = text.lower()
+    params: Dict[str, Any] = {}
+
+    matches = _PARAM_MATCHER.match(lower)
+
+    brands = set(matches.get("brand", []))
+    for brand in KNOWN_BRANDS:
+        if brand.lower() in brands:
+            params["brand"] = brand
+            break
+
+    between = _BETWEEN.search(lower)
+    if between:
+        params["minPrice"] = _to_number(between.group(1), between.group(2))
+        params["maxPrice"] = _to_number(between.group(3), between.group(4))
+    else:
+        upper = _MAX.search(lower)
+        if upper:
+            params["maxPrice"] = _to_number(upper.group(1), upper.group(2))
+        floor = _MIN.search(lower)
+        if floor:
+            params["minPrice"] = _to_number(floor.group(1), floor.group(2))
+
+    for intent in ("luxury", "affordable", "discount"):
+        if intent in matches:
+            params["intent"] = intent
+            break
+    else:
+        params["intent"] = "general"
+
+    return params
+
+
+def param_count(params: Dict[str, Any]) -> int:
+    """Search params a message actually named (a general intent does not count)"""
+    count = sum(1 for key in ("brand", "minPrice", "maxPrice") if params.get(key) is not None)
+    return count + (params.get("intent", "general") != "general")
+
+
+def _normalize_params(params: Dict[str, Any]) -> Dict[str, Any]:
+    normalized = {}
+    for key in ("brand", "model", "features"):
+        value = params.get(key)
+        if value:
+            normalized[key] = str(value).strip().lower()
+    for key in ("minPrice", "maxPrice"):
+        value = params.get(key)
+        if value not in (None, ""):
+            try:
+                normalized[key] = float(value)
+            except (TypeError, ValueError):
+                normalized[key] = value
+    normalized["intent"] = str(params.get("intent") or "general").lower()
+    return normalized
+
+
+def params_match(speculated: Dict[str, Any], actual: Dict[str, Any]) -> bool:
+    """True when the speculative lookup answers the same structured query"""
+    return _normalize_params(speculated) == _normalize_params(actual)
+
+
+class Speculation:
+    """One in-flight speculative lookup for the current turn"""
+
+    def __init__(self, params: Dict[str, Any], task: asyncio.Task):
+        self.params = params
+        self.task = task
+        self.claimed = False
+
+
+class ProductSpeculator:
+    """Starts speculative catalog lookups and counts whether they pay off"""
+
+    def __init__(self, limit: int = 10):
+        self.limit = limit
+        self.stats = {"started": 0, "skipped": 0, "hits": 0, "mismatches": 0, "unused": 0, "errors": 0}
+
+    @contextmanager
+    def speculate(self, user_message: Optional[str], likely_intent: Optional[str] = None):
+        """
+        Run a lookup alongside the turn; cancelled if nothing claims it.
+        Started only when the local classifier expects a retrieval intent
+        or the message names at least MIN_SPECULATIVE_PARAMS search params.
+        """
+        if not user_message:
+            yield None
+            return
+
+        params = extract_search_params(user_message)
+        if likely_intent not in RETRIEVAL_INTENTS and param_count(params) < MIN_SPECULATIVE_PARAMS:
+            self.stats["skipped"] += 1
+            yield None
+            return
+
+        from tools import database_tools
+        task = asyncio.ensure_future(database_tools.search_products_with_params(params, limit=self.limit))
+        task.add_done_callback(_discard_result)
+        speculation = Speculation(params, task)
+        self.stats["started"] += 1
+
+        token = _current.set(speculation)
+        try:
+            yield speculation
+        finally:
+            _current.reset(token)
+            if not speculation.claimed:
+                # Routing never reached retrieval
+                task.cancel()
+                self.stats["unused"] += 1
+
+    async def claim(self, params: Dict[str, Any], limit: int = 10) -> Optional[List[Dict[str, Any]]]:
+        """
+        Use the speculative result for `params` if it matches
+
+        Returns:
+            Retrieved products, or None when the caller must search itself
+        """
+        speculation = _current.get()
+        if speculation is None or speculation.claimed:
+            return None
+        speculation.claimed = True
+
+        if limit != self.limit or not params_match(speculation.params, params):
+            speculation.task.cancel()
+            self.stats["mismatches"] += 1
+            return None
+
+        try:
+            products = await speculation.task
+        except Exception as e:
+            print(f"⚠ Speculative retrieval failed: {e}")
+            self.stats["errors"] += 1
+            return None
+
+        self.stats["hits"] += 1
+        return products
+
+    def hit_rates(self) -> Dict[str, Any]:
+        """Counters plus hit and waste rates over started lookups"""
+        started = self.stats["started"]
+        wasted = self.stats["mismatches"] + self.stats["unused"]
+        return {
+            **self.stats,
+            "hit_rate": self.stats["hits"] / started if started else 0.0,
+            "waste_rate": wasted / started if started else 0.0
+        }
+
+
+# Global speculator instance
+product_speculator = ProductSpeculator()
@@ -0,0 +1,119 @@
+"""Token streaming helpers - forward LLM tokens to the active response stream"""
+
+import re
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, List, Optional
+
+from langchain_core.messages import AIMessage
+
+
+# Receives (text, agent_type) for every user-visible token chunk
+TokenSink = Callable[[str, str], Awaitable[None]]
+
+_token_sink: ContextVar[Optional[TokenSink]] = ContextVar("token_sink", default=None)
+
+_JSON_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+
+@contextmanager
+def stream_tokens(sink: TokenSink):
+    """Route tokens generated inside this block (and its tasks) to `sink`"""
+    token = _token_sink.set(sink)
+    try:
+        yield
+    finally:
+        _token_sink.reset(token)
+
+
+class JsonFieldStreamer:
+    """
+    Incrementally decodes the value of a JSON string field from streamed text,
+    so the user-visible part of a JSON reply can be forwarded as it arrives.
+    """
+
+    def __init__(self, fields: List[str]):
+        names = "|".join(re.escape(f) for f in fields)
+        self.pattern = re.compile(rf'"(?:{names})"\s*:\s*"')
+        self.buffer = ""
+        self.cursor: Optional[int] = None
+        self.done = False
+
+    def feed(self, chunk: str) -> str:
+        """Add raw model output, return newly decoded field characters"""
+        self.buffer += chunk
+        if self.done:
+            return ""
+
+        if self.cursor is None:
+            match = self.pattern.search(self.buffer)
+            if not match:
+                return ""
+            self.cursor = match.end()
+
+        out = []
+        buffer = self.buffer
+        while self.cursor < len(buffer):
+            char = buffer[self.cursor]
+            if char == "\\":
+                if self.cursor + 1 >= len(buffer):
+                    break
+                escape = buffer[self.cursor + 1]
+                if escape == "u":
+                    # Wait until all four hex digits have arrived
+                    if self.cursor + 6 > len(buffer):
+                        break
+                    try:
+                        out.append(chr(int(buffer[self.cursor + 2:self.cursor + 6], 16)))
+                    except ValueError:
+                        pass
+                    self.cursor += 6
+                else:
+                    out.append(_JSON_ESCAPES.get(escape, escape))
+                    self.cursor += 2
+            elif char == '"':
+                self.done = True
+                break
+            else:
+                out.append(char)
+                self.cursor += 1
+
+        return "".join(out)
+
+
+async def generate(
+    runnable: Any,
+    prompt: Any,
+    agent_type: str,
+    json_fields: Optional[List[str]] = None,
+    stream: bool = True
+) -> AIMessage:
+    """
+    Run an LLM (or prompt | llm chain), streaming tokens to the active sink
+
+    Args:
+        runnable: ChatGroq instance or chain ending in one
+        prompt: Input passed to ainvoke/astream
+        agent_type: Agent producing the tokens, forwarded with each chunk
+        json_fields: For JSON replies, only these string fields are streamed
+        stream: Set False when this output is not the user-facing answer
+
+    Returns:
+        The complete message, as ainvoke would return it
+    """
+    sink = _token_sink.get()
+    if sink is None or not stream:
+        return await runnable.ainvoke(prompt)
+
+    streamer = JsonFieldStreamer(json_fields) if json_fields else None
+    parts = []
+    async for chunk in runnable.astream(prompt):
+        content = chunk.content
+        if not content:
+            continue
+        parts.append(content)
+        text = streamer.feed(content) if streamer else content
+        if text:
+            await sink(text, agent_type)
+
+    return AIMessage(content="".join(parts))
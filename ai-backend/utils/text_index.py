@@ -0,0 +1,321 @@
+"""BM25 inverted index for product text search - same interface as SimpleVectorStore"""
+
+import heapq
+import math
+import re
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from utils.index_file import IndexFormatError, LazyDocuments, encode_documents, read_index, write_index
+
+
+# Product fields indexed, with their term-frequency weights (BM25F-style)
+PRODUCT_FIELDS: Dict[str, float] = {
+    "name": 3.0,
+    "brand": 2.0,
+    "category": 1.5,
+    "features": 1.5,
+    "description": 1.0,
+}
+
+STOPWORDS = {
+    "a", "an", "and", "are", "any", "as", "at", "be", "by", "can", "do", "does", "for",
+    "from", "have", "i", "in", "is", "it", "me", "my", "of", "on", "or", "show", "some",
+    "that", "the", "this", "to", "want", "what", "which", "with", "you", "your"
+}
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+# Removed documents are tombstoned; postings are compacted once this share is dead
+COMPACT_FRACTION = 0.25
+
+
+def _singular(token: str) -> str:
+    """Cheap plural folding (watches -> watch, straps -> strap, batteries -> battery)"""
+    if len(token) <= 3 or not token.endswith("s") or token.endswith(("ss", "us", "is")):
+        return token
+    if token.endswith("ies") and len(token) > 4:
+        return token[:-3] + "y"
+    if token.endswith(("ches", "shes", "xes", "sses", "zes")):
+        return token[:-2]
+    return token[:-1]
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens without stopwords, plurals folded to the singular"""
+    return [
+        _singular(token)
+        for token in _TOKEN_PATTERN.findall(text.lower())
+        if token not in STOPWORDS
+    ]
+
+
+def product_fields(product: Dict[str, Any]) -> Dict[str, str]:
+    """Indexable text of each product field (lists such as features are joined)"""
+    fields = {}
+    for field in PRODUCT_FIELDS:
+        value = product.get(field)
+        if isinstance(value, (list, tuple)):
+            value = " ".join(str(item) for item in value)
+        fields[field] = str(value) if value else ""
+    return fields
+
+
+class BM25Index:
+    """
+    Inverted index with Okapi BM25 ranking. Each term maps to a postings
+    list of (document, weighted term frequency); a search only visits the
+    postings of the query's terms and keeps the best `top_k` in a heap, so
+    its cost follows how common the query terms are, not the catalog size.
+
+    save_index/load_index persist the postings as flat arrays; a loaded
+    index searches the memory-mapped file and is copied into memory only
+    when documents are added or removed.
+
+    Removed documents are tombstoned and filtered from results; their
+    postings still count towards term document frequencies until the
+    next compaction.
+    """
+
+    INDEX_BACKEND = "bm25"
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.documents: List[Dict[str, Any]] = []
+        self._postings: Dict[str, List[Tuple[int, float]]] = {}
+        self._lengths: List[float] = []
+        self._total_length = 0.0
+        # Per-document length normalization; rebuilt lazily after inserts
+        self._norms: Optional[List[float]] = None
+        # Term ids and (offsets, documents, frequencies) postings while mapped from an index file
+        self._terms: Dict[str, int] = {}
+        self._frozen: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]] = None
+        self._ids: Dict[str, int] = {}
+        self._deleted: Set[int] = set()
+
+    def __len__(self) -> int:
+        """Live documents"""
+        return len(self.documents) - len(self._deleted)
+
+    def add_document(
+        self,
+        doc_id: str,
+        text: str,
+        metadata: Dict[str, Any] = None,
+        fields: Optional[Dict[str, str]] = None
+    ):
+        """Add a document; `fields` (name -> text) is weighted by PRODUCT_FIELDS instead of indexing `text`"""
+        self._thaw()
+        frequencies: Dict[str, float] = {}
+        length = 0.0
+        for field, field_text in (fields or {"": text}).items():
+            weight = PRODUCT_FIELDS.get(field, 1.0)
+            for token in tokenize(field_text):
+                frequencies[token] = frequencies.get(token, 0.0) + weight
+                length += weight
+
+        doc_index = len(self.documents)
+        for token, frequency in frequencies.items():
+            self._postings.setdefault(token, []).append((doc_index, frequency))
+        self._lengths.append(length)
+        self._total_length += length
+        self._norms = None
+
+        self._ids[doc_id] = doc_index
+        self.documents.append({
+            "id": doc_id,
+            "text": text,
+            "metadata": metadata or {}
+        })
+
+    def add_documents(self, items: Iterable[Tuple[str, str, Optional[Dict[str, Any]]]]):
+        """Add (doc_id, text, metadata) documents"""
+        for doc_id, text, metadata in items:
+            self.add_document(doc_id, text, metadata)
+
+    def remove_document(self, doc_id: str) -> bool:
+        """Tombstone a document; False if it is not indexed"""
+        self._thaw()
+        doc_index = self._ids.pop(doc_id, None)
+        if doc_index is None:
+            return False
+        self._deleted.add(doc_index)
+        self._total_length -= self._lengths[doc_index]
+        self._norms = None
+        if len(self._deleted) > COMPACT_FRACTION * len(self.documents):
+            self._compact()
+        return True
+
+    def upsert_products(self, products: List[Dict[str, Any]]):
+        """Re-index changed products (new ones are added)"""
+        for product in products:
+            self.remove_document(product.get('id', ''))
+            self._add_product(product)
+
+    def remove_products(self, product_ids: Iterable[str]):
+        for product_id in product_ids:
+            self.remove_document(product_id)
+
+    def _compact(self):
+        """Drop tombstoned documents and renumber the rest"""
+        keep = [doc_index for doc_index in range(len(self.documents)) if doc_index not in self._deleted]
+        renumber = {old: new for new, old in enumerate(keep)}
+        postings = {}
+        for term, entries in self._postings.items():
+            live = [(renumber[doc_index], frequency) for doc_index, frequency in entries if doc_index in renumber]
+            if live:
+                postings[term] = live
+        self._postings = postings
+        self.documents = [self.documents[doc_index] for doc_index in keep]
+        self._lengths = [self._lengths[doc_index] for doc_index in keep]
+        self._ids = {doc["id"]: doc_index for doc_index, doc in enumerate(self.documents)}
+        self._deleted = set()
+        self._norms = None
+
+    def search(self, query: str, top_k: int = 5) -> List[Dict[str, Any]]:
+        """Search for matching documents, best first (similarity_score is the BM25 score)"""
+        if not len(self) or top_k <= 0:
+            return []
+
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            for doc_index, contribution in self._term_scores(term):
+                scores[doc_index] = scores.get(doc_index, 0.0) + contribution
+        for doc_index in self._deleted:
+            scores.pop(doc_index, None)
+
+        # Ties keep insertion order
+        best = heapq.nlargest(top_k, scores.items(), key=lambda item: (item[1], -item[0]))
+        return [{**self.documents[doc_index], "similarity_score": score} for doc_index, score in best]
+
+    def _term_scores(self, term: str) -> Iterable[Tuple[int, float]]:
+        """(document, BM25 contribution) for every posting of `term`"""
+        count = len(self)
+        norms = self._length_norms()
+        scale = self.k1 + 1
+        if self._frozen is None:
+            postings = self._postings.get(term)
+            if not postings:
+                return []
+            idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            return [
+                (doc_index, idf * frequency * scale / (frequency + norms[doc_index]))
+                for doc_index, frequency in postings
+            ]
+
+        # Mapped: score the term's slice of the postings arrays in one vector operation
+        term_id = self._terms.get(term)
+        if term_id is None:
+            return []
+        offsets, documents, frequencies = self._frozen
+        start, end = offsets[term_id], offsets[term_id + 1]
+        documents, frequencies = documents[start:end], frequencies[start:end]
+        idf = math.log(1 + (count - len(documents) + 0.5) / (len(documents) + 0.5))
+        contributions = idf * frequencies * scale / (frequencies + norms[documents])
+        return zip(documents.tolist(), contributions.tolist())
+
+    def save_index(self, path: str, fingerprint: Optional[str] = None):
+        """Write documents, postings and length norms to an index file"""
+        self._thaw()
+        if self._deleted:
+            self._compact()
+        terms = list(self._postings)
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(self._postings[term]) for term in terms])
+        postings = [posting for term in terms for posting in self._postings[term]]
+        arrays = {
+            **encode_documents(self.documents),
+            "terms": np.frombuffer("\n".join(terms).encode(), dtype=np.uint8),
+            "posting_offsets": offsets,
+            "posting_documents": np.array([doc for doc, _ in postings], dtype=np.int32),
+            "posting_frequencies": np.array([frequency for _, frequency in postings], dtype=np.float64),
+            "lengths": np.array(self._lengths, dtype=np.float64),
+            "norms": np.array(self._length_norms() if self._lengths else [], dtype=np.float64)
+        }
+        meta = {"k1": self.k1, "b": self.b, "total_length": self._total_length}
+        write_index(path, self.INDEX_BACKEND, arrays, meta, fingerprint)
+
+    def load_index(self, path: str, fingerprint: Optional[str] = None) -> bool:
+        """Map an index file written by save_index; False if it is unusable or built from another catalog"""
+        try:
+            header, arrays = read_index(path, self.INDEX_BACKEND)
+        except IndexFormatError as e:
+            print(f"⚠ Text index not loaded: {e}")
+            return False
+        meta = header["meta"]
+        if fingerprint is not None and header.get("fingerprint") != fingerprint:
+            print(f"⚠ Text index {path} was built from a different catalog")
+            return False
+
+        self.k1, self.b = meta["k1"], meta["b"]
+        terms = arrays["terms"].tobytes().decode()
+        self._terms = {term: term_id for term_id, term in enumerate(terms.split("\n"))} if terms else {}
+        self._frozen = (arrays["posting_offsets"], arrays["posting_documents"], arrays["posting_frequencies"])
+        self._postings = {}
+        self.documents = LazyDocuments(arrays["documents"], arrays["document_offsets"])
+        self._lengths = arrays["lengths"]
+        self._total_length = meta["total_length"]
+        self._norms = arrays["norms"]
+        return True
+
+    def _thaw(self):
+        """Copy a mapped index into memory before the first change"""
+        if self._frozen is None:
+            return
+        offsets, documents, frequencies = self._frozen
+        self._postings = {
+            term: list(zip(
+                documents[offsets[term_id]:offsets[term_id + 1]].tolist(),
+                frequencies[offsets[term_id]:offsets[term_id + 1]].tolist()
+            ))
+            for term, term_id in self._terms.items()
+        }
+        self.documents = list(self.documents)
+        self._ids = {doc["id"]: doc_index for doc_index, doc in enumerate(self.documents)}
+        self._lengths = self._lengths.tolist()
+        self._norms = None
+        self._terms = {}
+        self._frozen = None
+
+    def _length_norms(self) -> List[float]:
+        """k1 * (1 - b + b * length / average length) for every document"""
+        if self._norms is None:
+            average_length = self._total_length / max(len(self), 1) or 1.0
+            self._norms = [
+                self.k1 * (1 - self.b + self.b * length / average_length) for length in self._lengths
+            ]
+        return self._norms
+
+    def search_batch(self, queries: List[str], top_k: int = 5) -> List[List[Dict[str, Any]]]:
+        """Search several queries; results per query, best first"""
+        return [self.search(query, top_k) for query in queries]
+
+    def clear(self):
+        """Clear all documents"""
+        self.documents = []
+        self._postings = {}
+        self._lengths = []
+        self._total_length = 0.0
+        self._norms = None
+        self._terms = {}
+        self._frozen = None
+        self._ids = {}
+        self._deleted = set()
+
+    def load_from_products(self, products: List[Dict[str, Any]]):
+        """Index products field by field"""
+        self.clear()
+
+        for product in products:
+            self._add_product(product)
+
+    def _add_product(self, product: Dict[str, Any]):
+        fields = product_fields(product)
+        self.add_document(
+            doc_id=product.get('id', ''),
+            text=" ".join(text for text in fields.values() if text),
+            metadata=product,
+            fields=fields
+        )
@@ -0,0 +1,237 @@
+"""Per-turn tracing - node and LLM spans, latency/token histograms and JSONL export"""
+
+import json
+import time
+import uuid
+from bisect import bisect_left
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import AsyncCallbackHandler
+from langchain_core.outputs import LLMResult
+
+from config import settings
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+TOKEN_BUCKETS = (16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192)
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+
+class Span:
+    """A timed unit of work inside a turn (the turn itself, a node or an LLM call)"""
+
+    def __init__(self, name: str, kind: str, parent: Optional["Span"] = None):
+        self.span_id = uuid.uuid4().hex[:16]
+        self.name = name
+        self.kind = kind
+        self.parent = parent
+        self.start = time.perf_counter()
+        self.started_at = time.time()
+        self.end: Optional[float] = None
+        self.attributes: Dict[str, Any] = {}
+        self.children: List["Span"] = []
+        if parent is not None:
+            parent.children.append(self)
+
+    @property
+    def duration(self) -> float:
+        end = self.end if self.end is not None else time.perf_counter()
+        return end - self.start
+
+    def finish(self):
+        if self.end is None:
+            self.end = time.perf_counter()
+
+    def node_name(self) -> str:
+        """Nearest enclosing node span, used to attribute LLM calls to an agent"""
+        span = self
+        while span is not None:
+            if span.kind == "node":
+                return span.name
+            span = span.parent
+        return "unknown"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "span_id": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "started_at": self.started_at,
+            "duration_ms": round(self.duration * 1000, 3),
+            "attributes": self.attributes,
+            "children": [child.to_dict() for child in self.children]
+        }
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus exposition style"""
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts: Dict[Tuple, List[int]] = defaultdict(lambda: [0] * (len(buckets) + 1))
+        self.sums: Dict[Tuple, float] = defaultdict(float)
+
+    def observe(self, labels: Tuple, value: float):
+        self.counts[labels][bisect_left(self.buckets, value)] += 1
+        self.sums[labels] += value
+
+    def render(self, name: str, label_names: Tuple[str, ...]) -> List[str]:
+        lines = [f"# TYPE {name} histogram"]
+        for labels, counts in sorted(self.counts.items()):
+            base = ",".join(f'{k}="{v}"' for k, v in zip(label_names, labels))
+            sep = "," if base else ""
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                lines.append(f'{name}_bucket{{{base}{sep}le="{bound}"}} {cumulative}')
+            cumulative += counts[-1]
+            lines.append(f'{name}_bucket{{{base}{sep}le="+Inf"}} {cumulative}')
+            lines.append(f"{name}_sum{{{base}}} {self.sums[labels]}")
+            lines.append(f"{name}_count{{{base}}} {cumulative}")
+        return lines
+
+
+class LLMTraceCallback(AsyncCallbackHandler):
+    """LangChain callback that opens a child span for every LLM call"""
+
+    def __init__(self, tracer: "Tracer"):
+        self.tracer = tracer
+        self.spans: Dict[UUID, Span] = {}
+
+    async def on_chat_model_start(self, serialized: Dict[str, Any], messages: List[Any], *, run_id: UUID, **kwargs: Any):
+        self._start(serialized, run_id, kwargs)
+
+    async def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], *, run_id: UUID, **kwargs: Any):
+        self._start(serialized, run_id, kwargs)
+
+    async def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any):
+        span = self.spans.pop(run_id, None)
+        if span is None:
+            return
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        span.attributes["prompt_tokens"] = usage.get("prompt_tokens", 0)
+        span.attributes["completion_tokens"] = usage.get("completion_tokens", 0)
+        self.tracer.finish_llm_span(span)
+
+    async def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        span = self.spans.pop(run_id, None)
+        if span is None:
+            return
+        span.attributes["error"] = type(error).__name__
+        self.tracer.finish_llm_span(span)
+
+    def _start(self, serialized: Dict[str, Any], run_id: UUID, kwargs: Dict[str, Any]):
+        parent = _current_span.get()
+        if parent is None:
+            return
+        params = kwargs.get("invocation_params") or {}
+        model = params.get("model") or params.get("model_name") or (serialized.get("kwargs") or {}).get("model", "unknown")
+        span = Span("llm", "llm", parent)
+        span.attributes["model"] = model
+        self.spans[run_id] = span
+
+
+class Tracer:
+    """Collects per-turn span trees and aggregates them into metrics"""
+
+    def __init__(self, trace_file: Optional[str] = None, keep_recent: int = 50):
+        self.trace_file = trace_file
+        self.recent_traces: deque = deque(maxlen=keep_recent)
+        self.callback = LLMTraceCallback(self)
+
+        self.turn_latency = Histogram(LATENCY_BUCKETS)
+        self.node_latency = Histogram(LATENCY_BUCKETS)
+        self.llm_latency = Histogram(LATENCY_BUCKETS)
+        self.llm_tokens = Histogram(TOKEN_BUCKETS)
+        self.llm_calls: Dict[Tuple[str, str], int] = defaultdict(int)
+        self.token_totals: Dict[Tuple[str, str, str], int] = defaultdict(int)
+
+    @contextmanager
+    def turn(self, session_id: str):
+        """Root span for one user turn; exported when the block exits"""
+        span = Span("turn", "turn")
+        span.attributes["session_id"] = session_id
+        token = _current_span.set(span)
+        try:
+            yield span
+        finally:
+            _current_span.reset(token)
+            span.finish()
+            self.turn_latency.observe((), span.duration)
+            self._export(span)
+
+    @contextmanager
+    def span(self, name: str, kind: str = "node"):
+        """Child span of the current span (no-op outside a turn)"""
+        parent = _current_span.get()
+        if parent is None:
+            yield None
+            return
+        span = Span(name, kind, parent)
+        token = _current_span.set(span)
+        try:
+            yield span
+        finally:
+            _current_span.reset(token)
+            span.finish()
+            if kind == "node":
+                self.node_latency.observe((name,), span.duration)
+
+    def traced(self, name: str, fn: Callable) -> Callable:
+        """Wrap an async graph node so each call records a node span"""
+        async def wrapper(*args, **kwargs):
+            with self.span(name):
+                return await fn(*args, **kwargs)
+        # No functools.wraps: LangChain inspects the wrapped source for nonlocals
+        wrapper.__name__ = name
+        return wrapper
+
+    def finish_llm_span(self, span: Span):
+        span.finish()
+        node = span.node_name()
+        model = span.attributes.get("model", "unknown")
+        self.llm_latency.observe((node, model), span.duration)
+        self.llm_calls[(node, model)] += 1
+        for kind in ("prompt", "completion"):
+            tokens = span.attributes.get(f"{kind}_tokens", 0)
+            if tokens:
+                self.llm_tokens.observe((node, model, kind), tokens)
+                self.token_totals[(node, model, kind)] += tokens
+
+    def render_prometheus(self) -> str:
+        """Metrics in the Prometheus text exposition format"""
+        lines: List[str] = []
+        lines += self.turn_latency.render("agent_turn_latency_seconds", ())
+        lines += self.node_latency.render("agent_node_latency_seconds", ("node",))
+        lines += self.llm_latency.render("agent_llm_latency_seconds", ("node", "model"))
+        lines += self.llm_tokens.render("agent_llm_tokens", ("node", "model", "type"))
+
+        lines.append("# TYPE agent_llm_calls_total counter")
+        for (node, model), count in sorted(self.llm_calls.items()):
+            lines.append(f'agent_llm_calls_total{{node="{node}",model="{model}"}} {count}')
+
+        lines.append("# TYPE agent_llm_tokens_total counter")
+        for (node, model, kind), count in sorted(self.token_totals.items()):
+            lines.append(f'agent_llm_tokens_total{{node="{node}",model="{model}",type="{kind}"}} {count}')
+
+        return "\n".join(lines) + "\n"
+
+    def _export(self, span: Span):
+        trace = span.to_dict()
+        self.recent_traces.append(trace)
+        if not self.trace_file:
+            return
+        try:
+            with open(self.trace_file, "a", encoding="utf-8") as f:
+                f.write(json.dumps(trace) + "\n")
+        except Exception as e:
+            print(f"⚠ Trace export failed: {e}")
+
+
+# Global tracer instance
+tracer = Tracer(trace_file=settings.trace_file)
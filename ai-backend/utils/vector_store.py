@@ -1,102 +1,263 @@
 """Simple in-memory vector store for product embeddings and semantic search"""
 
-from typing import List, Dict, Any, Tuple
-import json
-import math
+from typing import List, Dict, Any, Iterable, Optional, Tuple
+import numpy as np
+
+from config import settings
+from utils.ann_index import IVFFlatIndex
+from utils.index_file import IndexFormatError, LazyDocuments, encode_documents, read_index, write_index
+from utils.text_index import BM25Index
+
+
+# Embedding width of _simple_embed
+EMBEDDING_DIM = 128
+# Rows allocated up front; the matrix doubles when full (amortized O(1) appends)
+INITIAL_CAPACITY = 64
 
 
 class SimpleVectorStore:
-    """In-memory vector store with basic semantic search capabilities"""
+    """
+    In-memory vector store with basic semantic search capabilities.
+    Embeddings live in one contiguous float32 matrix, so a search is a
+    single matrix-vector product followed by an argpartition top-k.
+    
+    With an `ann` index, collections of at least `ann_min_documents`
+    documents are searched approximately through it instead.
+    
+    save_index/load_index persist the store to an index file; a loaded
+    store searches the memory-mapped file directly and copies it into
+    memory only when documents are added or removed.
+    """
     
-    def __init__(self):
+    INDEX_BACKEND = "embedding"
+    
+    def __init__(
+        self,
+        dim: int = EMBEDDING_DIM,
+        ann: Optional[IVFFlatIndex] = None,
+        ann_min_documents: int = 5000
+    ):
+        self.dim = dim
+        self.ann = ann
+        self.ann_min_documents = ann_min_documents
         self.documents: List[Dict[str, Any]] = []
-        self.embeddings: List[List[float]] = []
+        self._rows: Dict[str, int] = {}
+        self._matrix = np.zeros((INITIAL_CAPACITY, dim), dtype=np.float32)
+        self._mapped = False
+    
+    def __len__(self) -> int:
+        return len(self.documents)
+    
+    @property
+    def embeddings(self) -> np.ndarray:
+        """Embeddings of the stored documents, one row each (a view, not a copy)"""
+        return self._matrix[:len(self.documents)]
     
     def add_document(self, doc_id: str, text: str, metadata: Dict[str, Any] = None):
         """Add a document to the vector store"""
-        # Simple embedding: word frequency vector (placeholder for actual embeddings)
-        embedding = self._simple_embed(text)
+        self.add_documents([(doc_id, text, metadata)])
+    
+    def add_documents(self, items: Iterable[Tuple[str, str, Optional[Dict[str, Any]]]]):
+        """Add (doc_id, text, metadata) documents in one append"""
+        items = list(items)
+        if not items:
+            return
+        self._thaw()
         
-        self.documents.append({
-            "id": doc_id,
-            "text": text,
-            "metadata": metadata or {}
-        })
-        self.embeddings.append(embedding)
-    
-    def _simple_embed(self, text: str) -> List[float]:
+        # Simple embedding: character frequency vector (placeholder for actual embeddings)
+        vectors = np.stack([self._simple_embed(text) for _, text, _ in items])
+        self._reserve(len(self.documents) + len(items))
+        start = len(self.documents)
+        self._matrix[start:start + len(items)] = vectors
+        
+        for doc_id, text, metadata in items:
+            self._rows[doc_id] = len(self.documents)
+            self.documents.append({
+                "id": doc_id,
+                "text": text,
+                "metadata": metadata or {}
+            })
+        
+        if self.ann is not None and len(self.documents) >= self.ann_min_documents:
+            if self.ann.needs_training(len(self.documents)):
+                self.ann.train(self.embeddings)
+            else:
+                self.ann.add(np.arange(start, start + len(items)), vectors)
+    
+    def remove_document(self, doc_id: str) -> bool:
+        """Remove a document; the last row moves into its slot so the matrix stays dense"""
+        self._thaw()
+        row = self._rows.pop(doc_id, None)
+        if row is None:
+            return False
+        
+        last = len(self.documents) - 1
+        if self.ann is not None:
+            self.ann.remove(row)
+        if row != last:
+            self._matrix[row] = self._matrix[last]
+            self.documents[row] = self.documents[last]
+            self._rows[self.documents[row]["id"]] = row
+            if self.ann is not None:
+                self.ann.move(last, row)
+        self.documents.pop()
+        return True
+    
+    def upsert_products(self, products: List[Dict[str, Any]]):
+        """Re-embed changed products (new ones are added)"""
+        for product in products:
+            self.remove_document(product.get('id', ''))
+        self.add_documents(self._product_item(product) for product in products)
+    
+    def remove_products(self, product_ids: Iterable[str]):
+        for product_id in product_ids:
+            self.remove_document(product_id)
+    
+    def save_index(self, path: str, fingerprint: Optional[str] = None):
+        """Write embeddings, documents and any trained ANN cells to an index file"""
+        arrays = {"embeddings": self.embeddings, **encode_documents(list(self.documents))}
+        meta: Dict[str, Any] = {"dim": self.dim}
+        if self.ann is not None and self.ann.trained:
+            ann_arrays, meta["ivf"] = self.ann.to_arrays(len(self.documents))
+            arrays.update({f"ivf_{name}": array for name, array in ann_arrays.items()})
+        write_index(path, self.INDEX_BACKEND, arrays, meta, fingerprint)
+    
+    def load_index(self, path: str, fingerprint: Optional[str] = None) -> bool:
+        """Map an index file written by save_index; False if it is unusable or built from another catalog"""
+        try:
+            header, arrays = read_index(path, self.INDEX_BACKEND)
+        except IndexFormatError as e:
+            print(f"⚠ Vector index not loaded: {e}")
+            return False
+        meta = header["meta"]
+        if fingerprint is not None and header.get("fingerprint") != fingerprint:
+            print(f"⚠ Vector index {path} was built from a different catalog")
+            return False
+        if meta.get("dim") != self.dim:
+            print(f"⚠ Vector index {path} has dimension {meta.get('dim')}, expected {self.dim}")
+            return False
+        
+        self.documents = LazyDocuments(arrays["documents"], arrays["document_offsets"])
+        self._matrix = arrays["embeddings"]
+        self._rows = {}
+        self._mapped = True
+        if self.ann is not None:
+            if "ivf" in meta:
+                self.ann.restore({name[4:]: array for name, array in arrays.items() if name.startswith("ivf_")}, meta["ivf"])
+            else:
+                self.ann.reset()
+                if len(self.documents) >= self.ann_min_documents:
+                    self.ann.train(self.embeddings)
+        return True
+    
+    def _thaw(self):
+        """Copy a mapped index into memory before the first change"""
+        if not self._mapped:
+            return
+        count = len(self.documents)
+        self.documents = list(self.documents)
+        self._rows = {doc["id"]: row for row, doc in enumerate(self.documents)}
+        matrix = np.zeros((max(INITIAL_CAPACITY, count), self.dim), dtype=np.float32)
+        matrix[:count] = self._matrix[:count]
+        self._matrix = matrix
+        self._mapped = False
+    
+    def _reserve(self, rows: int):
+        """Grow the matrix geometrically so it holds at least `rows` rows"""
+        capacity = len(self._matrix)
+        if rows <= capacity:
+            return
+        while capacity < rows:
+            capacity *= 2
+        grown = np.zeros((capacity, self.dim), dtype=np.float32)
+        grown[:len(self.documents)] = self.embeddings
+        self._matrix = grown
+    
+    def _simple_embed(self, text: str) -> np.ndarray:
         """
         Simple embedding using character-based hashing
         In production, use Groq embeddings or sentence-transformers
         """
-        # Normalize text
-        text = text.lower()
-        
-        # Create a simple 128-dimensional vector based on character frequencies
-        vector = [0.0] * 128
-        
-        for char in text:
-            if char.isalnum():
-                idx = ord(char) % 128
-                vector[idx] += 1.0
+        # 128-dimensional vector of alphanumeric character frequencies
+        codes = [ord(char) % self.dim for char in text.lower() if char.isalnum()]
+        vector = np.bincount(codes, minlength=self.dim).astype(np.float32)
         
         # Normalize vector
-        magnitude = math.sqrt(sum(x * x for x in vector))
+        magnitude = np.linalg.norm(vector)
         if magnitude > 0:
-            vector = [x / magnitude for x in vector]
+            vector /= magnitude
         
         return vector
     
-    def _cosine_similarity(self, vec1: List[float], vec2: List[float]) -> float:
-        """Calculate cosine similarity between two vectors"""
-        dot_product = sum(a * b for a, b in zip(vec1, vec2))
-        return dot_product
-    
     def search(self, query: str, top_k: int = 5) -> List[Dict[str, Any]]:
         """Search for similar documents"""
-        if not self.documents:
-            return []
-        
-        # Embed query
-        query_embedding = self._simple_embed(query)
+        return self.search_batch([query], top_k)[0]
+    
+    def search_batch(self, queries: List[str], top_k: int = 5) -> List[List[Dict[str, Any]]]:
+        """Search several queries with one matrix product; results per query, best first"""
+        if not self.documents or not queries or top_k <= 0:
+            return [[] for _ in queries]
         
-        # Calculate similarities
-        similarities: List[Tuple[int, float]] = []
-        for idx, doc_embedding in enumerate(self.embeddings):
-            similarity = self._cosine_similarity(query_embedding, doc_embedding)
-            similarities.append((idx, similarity))
+        # Embeddings are unit length, so the dot product is the cosine similarity
+        query_matrix = np.stack([self._simple_embed(query) for query in queries])
+        if self.ann is not None and self.ann.trained:
+            return [
+                [
+                    {**self.documents[idx], "similarity_score": float(score)}
+                    for idx, score in zip(rows.tolist(), scores.tolist())
+                ]
+                for rows, scores in self.ann.search(query_matrix, self.embeddings, top_k)
+            ]
         
-        # Sort by similarity (descending)
-        similarities.sort(key=lambda x: x[1], reverse=True)
+        scores = query_matrix @ self.embeddings.T
         
-        # Return top-k results
         results = []
-        for idx, score in similarities[:top_k]:
-            doc = self.documents[idx].copy()
-            doc["similarity_score"] = score
-            results.append(doc)
-        
+        for row in scores:
+            results.append([
+                {**self.documents[idx], "similarity_score": float(row[idx])}
+                for idx in self._top_k(row, top_k)
+            ])
         return results
     
+    def _top_k(self, scores: np.ndarray, k: int) -> np.ndarray:
+        """Indices of the k best scores, best first (ties keep insertion order)"""
+        if k < len(scores):
+            candidates = np.argpartition(-scores, k - 1)[:k]
+        else:
+            candidates = np.arange(len(scores))
+        order = np.lexsort((candidates, -scores[candidates]))
+        return candidates[order]
+    
     def clear(self):
         """Clear all documents"""
         self.documents = []
-        self.embeddings = []
+        self._rows = {}
+        self._matrix = np.zeros((INITIAL_CAPACITY, self.dim), dtype=np.float32)
+        self._mapped = False
+        if self.ann is not None:
+            self.ann.reset()
     
     def load_from_products(self, products: List[Dict[str, Any]]):
         """Load products into vector store"""
         self.clear()
         
-        for product in products:
-            # Create searchable text from product data
-            text = f"{product.get('name', '')} {product.get('brand', '')} {product.get('description', '')} {product.get('category', '')}"
-            
-            self.add_document(
-                doc_id=product.get('id', ''),
-                text=text,
-                metadata=product
-            )
+        self.add_documents(self._product_item(product) for product in products)
+    
+    def _product_item(self, product: Dict[str, Any]) -> Tuple[str, str, Dict[str, Any]]:
+        # Create searchable text from product data
+        text = f"{product.get('name', '')} {product.get('brand', '')} {product.get('description', '')} {product.get('category', '')}"
+        return product.get('id', ''), text, product
+
+
+def create_vector_store():
+    """Product search backend selected by RETRIEVAL_BACKEND"""
+    if settings.retrieval_backend == "embedding":
+        return SimpleVectorStore()
+    if settings.retrieval_backend == "ivf":
+        ann = IVFFlatIndex(EMBEDDING_DIM, settings.ann_nlist, settings.ann_nprobe)
+        return SimpleVectorStore(ann=ann, ann_min_documents=settings.ann_min_documents)
+    return BM25Index()
 
 
 # Global vector store instance
-vector_store = SimpleVectorStore()
+vector_store = create_vector_store()
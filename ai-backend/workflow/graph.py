@@ -1,50 +1,137 @@
 """LangGraph workflow orchestration - Agent collaboration state machine"""
 
-from typing import Dict, Any, Literal
+import asyncio
+import re
+from typing import Dict, Any, Literal, Optional
 from langgraph.graph import StateGraph, END
 from langchain_groq import ChatGroq
+from langchain_core.language_models.chat_models import BaseChatModel
 from workflow.state import ConversationState
 from agents.interaction_agent import create_interaction_agent
 from agents.knowledge_agent import create_knowledge_agent
 from agents.memory_agent import create_memory_agent
-from agents.sentiment_agent import create_sentiment_agent
+from agents.sentiment_agent import create_sentiment_agent, initial_sentiment_state, record_intent
 from agents.decision_agent import create_decision_agent
 from agents.handoff_agent import create_handoff_agent
 from agents.consultant_agent import create_consultant_agent
 from agents.refund_agent import create_refund_agent
+from agents.planner_agent import create_planner_agent
 from config import settings
+from utils.tracing import tracer
+from utils.intent_classifier import match_intent_rules
+from utils.speculation import product_speculator
+from utils.hedging import HedgePolicy
+from utils.llm_scheduler import LLMScheduler
+from utils.llm_cache import llm_cache
+
+
+# State keys owned by each agent in the parallel analysis fan-out.
+# Only these keys are merged back into the shared state at the join,
+# so concurrent branches never overwrite each other's results.
+PARALLEL_ANALYSIS_KEYS = {
+    "interaction": ("user_intent", "route"),
+    "memory": ("conversation_summary", "summary_watermark"),
+    "sentiment": ("sentiment_score", "frustration_level", "escalation_signals", "sentiment_state"),
+}
+
+# Intents that never reach product retrieval; a confident local prediction
+# of one of these skips the speculative lookup
+NON_RETRIEVAL_INTENTS = {"order_tracking", "account_support", "refund_request", "human_handoff"}
+
+
+# Explicit phrases that end an active consultation/refund flow and fall back
+# to full routing. Bare "cancel"/"stop" are not enough: "cancel my order and
+# refund me" is refund wording, not a request to leave the flow.
+FLOW_EXIT_PATTERN = re.compile(
+    r"\b(never ?mind|forget (it|about it)|start over|something else"
+    r"|(cancel|stop|drop) (it|this|that)"
+    r"|(cancel|stop|drop) (the |my )?(refund|return)( request)?)\b",
+    re.IGNORECASE
+)
 
 
 class AgentWorkflow:
     """LangGraph workflow for multi-agent collaboration"""
     
-    def __init__(self):
-        # Initialize Groq LLMs
-        self.primary_llm = ChatGroq(
+    def __init__(
+        self,
+        mode: str = None,
+        response_mode: str = None,
+        primary_llm: Optional[BaseChatModel] = None,
+        fallback_llm: Optional[BaseChatModel] = None
+    ):
+        self.mode = mode or settings.workflow_mode
+        self.response_mode = response_mode or settings.response_mode
+        # Summaries are refreshed after the reply (see schedule_summary)
+        # instead of inside the graph
+        self.background_summary = settings.background_summary
+        self.summary_tasks: Dict[str, asyncio.Task] = {}
+        
+        # Initialize Groq LLMs (injected models are used by offline benchmarks).
+        # Retries are left to the scheduler so they respect its rate limits.
+        self.primary_llm = primary_llm or ChatGroq(
             model=settings.primary_model,
             temperature=settings.model_temperature,
-            groq_api_key=settings.groq_api_key
+            groq_api_key=settings.groq_api_key,
+            max_retries=0,
+            callbacks=[tracer.callback]
         )
         
-        self.fallback_llm = ChatGroq(
+        self.fallback_llm = fallback_llm or ChatGroq(
             model=settings.fallback_model,
             temperature=0.2,
-            groq_api_key=settings.groq_api_key
+            groq_api_key=settings.groq_api_key,
+            max_retries=0,
+            callbacks=[tracer.callback]
+        )
+        
+        # Every agent call goes through the shared scheduler's model lanes
+        self.scheduler = LLMScheduler(
+            max_concurrency=settings.llm_max_concurrency,
+            batch_window=settings.llm_batch_window_ms / 1000,
+            max_batch_size=settings.llm_batch_max_size,
+            batching=settings.llm_batching,
+            requests_per_minute=settings.groq_requests_per_minute,
+            tokens_per_minute=settings.groq_tokens_per_minute,
+            max_queue_wait=settings.llm_max_queue_wait_seconds,
+            max_retries=settings.llm_max_retries,
+            breaker_threshold=settings.llm_breaker_threshold,
+            breaker_cooldown=settings.llm_breaker_cooldown_seconds,
+            hedge=HedgePolicy(
+                percentile=settings.llm_hedge_percentile,
+                min_delay=settings.llm_hedge_min_delay_ms / 1000,
+                max_rate=settings.llm_hedge_max_rate,
+                on_fallback=settings.llm_hedge_on_fallback
+            ) if settings.llm_hedging else None
         )
+        cached_agents = (
+            {name.strip() for name in settings.llm_cache_agents.split(",") if name.strip()}
+            if settings.llm_cache else set()
+        )
+        
+        def model_for(agent: str, llm: BaseChatModel):
+            # Primary-model agents fail over to the fallback model while its circuit is open
+            cache = llm_cache if agent in cached_agents else None
+            return self.scheduler.wrap(llm, cache=cache, agent=agent, fallback=self.fallback_llm)
         
         # Initialize agents
-        self.interaction_agent = create_interaction_agent(self.fallback_llm)
-        self.knowledge_agent = create_knowledge_agent(self.primary_llm)
-        self.memory_agent = create_memory_agent(self.fallback_llm)
-        self.sentiment_agent = create_sentiment_agent(self.fallback_llm)
+        self.interaction_agent = create_interaction_agent(model_for("interaction", self.fallback_llm), self.scheduler)
+        self.knowledge_agent = create_knowledge_agent(model_for("knowledge", self.primary_llm))
+        self.memory_agent = create_memory_agent(model_for("memory", self.fallback_llm))
+        self.sentiment_agent = create_sentiment_agent(model_for("sentiment", self.fallback_llm), self.scheduler)
         self.decision_agent = create_decision_agent(
-            self.primary_llm,
+            model_for("decision", self.primary_llm),
             settings.ai_confidence_threshold
         )
 
-        self.handoff_agent = create_handoff_agent(self.primary_llm)
-        self.consultant_agent = create_consultant_agent(self.primary_llm)
-        self.refund_agent = create_refund_agent(self.primary_llm)
+        self.handoff_agent = create_handoff_agent(model_for("handoff", self.primary_llm))
+        self.consultant_agent = create_consultant_agent(model_for("consultant", self.primary_llm))
+        self.refund_agent = create_refund_agent(model_for("refund", self.primary_llm))
+        self.planner_agent = create_planner_agent(
+            model_for("planner", self.primary_llm),
+            self.knowledge_agent,
+            self.decision_agent
+        )
         
         # Build workflow graph
         self.graph = self._build_graph()
@@ -54,33 +141,74 @@ class AgentWorkflow:
         
         # Create state graph
         workflow = StateGraph(ConversationState)
+        parallel = self.mode == "parallel"
+        plan = self.response_mode == "plan"
         
-        # Add agent nodes
-        workflow.add_node("interaction", self._interaction_node)
-        workflow.add_node("memory", self._memory_node)
-        workflow.add_node("knowledge", self._knowledge_node)
-        workflow.add_node("sentiment", self._sentiment_node)
-        workflow.add_node("decision", self._decision_node)
-        workflow.add_node("handoff", self._handoff_node)
-        workflow.add_node("consultant", self._consultant_node)
-        workflow.add_node("refund", self._refund_node)
+        # Add agent nodes (each wrapped in a tracing span)
+        if parallel:
+            # Interaction, memory and sentiment only read messages, so they
+            # run concurrently inside a single fan-out/fan-in node
+            self._add_node(workflow, "analysis", self._analysis_node)
+        else:
+            self._add_node(workflow, "interaction", self._interaction_node)
+            if not self.background_summary:
+                self._add_node(workflow, "memory", self._memory_node)
+            self._add_node(workflow, "sentiment", self._sentiment_node)
+        if plan:
+            # One structured call replaces knowledge + decision
+            self._add_node(workflow, "plan", self._plan_node)
+        else:
+            self._add_node(workflow, "knowledge", self._knowledge_node)
+            self._add_node(workflow, "decision", self._decision_node)
+        self._add_node(workflow, "handoff", self._handoff_node)
+        self._add_node(workflow, "consultant", self._consultant_node)
+        self._add_node(workflow, "refund", self._refund_node)
         
-        # Set entry point
-        workflow.set_entry_point("interaction")
+        classify_node = "analysis" if parallel else "interaction"
+        if settings.sticky_flows:
+            # Active multi-turn flows skip classification and summarization
+            self._add_node(workflow, "entry", self._entry_node)
+            workflow.set_entry_point("entry")
+            workflow.add_conditional_edges(
+                "entry",
+                self._route_entry,
+                {
+                    "classify": classify_node,
+                    "consultation": "consultant",
+                    "refund": "refund",
+                    "escalation": "handoff"
+                }
+            )
+        else:
+            # Set entry point
+            workflow.set_entry_point(classify_node)
         
-        # Define sequential flow
-        workflow.add_edge("interaction", "memory")
-        # workflow.add_edge("memory", "knowledge") # Replaced by conditional edge
+        # First node of the response stage for standard turns. The planner
+        # needs the frustration level, so sentiment runs before it.
+        if plan:
+            response_node = "plan" if parallel else "sentiment"
+        else:
+            response_node = "knowledge"
         
-        # Conditional routing after memory (to Consultation, Refund, or Knowledge)
+        if parallel:
+            routing_node = "analysis"
+        elif self.background_summary:
+            routing_node = "interaction"
+        else:
+            # Define sequential flow
+            workflow.add_edge("interaction", "memory")
+            # workflow.add_edge("memory", "knowledge") # Replaced by conditional edge
+            routing_node = "memory"
+        
+        # Conditional routing after classification (to Consultation, Refund, or Knowledge)
         workflow.add_conditional_edges(
-            "memory",
+            routing_node,
              self._route_memory,
              {
                  "consultation": "consultant",
                  "refund": "refund",
                  "escalation": "handoff",
-                 "standard": "knowledge"
+                 "standard": response_node
              }
         )
         
@@ -89,7 +217,7 @@ class AgentWorkflow:
             "consultant",
              self._route_consultant,
              {
-                 "search_products": "knowledge",
+                 "search_products": response_node,
                  "continue_consultation": END
              }
         )
@@ -106,12 +234,18 @@ class AgentWorkflow:
              }
         )
         
-        workflow.add_edge("knowledge", "sentiment")
-        workflow.add_edge("sentiment", "decision")
+        if plan:
+            if not parallel:
+                workflow.add_edge("sentiment", "plan")
+        elif parallel:
+            workflow.add_edge("knowledge", "decision")
+        else:
+            workflow.add_edge("knowledge", "sentiment")
+            workflow.add_edge("sentiment", "decision")
         
         # Conditional routing from decision node
         workflow.add_conditional_edges(
-            "decision",
+            "plan" if plan else "decision",
             self._route_decision,
             {
                 "ai_response": END,
@@ -127,7 +261,39 @@ class AgentWorkflow:
         # Compile graph
         return workflow.compile()
     
+    def _add_node(self, workflow: StateGraph, name: str, node):
+        """Register a node wrapped in a tracing span"""
+        workflow.add_node(name, tracer.traced(name, node))
+    
     # Agent node wrappers
+    async def _entry_node(self, state: ConversationState) -> ConversationState:
+        """Sticky-flow router: keep active consultation/refund flows on their agent"""
+        state["route"] = "classify"
+        refund_active = state.get("refund_active", False)
+        consultation_active = state.get("consultation_active", False)
+        if not (refund_active or consultation_active) or not state.get("messages"):
+            return state
+        
+        user_message = state["messages"][-1]["content"].strip()
+        escape_intent = match_intent_rules(user_message)
+        
+        if escape_intent == "human_handoff":
+            state["user_intent"] = "human_handoff"
+            state["route"] = "escalation"
+        elif FLOW_EXIT_PATTERN.search(user_message):
+            # User left the flow; run the full classification path instead
+            state["refund_active"] = False
+            state["consultation_active"] = False
+        elif refund_active or escape_intent == "refund_request":
+            state["user_intent"] = "refund_request"
+            state["route"] = "refund"
+        else:
+            state["user_intent"] = "consultation"
+            state["route"] = "consultation"
+        
+        print(f"✓ Entry route: {state['route']}")
+        return state
+    
     async def _interaction_node(self, state: ConversationState) -> ConversationState:
         """Website Interaction Agent node"""
         return await self.interaction_agent.process(state)
@@ -136,14 +302,107 @@ class AgentWorkflow:
         """Context & Memory Agent node"""
         return await self.memory_agent.process(state)
     
+    def schedule_summary(self, session_id: str):
+        """Refresh the session summary in the background once the reply is out"""
+        if not self.background_summary:
+            return
+        self.cancel_summary(session_id)
+        task = asyncio.create_task(self.summarize_session(session_id))
+        self.summary_tasks[session_id] = task
+        task.add_done_callback(lambda done: self._forget_summary(session_id, done))
+    
+    def cancel_summary(self, session_id: str):
+        """Drop an in-flight summary superseded by a newer turn"""
+        task = self.summary_tasks.pop(session_id, None)
+        if task is not None and not task.done():
+            task.cancel()
+    
+    def _forget_summary(self, session_id: str, task: asyncio.Task):
+        if self.summary_tasks.get(session_id) is task:
+            del self.summary_tasks[session_id]
+        if not task.cancelled() and task.exception() is not None:
+            print(f"✗ Background summary error: {task.exception()}")
+    
+    async def summarize_session(self, session_id: str):
+        """Fold the session's newest messages into its rolling summary"""
+        from utils.session_manager import session_manager
+        
+        session = await session_manager.get_session(session_id)
+        if not session:
+            return
+        messages = session.get("messages", [])
+        watermark = session.get("summary_watermark", 0)
+        state = {
+            "messages": messages,
+            "conversation_summary": session.get("conversation_summary", ""),
+            "summary_watermark": watermark,
+            "message_offset": session.get("message_count", len(messages)) - len(messages)
+        }
+        result = await self.memory_agent.process(state)
+        if result["summary_watermark"] != watermark or not session.get("conversation_summary"):
+            await session_manager.update_session(session_id, {
+                "conversation_summary": result["conversation_summary"],
+                "summary_watermark": result["summary_watermark"]
+            })
+    
     async def _knowledge_node(self, state: ConversationState) -> ConversationState:
         """Knowledge & Retrieval Agent node"""
-        return await self.knowledge_agent.process(state)
+        state = await self.knowledge_agent.process(state)
+        if self.mode == "parallel":
+            # Sentiment ran before retrieval, so add the retrieval signal here
+            self._add_retrieval_friction(state)
+        return state
+    
+    async def _plan_node(self, state: ConversationState) -> ConversationState:
+        """Planner Agent node (search + action in one call)"""
+        state = await self.planner_agent.process(state)
+        # Sentiment always runs before the planner; judge retrieval only if it searched
+        plan = (state.get("metadata") or {}).get("plan") or {}
+        if plan.get("search"):
+            self._add_retrieval_friction(state)
+        return state
+    
+    def _add_retrieval_friction(self, state: ConversationState):
+        """Append the low-retrieval signal when sentiment ran before retrieval"""
+        for signal in self.sentiment_agent.detect_retrieval_friction(state):
+            signals = state.get("escalation_signals") or []
+            if signal not in signals:
+                state["escalation_signals"] = signals + [signal]
     
     async def _sentiment_node(self, state: ConversationState) -> ConversationState:
         """Sentiment Detection Agent node"""
+        if self.response_mode == "plan":
+            # Retrieval has not run yet; its friction signal is added after planning
+            retrieval_score = state.pop("retrieval_score", 0.0)
+            state = await self.sentiment_agent.process(state)
+            state["retrieval_score"] = retrieval_score
+            return state
         return await self.sentiment_agent.process(state)
     
+    async def _analysis_node(self, state: ConversationState) -> ConversationState:
+        """Parallel analysis node: interaction, sentiment (and memory) fan-out/fan-in"""
+        # Each branch works on its own shallow copy of the state
+        sentiment_state = dict(state)
+        # Retrieval has not run yet; its friction signal is added after knowledge
+        sentiment_state.pop("retrieval_score", None)
+        
+        branches = {
+            "interaction": tracer.traced("interaction", self.interaction_agent.process)(dict(state)),
+            "sentiment": tracer.traced("sentiment", self.sentiment_agent.process)(sentiment_state),
+        }
+        if not self.background_summary:
+            branches["memory"] = tracer.traced("memory", self.memory_agent.process)(dict(state))
+        results = await asyncio.gather(*branches.values())
+        
+        # Join: merge only the keys each branch owns
+        for name, result in zip(branches, results):
+            for key in PARALLEL_ANALYSIS_KEYS[name]:
+                if key in result:
+                    state[key] = result[key]
+        
+        state["agent_type"] = "interaction"
+        return state
+    
     async def _decision_node(self, state: ConversationState) -> ConversationState:
         """Decision-Making Agent node"""
         return await self.decision_agent.process(state)
@@ -182,6 +441,13 @@ class AgentWorkflow:
         else:
             return "ai_response"
             
+    def _route_entry(self, state: ConversationState) -> Literal["classify", "consultation", "refund", "escalation"]:
+        """Route from the sticky-flow entry node"""
+        route = state.get("route", "classify")
+        if route in ("consultation", "refund", "escalation"):
+            return route
+        return "classify"
+    
     def _route_memory(self, state: ConversationState) -> Literal["consultation", "refund", "escalation", "standard"]:
         """Route based on intent or active consultation/refund"""
         intent = state.get("user_intent", "")
@@ -218,7 +484,8 @@ class AgentWorkflow:
         self,
         session_id: str,
         user_message: str,
-        user_id: str = None
+        user_id: str = None,
+        message_stored: bool = False
     ) -> Dict[str, Any]:
         """
         Process a user message through the agent workflow
@@ -227,6 +494,8 @@ class AgentWorkflow:
             session_id: Chat session ID
             user_message: User's message
             user_id: Optional user ID
+            message_stored: The caller already added `user_message` to the
+                session as its last message (main.run_turn does)
             
         Returns:
             Response data including AI message and metadata
@@ -239,8 +508,9 @@ class AgentWorkflow:
         
         # Get existing messages or start fresh
         existing_messages = session.get("messages", []) if session else []
+        message_count = session.get("message_count", len(existing_messages)) if session else 0
         
-        # Add new user message to history
+        # Add new user message to history, unless the caller already stored it
         new_user_message = {
             "content": user_message,
             "sender": "user",
@@ -249,7 +519,10 @@ class AgentWorkflow:
         }
         
         # Combine existing messages with new message for full context
-        all_messages = existing_messages + [new_user_message]
+        if message_stored and existing_messages:
+            all_messages = existing_messages
+        else:
+            all_messages = existing_messages + [new_user_message]
         
         # Initialize state with FULL conversation history
         state: ConversationState = {
@@ -257,6 +530,8 @@ class AgentWorkflow:
             "session_id": session_id,
             "user_id": user_id or (session.get("user_id") if session else None),
             "conversation_summary": session.get("conversation_summary", "") if session else "",
+            "summary_watermark": session.get("summary_watermark", 0) if session else 0,
+            "message_offset": message_count - len(existing_messages),
             "user_intent": "",
             "extracted_entities": {
                 "watch_model": None,
@@ -267,6 +542,9 @@ class AgentWorkflow:
             },
             "sentiment_score": session.get("sentiment_score", 0.0) if session else 0.0,
             "escalation_signals": session.get("escalation_signals", []) if session else [],
+            "sentiment_state": (session.get("sentiment_state") if session else None) or initial_sentiment_state(
+                session.get("sentiment_score", 0.0) if session else 0.0
+            ),
             "retrieved_products": session.get("last_retrieved_products", []) if session else [],
             "retrieval_score": 0.0,
             "ai_confidence": 0.0,
@@ -281,9 +559,26 @@ class AgentWorkflow:
             "metadata": {}
         }
         
+        # Speculatively look up products while the classifier runs, when the
+        # local tiers expect a retrieval turn (or the message names enough params)
+        likely_intent = match_intent_rules(user_message)
+        classifier = self.interaction_agent.local_classifier
+        if likely_intent is None and classifier is not None:
+            likely_intent = classifier.predict(user_message)[0]
+        speculate = (
+            settings.speculative_retrieval
+            and not state["consultation_active"]
+            and not state["refund_active"]
+            and likely_intent not in NON_RETRIEVAL_INTENTS
+        )
+        
         # Run through workflow
         try:
-            result = await self.graph.ainvoke(state)
+            with tracer.turn(session_id) as turn_span, \
+                    product_speculator.speculate(user_message if speculate else None, likely_intent):
+                result = await self.graph.ainvoke(state)
+                turn_span.attributes["intent"] = result.get("user_intent", "")
+                turn_span.attributes["agent_type"] = result.get("agent_type", "")
             
             # Extract response data
             response_data = {
@@ -301,7 +596,11 @@ class AgentWorkflow:
                     "collected_preferences": result.get("collected_preferences", {}),
                     "refund_active": result.get("refund_active", False),
                     "refund_collected_info": result.get("refund_collected_info", {}),
-                    "refund_data": result.get("metadata", {}).get("refund_data")
+                    "refund_data": result.get("metadata", {}).get("refund_data"),
+                    "conversation_summary": result.get("conversation_summary", ""),
+                    "summary_watermark": result.get("summary_watermark", 0),
+                    "sentiment_state": record_intent(result.get("sentiment_state") or {}, result.get("user_intent", "")),
+                    "trace_id": turn_span.span_id
                 }
             }
             
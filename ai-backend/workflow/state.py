@@ -31,6 +31,8 @@ class ConversationState(TypedDict):
     
     # Context and memory
     conversation_summary: str
+    summary_watermark: int  # Messages (counted since session start) folded into the summary
+    message_offset: int  # Position of messages[0] in the whole session history
     user_intent: str
     extracted_entities: ExtractedEntities
     
@@ -38,6 +40,7 @@ class ConversationState(TypedDict):
     sentiment_score: float  # -1 to 1
     frustration_level: str  # low, medium, high
     escalation_signals: List[str]
+    sentiment_state: Dict[str, Any]  # Running score, turn counts and recent intents (see sentiment_agent)
     
     # Knowledge retrieval
     retrieved_products: List[Dict[str, Any]]
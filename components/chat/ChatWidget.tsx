@@ -19,6 +19,7 @@ export function ChatWidget() {
     const [isOpen, setIsOpen] = useState(false);
     const [messages, setMessages] = useState<Message[]>([]);
     const [isTyping, setIsTyping] = useState(false);
+    const [streamingMessage, setStreamingMessage] = useState<{ segment: number; content: string } | null>(null);
     const [isEscalated, setIsEscalated] = useState(false);
     const [handoffData, setHandoffData] = useState<any>(null);
     const [sessionId] = useState(() => generateSessionId());
@@ -48,6 +49,7 @@ export function ChatWidget() {
             };
 
             setMessages((prev) => [...prev, newMessage]);
+            setStreamingMessage(null);
             setIsTyping(false);
 
             // Increment unread count if chat is closed
@@ -56,6 +58,16 @@ export function ChatWidget() {
             }
         });
 
+        // Listen for streamed tokens (a new segment replaces the draft)
+        socketClient.onMessageChunk((data) => {
+            setIsTyping(false);
+            setStreamingMessage((prev) =>
+                prev && prev.segment === data.segment
+                    ? { segment: prev.segment, content: prev.content + data.chunk }
+                    : { segment: data.segment, content: data.chunk }
+            );
+        });
+
         // Listen for typing indicator
         socketClient.onTyping((data) => {
             setIsTyping(data.typing);
@@ -99,7 +111,11 @@ export function ChatWidget() {
             <ChatWindow
                 isOpen={isOpen}
                 onClose={() => setIsOpen(false)}
-                messages={messages}
+                messages={
+                    streamingMessage
+                        ? [...messages, { content: streamingMessage.content, sender: 'ai', timestamp: new Date().toISOString() }]
+                        : messages
+                }
                 onSendMessage={handleSendMessage}
                 isTyping={isTyping}
                 isEscalated={isEscalated}
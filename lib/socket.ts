@@ -68,6 +68,10 @@ class SocketClient {
         this.socket?.on('ai_message', callback);
     }
 
+    onMessageChunk(callback: (data: { chunk: string; agent_type: string; segment: number }) => void) {
+        this.socket?.on('ai_message_chunk', callback);
+    }
+
     onTyping(callback: (data: { typing: boolean }) => void) {
         this.socket?.on('typing', callback);
     }